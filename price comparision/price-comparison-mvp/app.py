@@ -1,5 +1,7 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
+import atexit
 import os
+from itertools import islice
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
@@ -8,11 +10,14 @@ from data_sources.source_manager import SourceManager
 from services.text_search_service import TextSearchService
 from services.image_service_simple import ImageService
 from services.image_recognition import ImageRecognitionService
-from services.nlp_service import NLPService
 from services.price_prediction import PricePredictionService
 from services.recommendation_engine import RecommendationEngine
 from services.price_compare_service import PriceCompareService
 from services.notification_service import NotificationService
+from services.index_manager import IndexRebuildManager
+from services.catalog_index import SORT_ORDERS, SearchFilters
+from services.best_price_index import BestPriceIndex
+from utils.scheduler import CatalogRefreshScheduler, PriceScheduler
 from models.user import User
 from models.alert import Alert
 
@@ -39,29 +44,78 @@ def login_required(f):
     return decorated_function
 
 # Initialize services
-source_manager = SourceManager()
+# One catalog source shared by search and the index rebuilds
+source_manager = SourceManager(data_source=os.environ.get('DATA_SOURCE', 'dataset'))
 
 # Initialize search with live scraping enabled (hybrid mode)
 try:
     from search_config import ENABLE_LIVE_SCRAPING
-    text_search_service = TextSearchService(use_live_scraping=ENABLE_LIVE_SCRAPING)
+    text_search_service = TextSearchService(use_live_scraping=ENABLE_LIVE_SCRAPING, source_manager=source_manager)
     print(f"🔍 Search mode: {'HYBRID (Live + Datasets)' if ENABLE_LIVE_SCRAPING else 'Datasets Only'}")
 except ImportError:
-    text_search_service = TextSearchService(use_live_scraping=True)
+    text_search_service = TextSearchService(use_live_scraping=True, source_manager=source_manager)
     print("🔍 Search mode: HYBRID (Live + Datasets)")
 
-image_service = ImageService()
+image_service = ImageService(search_service=text_search_service)
 price_compare_service = PriceCompareService()
 notification_service = NotificationService()
 
 # Initialize AI/ML services
 image_recognition_service = ImageRecognitionService()
-nlp_service = NLPService()
 price_prediction_service = PricePredictionService()
-recommendation_engine = RecommendationEngine()
+recommendation_engine = RecommendationEngine()  # owns user interactions shared by every catalog generation
+
+# Catalog-derived indexes (vocabulary, TF-IDF, similarity) are rebuilt in the
+# background and swapped in atomically; requests read index_manager.current()
+try:
+    from search_config import (INDEX_REFRESH_INTERVAL, CATEGORY_PAGE_SIZE, DEFAULT_MAX_RESULTS,
+                               PRICE_CHECK_INTERVAL_HOURS, FEED_REFRESH_INTERVAL)
+except ImportError:
+    INDEX_REFRESH_INTERVAL = 300
+    FEED_REFRESH_INTERVAL = 300
+    CATEGORY_PAGE_SIZE = 24
+    DEFAULT_MAX_RESULTS = 50
+    PRICE_CHECK_INTERVAL_HOURS = 1
+# Cheapest offer per product cluster, kept current by ingest, live scrapes and scheduled checks
+best_price_index = BestPriceIndex()
+text_search_service.best_price_index = best_price_index
+price_scheduler = PriceScheduler(best_price_index, price_fetcher=text_search_service.search_live_only)
+index_manager = IndexRebuildManager(source_manager, user_state_engine=recommendation_engine,
+                                    refresh_interval=INDEX_REFRESH_INTERVAL,
+                                    best_price_index=best_price_index,
+                                    query_log=text_search_service.query_log)
+text_search_service.index_manager = index_manager
+# Changed feeds are re-imported here, off the rebuild manager's version checks
+catalog_refresh_scheduler = CatalogRefreshScheduler(source_manager, index_manager)
+_background_started = False
 
 print("✓ AI/ML services initialized successfully!")
 
+
+def start_background_services():
+    """Start index rebuilds, price checks and feed refreshes (once per process).
+
+    Importing the module starts nothing, so tests and tools can use the app and
+    its services without background threads.
+    """
+    global _background_started
+    if _background_started:
+        return
+    _background_started = True
+    price_scheduler.schedule_price_check(interval_hours=PRICE_CHECK_INTERVAL_HOURS)
+    index_manager.start()
+    catalog_refresh_scheduler.schedule_refresh(interval_seconds=FEED_REFRESH_INTERVAL)
+    # Stop the background workers when the process exits
+    atexit.register(price_scheduler.stop)
+    atexit.register(catalog_refresh_scheduler.stop)
+    atexit.register(index_manager.stop)
+
+
+def create_app():
+    """App factory for WSGI servers (gunicorn 'app:create_app()'): the app with its background services running"""
+    start_background_services()
+    return app
+
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
@@ -160,45 +214,75 @@ def dashboard():
                          wishlist=user_wishlist,
                          recent_searches=user_searches)
 
+def get_sort_order():
+    """Requested presorted order for paginated listings (defaults to price)"""
+    sort = request.values.get('sort', 'price')
+    return sort if sort in SORT_ORDERS else 'price'
+
+def search_page(query, cursor=None, sort='price', limit=DEFAULT_MAX_RESULTS, filters=None, facets=False):
+    """One cursor-paginated page of search results from the live catalog generation"""
+    generation = index_manager.current()
+    if generation is None:
+        results = text_search_service.search_products(query)
+        return {'products': results, 'next_cursor': None, 'total': len(results),
+                'summary': None, 'facets': None, 'live': True, 'best_prices': None,
+                'suggestion': None}
+    return text_search_service.search_page(generation.index, query, sort, cursor, limit, filters=filters,
+                                           facets=facets)
+
 @app.route('/search', methods=['GET', 'POST'])
 def search():
-    """Text-based product search."""
+    """Text-based product search (GET requests carry the pagination cursor)."""
     if request.method == 'POST':
         query = request.form.get('query', '').strip()
         if not query:
             flash('Please enter a search query.', 'error')
             return redirect(url_for('index'))
+    else:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return redirect(url_for('index'))
 
-        try:
-            # Save search history if user is logged in
-            if 'user_id' in session:
-                recent_searches.append({
-                    'user_id': session['user_id'],
-                    'query': query,
-                    'timestamp': __import__('datetime').datetime.now().isoformat()
-                })
-            
-            # Perform search
-            results = text_search_service.search_products(query)
-
-            # Compare prices across platforms
-            if results:
-                comparison_results = price_compare_service.compare_prices(results)
-                return render_template('realistic-search-results.html',
-                                     query=query,
-                                     results=comparison_results)
-            else:
-                return render_template('realistic-search-results.html',
-                                     query=query,
-                                     results=[],
-                                     message="No products found matching your search.")
+    cursor = request.args.get('cursor')
+    sort = get_sort_order()
 
-        except Exception as e:
-            app.logger.error(f"Search error: {e}")
-            flash('An error occurred during search. Please try again.', 'error')
-            return redirect(url_for('index'))
+    try:
+        # Save search history if user is logged in
+        if 'user_id' in session and not cursor:
+            recent_searches.append({
+                'user_id': session['user_id'],
+                'query': query,
+                'timestamp': __import__('datetime').datetime.now().isoformat()
+            })
+        
+        # Perform search
+        try:
+            page = search_page(query, cursor, sort)
+        except ValueError:
+            flash('Search results were refreshed. Showing the first page.', 'info')
+            return redirect(url_for('search', q=query, sort=sort))
+
+        # Compare prices across platforms
+        if page['products']:
+            comparison_results = price_compare_service.compare_prices(
+                page['products'], sort_by_price=page['live'], best_prices=page['best_prices'])
+            return render_template('realistic-search-results.html',
+                                 query=query,
+                                 results=comparison_results,
+                                 total=page['total'],
+                                 sort=sort,
+                                 next_cursor=page['next_cursor'])
+        else:
+            return render_template('realistic-search-results.html',
+                                 query=query,
+                                 results=[],
+                                 suggestion=page.get('suggestion'),
+                                 message="No products found matching your search.")
 
-    return redirect(url_for('index'))
+    except Exception as e:
+        app.logger.error(f"Search error: {e}")
+        flash('An error occurred during search. Please try again.', 'error')
+        return redirect(url_for('index'))
 
 @app.route('/upload', methods=['GET', 'POST'])
 def upload():
@@ -282,6 +366,8 @@ def alerts():
             flash('Please fill in product name and threshold.', 'error')
             return redirect(request.url)
 
+        price_scheduler.watch(product_name)
+
         try:
             alert = {
                 'id': _next_alert_id, 
@@ -347,94 +433,78 @@ def categories():
     categories = {
         'Groceries': {
             'items': ['milk', 'bread', 'rice', 'oil', 'sugar', 'noodles', 'chips', 'beverages'],
-            'count': '2000+',
+            'department': 'groceries',
             'icon': '🛒'
         },
         'Electronics': {
             'items': ['phones', 'laptops', 'headphones', 'tablets', 'cameras', 'tvs', 'watches'],
-            'count': '5000+',
+            'department': 'electronics',
             'icon': '📱'
         },
         'Fashion': {
             'items': ['shoes', 'jeans', 'tshirts', 'dresses', 'jackets', 'sneakers', 'accessories'],
-            'count': '8000+',
+            'department': 'fashion',
             'icon': '👕'
         },
         'Home & Kitchen': {
             'items': ['furniture', 'appliances', 'cookware', 'decor', 'storage', 'lighting'],
-            'count': '3000+',
+            'department': 'home',
             'icon': '🏠'
         },
         'Beauty': {
             'items': ['skincare', 'makeup', 'perfumes', 'haircare', 'personal care', 'wellness'],
-            'count': '4000+',
+            'department': 'beauty',
             'icon': '💄'
         },
         'Sports': {
             'items': ['fitness equipment', 'outdoor gear', 'sports accessories', 'supplements'],
-            'count': '1500+',
+            'department': 'sports',
             'icon': '⚽'
         }
     }
+
+    # Real counts from the materialized category views of the live catalog generation
+    generation = index_manager.current(timeout=0)
+    for data in categories.values():
+        data['count'] = generation.index.category_count(data['department']) if generation else 0
+
     return render_template('realistic-categories.html', categories=categories)
 
+# Category page slugs that differ from the catalog department name
+CATEGORY_ALIASES = {
+    'homekitchen': 'home',
+}
+
 @app.route('/category/<category_name>')
 def category_products(category_name):
-    """Products by category."""
-    # Get products for this category
-    category_datasets = {
-        'groceries': ['blinkit', 'zepto', 'instamart', 'bigbasket'],
-        'electronics': ['amazon', 'flipkart', 'electronics_amazon'],
-        'fashion': ['myntra', 'ajio', 'fashion_myntra'],
-        'home': ['home_kitchen'],
-        'homekitchen': ['home_kitchen'],
-        'beauty': ['nykaa', 'beauty_nykaa'],
-        'sports': ['sports_fitness']
-    }
-    
-    datasets = category_datasets.get(category_name.lower(), [])
-    all_results = []
-    
-    # Load products from category-specific datasets
-    for dataset in datasets:
+    """Products by category, cursor-paginated (price order slices the presorted category view)."""
+    department = CATEGORY_ALIASES.get(category_name.lower(), category_name.lower())
+    cursor = request.args.get('cursor')
+    sort = get_sort_order()
+
+    generation = index_manager.current()
+    total = 0
+    products, next_cursor = [], None
+    if generation:
+        index = generation.index
+        total = index.category_count(department)
         try:
-            products = source_manager.load_products(dataset)
-            for product in products:
-                product['platform'] = dataset
-                all_results.append(product)
-        except Exception as e:
-            print(f"Error loading {dataset}: {e}")
-    
-    # If no specific datasets, fall back to keyword search
-    if not all_results:
-        category_keywords = {
-            'groceries': ['milk', 'bread', 'rice', 'oil', 'sugar', 'noodles', 'chips'],
-            'electronics': ['phone', 'laptop', 'headphones', 'tablet', 'camera', 'tv'],
-            'fashion': ['shoes', 'jeans', 'tshirt', 'dress', 'jacket', 'sneakers'],
-            'home': ['furniture', 'appliances', 'cookware', 'decor'],
-            'beauty': ['skincare', 'makeup', 'perfume', 'haircare'],
-            'sports': ['fitness', 'outdoor', 'sports']
-        }
-        
-        keywords = category_keywords.get(category_name.lower(), [])
-        for keyword in keywords:
-            results = text_search_service.search_products(keyword)
-            all_results.extend(results)
-    
-    # Remove duplicates and compare prices
-    unique_results = []
-    seen = set()
-    for product in all_results:
-        key = (product['product_name'], product.get('platform', 'unknown'))
-        if key not in seen:
-            seen.add(key)
-            unique_results.append(product)
-    
-    comparison_results = price_compare_service.compare_prices(unique_results)
+            products, next_cursor = index.category_page(department, sort, cursor, CATEGORY_PAGE_SIZE)
+        except ValueError:
+            return redirect(url_for('category_products', category_name=category_name, sort=sort))
+        best_prices = {p['cluster_id']: index.cluster_best_price(p['cluster_id']) for p in products if p.get('cluster_id')}
+    comparison_results = price_compare_service.compare_prices(products, sort_by_price=False,
+                                                              best_prices=best_prices if generation else None)
     
     return render_template('category_products.html', 
                          category=category_name.title(),
-                         results=comparison_results)
+                         category_name=category_name,
+                         results=comparison_results,
+                         total=total,
+                         sort=sort,
+                         sort_orders=SORT_ORDERS,
+                         cursor=cursor,
+                         next_cursor=next_cursor)
 
 
 @app.route('/redirect/<platform>/<path:product_name>')
@@ -489,10 +559,12 @@ def redirect_to_platform(platform, product_name):
 @app.route('/health')
 def health_check():
     """Health check endpoint."""
+    generation = index_manager.current(timeout=0)
     return jsonify({
         'status': 'healthy',
         'version': '1.0.0',
-        'features': ['text_search', 'image_search', 'price_alerts']
+        'features': ['text_search', 'image_search', 'price_alerts'],
+        'catalog': generation.describe() if generation else None
     })
 
 @app.route('/favicon.ico')
@@ -511,13 +583,33 @@ def api_search():
     if not query:
         return jsonify({'error': 'Query parameter required'}), 400
 
+    limit = min(max(request.args.get('limit', DEFAULT_MAX_RESULTS, type=int), 1), 500)
+    cursor = request.args.get('cursor')
+    sort = get_sort_order()
+    mode = 'unit' if request.args.get('compare') == 'unit' else 'item'
+    filters = SearchFilters.from_args(request.args)
+
     try:
-        results = text_search_service.search_products(query)
-        comparison_results = price_compare_service.compare_prices(results)
+        try:
+            # The JSON API returns the price summary and facet counts; the HTML page does not
+            page = search_page(query, cursor, sort, limit, filters, facets=True)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        comparison = price_compare_service.compare(page['products'], limit=limit,
+                                                   sort_by_price=page['live'] or mode == 'unit',
+                                                   best_prices=page['best_prices'], mode=mode)
         return jsonify({
             'query': query,
-            'results': comparison_results,
-            'count': len(comparison_results)
+            'results': comparison['results'],
+            'count': page['total'],
+            'sort': sort,
+            'compare': mode,
+            'filters': filters.to_dict(),
+            'next_cursor': page['next_cursor'],
+            'summary': page['summary'] or comparison['summary'],
+            'facets': page['facets'],
+            'suggestion': page.get('suggestion')
         })
     except Exception as e:
         app.logger.error(f"API search error: {e}")
@@ -546,20 +638,12 @@ def api_visual_search():
         # Classify product using AI
         classification = image_recognition_service.classify_product(filepath)
         
-        # Extract features and find similar products
-        all_products = source_manager.get_all_products()
+        # Search using extracted keywords (one batched pass, deduplicated)
         keywords = classification.get('category', 'general').split()
-        
-        # Search using extracted keywords
-        results = []
-        for keyword in keywords:
-            results.extend(text_search_service.search_products(keyword))
-        
-        # Remove duplicates
-        unique_results = list({(p['product_name'], p.get('platform', '')): p for p in results}.values())
+        results = text_search_service.search_many(keywords, mode='any', limit=50)
         
         # Compare prices
-        comparison_results = price_compare_service.compare_prices(unique_results[:50])
+        comparison_results = price_compare_service.compare_prices(results)
         
         return jsonify({
             'classification': classification,
@@ -578,48 +662,58 @@ def api_smart_search():
     if not query:
         return jsonify({'error': 'Query parameter required'}), 400
     
+    # Read one consistent catalog generation for the whole request
+    generation = index_manager.current()
+    if generation is None:
+        return jsonify({'error': 'Catalog index is still building'}), 503
+    nlp_service = generation.nlp_service
+    # mode=embedding ranks by pretrained word vectors instead of TF-IDF term overlap
+    semantic_mode = 'embedding' if request.args.get('mode') == 'embedding' else 'tfidf'
+    
     try:
-        # Build vocabulary if not already done
-        if not nlp_service.vocabulary:
-            all_products = source_manager.get_all_products()
-            nlp_service.build_vocabulary(all_products)
-        
-        # Analyze query intent
-        intent = nlp_service.analyze_query_intent(query)
-        
-        # Correct spelling
-        corrected_query = nlp_service.correct_query(query)
-        
-        # Extract entities
-        entities = nlp_service.extract_entities(corrected_query)
-        
-        # Expand query with synonyms
-        expanded_keywords = nlp_service.generate_search_keywords(corrected_query)
-        
-        # Perform search with expanded keywords
-        all_results = []
-        for keyword in expanded_keywords[:5]:  # Limit to top 5 keywords
-            results = text_search_service.search_products(keyword)
-            all_results.extend(results)
-        
-        # Remove duplicates
-        unique_results = list({(p['product_name'], p.get('platform', '')): p for p in all_results}.values())
-        
-        # Semantic ranking
-        all_products = source_manager.get_all_products()
-        semantic_results = nlp_service.semantic_search(corrected_query, all_products, top_k=50)
-        
-        # Combine and deduplicate
-        final_results = semantic_results if semantic_results else unique_results[:50]
-        
-        # Compare prices
-        comparison_results = price_compare_service.compare_prices(final_results)
+        # Intent, spelling corrections, entities and synonym expansions in one (memoized) pass
+        plan = nlp_service.plan_query(query)
+        intent = plan.intent
+        corrected_query = plan.corrected_query
+        entities = plan.entities
+        
+        # Price caps in the query filter (explicit parameters win); brands and categories it
+        # names only rank matching products first
+        filters = SearchFilters.from_entities(entities).merge(SearchFilters.from_args(request.args))
+        index = generation.index
+        
+        if plan.sub_queries:
+            # "iphone 15 vs galaxy s24": search each product in parallel, then line them up by platform
+            sides = text_search_service.compare_search(plan.sub_queries, index, filters=filters)
+            matrix = price_compare_service.price_matrix(sides)
+            comparison_results = [offer for row in matrix['rows'] for offer in row['offers'].values() if offer]
+            return jsonify({
+                'original_query': query,
+                'corrected_query': corrected_query if corrected_query != query else None,
+                'intent': intent,
+                'entities': entities,
+                'filters': filters.to_dict(),
+                'comparison': matrix,
+                'results': comparison_results,
+                'count': len(comparison_results)
+            })
+        
+        # Semantic ranking over the products that pass the filters, then the expanded keywords;
+        # the products of a comparison differ in brand and category, so preferences apply only here
+        preferences = SearchFilters.preferences_from_entities(entities)
+        final_results = text_search_service.smart_search(plan, generation, filters=filters, preferences=preferences,
+                                                         limit=50, semantic_mode=semantic_mode)
+        
+        # Compare prices, keeping the relevance order (preferred brands and categories first)
+        comparison_results = price_compare_service.compare_prices(final_results, sort_by_price=False)
         
         return jsonify({
             'original_query': query,
             'corrected_query': corrected_query if corrected_query != query else None,
             'intent': intent,
             'entities': entities,
+            'filters': filters.to_dict(),
+            'comparison': None,
             'results': comparison_results,
             'count': len(comparison_results)
         })
@@ -635,13 +729,12 @@ def api_autocomplete():
     if not partial_query or len(partial_query) < 2:
         return jsonify({'suggestions': []})
     
+    generation = index_manager.current()
+    if generation is None:
+        return jsonify({'suggestions': []})
+    
     try:
-        # Build vocabulary if needed
-        if not nlp_service.product_names:
-            all_products = source_manager.get_all_products()
-            nlp_service.build_vocabulary(all_products)
-        
-        suggestions = nlp_service.get_autocomplete_suggestions(partial_query, max_suggestions=10)
+        suggestions = generation.nlp_service.get_autocomplete_suggestions(partial_query, max_suggestions=10)
         
         return jsonify({'suggestions': suggestions})
     
@@ -654,21 +747,20 @@ def api_recommendations():
     """Get personalized product recommendations"""
     user_id = session.get('user_id', 'guest')
     
+    generation = index_manager.current()
+    if generation is None:
+        return jsonify({'error': 'Catalog index is still building'}), 503
+    engine = generation.recommendation_engine
+    
     try:
-        # Build item features if not done
-        all_products = source_manager.get_all_products()
-        if not recommendation_engine.products_catalog:
-            recommendation_engine.build_item_features(all_products)
-            recommendation_engine.compute_item_similarity()
-        
         # Get personalized recommendations
-        recommendations = recommendation_engine.get_personalized_recommendations(
+        recommendations = engine.get_personalized_recommendations(
             user_id, top_k=20
         )
         
         # If no personalized recommendations, get trending
         if not recommendations:
-            recommendations = recommendation_engine.get_trending_products(top_k=20)
+            recommendations = engine.get_trending_products(top_k=20)
         
         return jsonify({
             'recommendations': recommendations,
@@ -689,11 +781,14 @@ def api_similar_products():
     if not product_name:
         return jsonify({'error': 'Product parameter required'}), 400
     
+    generation = index_manager.current()
+    if generation is None:
+        return jsonify({'error': 'Catalog index is still building'}), 503
+    
     try:
         # Find the product
-        all_products = source_manager.get_all_products()
         product = next(
-            (p for p in all_products 
+            (p for p in generation.products 
              if p.get('product_name') == product_name and 
              (not platform or p.get('platform') == platform)),
             None
@@ -702,13 +797,8 @@ def api_similar_products():
         if not product:
             return jsonify({'error': 'Product not found'}), 404
         
-        # Build features if needed
-        if not recommendation_engine.products_catalog:
-            recommendation_engine.build_item_features(all_products)
-            recommendation_engine.compute_item_similarity()
-        
         # Get similar products
-        similar = recommendation_engine.get_similar_products(product, top_k=15)
+        similar = generation.recommendation_engine.get_similar_products(product, top_k=15)
         
         return jsonify({
             'product': product,
@@ -754,12 +844,51 @@ def api_predict_price():
         app.logger.error(f"Price prediction error: {e}")
         return jsonify({'error': 'Price prediction failed'}), 500
 
+@app.route('/api/best-price')
+def api_best_price():
+    """Cheapest current offer for many products in one call"""
+    cluster_ids = [c for value in request.args.getlist('cluster_id') for c in value.split(',') if c]
+    names = [name.strip() for name in request.args.getlist('product') if name.strip()]
+    if not cluster_ids and not names:
+        return jsonify({'error': 'cluster_id or product parameter required'}), 400
+
+    results = best_price_index.best_many(cluster_ids)
+    for name in names:
+        results[name] = best_price_index.best_for_product(
+            text_search_service.enricher.enrich({'product_name': name, 'price': 0.0})
+        )
+
+    return jsonify({
+        'results': results,
+        'found': sum(1 for offer in results.values() if offer is not None)
+    })
+
+@app.route('/api/price-stats')
+def api_price_stats():
+    """Price distribution (mean, std, p10/median/p90) overall, per platform and per category"""
+    generation = index_manager.current()
+    if generation is None:
+        return jsonify({'error': 'Catalog index is still building'}), 503
+
+    stats = generation.index.price_stats().to_dict()
+    platform = request.args.get('platform', '').strip().lower()
+    category = request.args.get('category', '').strip().lower()
+    if platform:
+        return jsonify({'platform': platform, 'version': generation.version,
+                        'stats': stats['platforms'].get(platform, {})})
+    if category:
+        return jsonify({'category': category, 'version': generation.version,
+                        'stats': stats['categories'].get(category, {})})
+
+    stats['version'] = generation.version
+    return jsonify(stats)
+
 @app.route('/api/price-insights')
 def api_price_insights():
     """Get comprehensive price insights across products"""
     try:
-        all_products = source_manager.get_all_products()
-        insights = price_prediction_service.get_price_insights(all_products[:100])  # Sample
+        sample = list(islice(source_manager.iter_all_products(), 100))
+        insights = price_prediction_service.get_price_insights(sample)
         
         return jsonify(insights)
     
@@ -772,14 +901,12 @@ def api_trending():
     """Get trending products"""
     limit = int(request.args.get('limit', 20))
     
+    generation = index_manager.current()
+    if generation is None:
+        return jsonify({'error': 'Catalog index is still building'}), 503
+    
     try:
-        all_products = source_manager.get_all_products()
-        
-        # Build features if needed
-        if not recommendation_engine.products_catalog:
-            recommendation_engine.build_item_features(all_products)
-        
-        trending = recommendation_engine.get_trending_products(top_k=limit)
+        trending = generation.recommendation_engine.get_trending_products(top_k=limit)
         
         return jsonify({
             'trending': trending,
@@ -829,4 +956,5 @@ def internal_error(e):
     return render_template('500.html'), 500
 
 if __name__ == '__main__':
+    start_background_services()
     app.run(debug=True, host='0.0.0.0', port=5000)
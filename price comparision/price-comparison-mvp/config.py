@@ -9,7 +9,7 @@ class Config:
     else:
         UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'images', 'uploads')
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
-    DATA_SOURCE = 'dataset'  # File-based dataset storage
+    DATA_SOURCE = 'dataset'  # File-based dataset storage ('dataset', 'api' or 'sqlite')
     MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'image_classifier.pkl')
     
     # Session configuration
@@ -1,49 +1,93 @@
-import json
+import hashlib
 import os
+from data_sources.stream_ingest import iter_feed, normalize_product
+from data_sources.enrichment import ProductEnricher, normalize_text
+
+
+def resolve_feed(datasets_dir, platform):
+    """Feed file for a platform (JSON array, NDJSON or CSV), or None"""
+    for name in (f'{platform}_products.json', f'{platform}.json',
+                 f'{platform}_products.ndjson', f'{platform}.ndjson',
+                 f'{platform}_products.csv', f'{platform}.csv'):
+        file_path = os.path.join(datasets_dir, name)
+        if os.path.exists(file_path):
+            return file_path
+    return None
+
+
+def feed_fingerprint(paths):
+    """Fingerprint of feed files (name, size, mtime) for change detection"""
+    hasher = hashlib.sha1()
+    for path in paths:
+        stat = os.stat(path)
+        hasher.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode('utf-8'))
+    return hasher.hexdigest()[:12]
+
 
 class DatasetSource:
-    def __init__(self):
-        self.datasets_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'datasets')
+    # All available dataset files
+    PLATFORMS = [
+        'amazon', 'flipkart', 'myntra', 'ajio', 'blinkit', 'zepto', 
+        'instamart', 'bigbasket', 'meesho', 'shopsy', 'nykaa',
+        'electronics_amazon', 'fashion_myntra', 'home_kitchen', 
+        'beauty_nykaa', 'sports_fitness'
+    ]
+
+    def __init__(self, datasets_dir=None):
+        self.datasets_dir = datasets_dir or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'datasets')
+        self.enricher = ProductEnricher()
+
+    def get_dataset_path(self, platform):
+        """Resolve the feed file for a platform (JSON array, NDJSON or CSV)."""
+        return resolve_feed(self.datasets_dir, platform)
+
+    def feed_paths(self):
+        """Feed files making up the catalog, in platform order"""
+        paths = (self.get_dataset_path(platform) for platform in self.PLATFORMS)
+        return [path for path in paths if path]
+
+    def get_platforms(self):
+        return list(self.PLATFORMS)
+
+    def get_catalog_version(self):
+        """Fingerprint of the dataset files (name, size, mtime) for change detection."""
+        return feed_fingerprint(self.feed_paths())
+
+    def iter_products(self, platform):
+        """Stream normalized, enriched products for a platform without loading the whole file.
+
+        Nothing is cached: catalog builds hold the products they index, so the source
+        keeps only one record in memory at a time. Unusable records are skipped.
+        """
+        file_path = self.get_dataset_path(platform)
+        if not file_path:
+            return
+        for raw in iter_feed(file_path):
+            product = normalize_product(raw, platform)
+            if product is not None:
+                yield self.enricher.enrich(product)
 
     def load_products(self, platform):
-        """Load products from JSON dataset for a specific platform."""
-        file_path = os.path.join(self.datasets_dir, f'{platform}_products.json')
-        if not os.path.exists(file_path):
-            return []
-        with open(file_path, 'r') as f:
-            return json.load(f)
+        """Load normalized, enriched products for a platform."""
+        return list(self.iter_products(platform))
 
     def search_products(self, query, platform=None):
         """Search products by name across all or specific platform."""
         results = []
-        query_lower = query.lower().strip()
-        
-        # All available dataset files
-        all_platforms = [
-            'amazon', 'flipkart', 'myntra', 'ajio', 'blinkit', 'zepto', 
-            'instamart', 'bigbasket', 'meesho', 'shopsy', 'nykaa',
-            'electronics_amazon', 'fashion_myntra', 'home_kitchen', 
-            'beauty_nykaa', 'sports_fitness'
-        ]
+        query_lower = normalize_text(query)
+        query_words = [word for word in query_lower.split() if len(word) > 1]
         
-        platforms = [platform] if platform else all_platforms
+        platforms = [platform] if platform else self.PLATFORMS
         
         for plat in platforms:
             try:
-                products = self.load_products(plat)
-                for product in products:
-                    product_name = product.get('product_name', '').lower()
-                    brand = product.get('brand', '').lower()
-                    category = product.get('category', '').lower()
+                for product in self.iter_products(plat):
+                    # Precomputed at ingest from name, brand and category
+                    search_text = product.get('search_text', '')
                     
                     # More flexible search - check name, brand, and category
-                    if (query_lower in product_name or 
-                        query_lower in brand or 
-                        query_lower in category or
-                        any(word in product_name for word in query_lower.split()) or
-                        any(word in brand for word in query_lower.split())):
-                        
-                        product['platform'] = plat
+                    if (query_lower in search_text or
+                        any(word in search_text for word in query_words)):
                         results.append(product)
             except Exception as e:
                 # Skip files that don't exist or have errors
@@ -0,0 +1,177 @@
+"""
+Ingest-time Product Enrichment
+Infers category and department, normalizes brands, parses pack sizes and
+precomputes search keys once per catalog version so query paths never re-derive them
+"""
+import re
+
+
+ENRICHMENT_VERSION = 2
+
+# Fine-grained category -> (department, name phrases), checked in order
+CATEGORY_RULES = [
+    ('frozen', 'groceries', ['ice cream', 'frozen']),
+    ('makeup', 'beauty', ['lipstick', 'mascara', 'foundation', 'kajal', 'eyeliner']),
+    ('haircare', 'beauty', ['shampoo', 'conditioner', 'hair oil']),
+    ('skincare', 'beauty', ['face wash', 'serum', 'sunscreen', 'cream', 'lotion', 'body butter', 'face oil', 'face mask', 'moisturizer']),
+    ('dairy', 'groceries', ['milk', 'curd', 'paneer', 'butter milk', 'cheese', 'ghee', 'yogurt']),
+    ('bakery', 'groceries', ['bread', 'bun', 'cake', 'rusk']),
+    ('noodles', 'groceries', ['noodles', 'maggi', 'pasta']),
+    ('snacks', 'groceries', ['chips', 'namkeen', 'biscuit', 'biscuits', 'cookies']),
+    ('beverages', 'groceries', ['cola', 'juice', 'tea', 'coffee', 'drink', 'soda']),
+    ('staples', 'groceries', ['rice', 'atta', 'flour', 'dal', 'sugar', 'salt', 'oil']),
+    ('fruits & vegetables', 'groceries', ['banana', 'bananas', 'onion', 'onions', 'tomato', 'tomatoes', 'potato', 'potatoes']),
+    ('smartwatches', 'electronics', ['watch', 'smartwatch', 'fitness tracker', 'fitbit']),
+    ('tablets', 'electronics', ['ipad', 'tablet', 'galaxy tab']),
+    ('smartphones', 'electronics', ['iphone', 'galaxy', 'smartphone', 'phone', 'mobile', 'pixel']),
+    ('laptops', 'electronics', ['laptop', 'macbook', 'notebook', 'xps']),
+    ('headphones', 'electronics', ['headphones', 'headphone', 'earbuds', 'earphones', 'headset']),
+    ('cameras', 'electronics', ['camera', 'dslr', 'eos']),
+    ('televisions', 'electronics', ['tv', 'oled', 'qled', 'television']),
+    ('footwear', 'fashion', ['shoes', 'shoe', 'sneakers', 'sneaker', 'air jordan', 'air force', 'ultraboost', 'chuck taylor', 'boots', 'sandals']),
+    ('clothing', 'fashion', ['t shirt', 'tshirt', 'shirt', 'jeans', 'dress', 'blazer', 'jacket', 'polo', 'shorts', 'kurta']),
+    ('appliances', 'home', ['air fryer', 'induction', 'refrigerator', 'fridge', 'mixer', 'grinder', 'washing machine', 'microwave']),
+    ('kitchenware', 'home', ['cooker', 'dinner set', 'cookware', 'kadai', 'pan']),
+    ('furniture', 'home', ['bed', 'table', 'chair', 'sofa', 'wardrobe']),
+    ('fitness', 'sports', ['treadmill', 'dumbbell', 'dumbbells', 'resistance bands', 'yoga', 'gym']),
+    ('sports equipment', 'sports', ['football', 'basketball', 'racket', 'bat', 'gloves', 'shuttlecock']),
+]
+
+CATEGORY_DEPARTMENTS = {category: department for category, department, _ in CATEGORY_RULES}
+DEPARTMENTS = set(CATEGORY_DEPARTMENTS.values())
+
+# Platform feeds that only carry one department, used when no rule matches
+PLATFORM_DEPARTMENTS = {
+    'blinkit': 'groceries', 'zepto': 'groceries', 'instamart': 'groceries', 'bigbasket': 'groceries',
+    'nykaa': 'beauty', 'beauty_nykaa': 'beauty',
+    'myntra': 'fashion', 'ajio': 'fashion', 'fashion_myntra': 'fashion',
+    'electronics_amazon': 'electronics', 'home_kitchen': 'home', 'sports_fitness': 'sports',
+}
+
+# Pack sizes only make sense for consumables
+PACK_SIZE_DEPARTMENTS = {'groceries', 'beauty'}
+
+# Unit prices are quoted per 100 g, per 100 ml or per piece
+UNIT_PRICE_BASIS = {'g': 100.0, 'ml': 100.0, 'pc': 1.0}
+
+_UNITS = {
+    'kg': ('g', 1000.0), 'kgs': ('g', 1000.0),
+    'g': ('g', 1.0), 'gm': ('g', 1.0), 'gms': ('g', 1.0), 'gram': ('g', 1.0), 'grams': ('g', 1.0),
+    'mg': ('g', 0.001),
+    'l': ('ml', 1000.0), 'ltr': ('ml', 1000.0), 'litre': ('ml', 1000.0), 'litres': ('ml', 1000.0),
+    'liter': ('ml', 1000.0), 'liters': ('ml', 1000.0),
+    'ml': ('ml', 1.0),
+    'pc': ('pc', 1.0), 'pcs': ('pc', 1.0), 'piece': ('pc', 1.0), 'pieces': ('pc', 1.0),
+}
+
+_PACK_RE = re.compile(
+    r'(?:(\d+)\s*[x×]\s*)?(\d+(?:\.\d+)?)\s*(' + '|'.join(sorted(_UNITS, key=len, reverse=True)) + r')\b',
+    re.IGNORECASE
+)
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_BRAND_KEY_RE = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_text(text):
+    """Lowercase text and collapse it to space-separated alphanumeric tokens"""
+    return ' '.join(_WORD_RE.findall(str(text or '').lower()))
+
+
+def brand_key(brand):
+    """Comparable brand key ("Levi's" -> 'levis', 'H&M' -> 'hm')"""
+    return _BRAND_KEY_RE.sub('', str(brand or '').lower())
+
+
+def parse_pack_size(name):
+    """Parse pack size from a product name; returns (quantity, base_unit) or (None, None)"""
+    match = _PACK_RE.search(name or '')
+    if not match:
+        return None, None
+
+    multiplier = int(match.group(1)) if match.group(1) else 1
+    unit, scale = _UNITS[match.group(3).lower()]
+    quantity = float(match.group(2)) * scale * multiplier
+    if quantity <= 0:
+        return None, None
+    return round(quantity, 3), unit
+
+
+def unit_price(price, pack_size, pack_unit):
+    """Price per UNIT_PRICE_BASIS of the pack unit; returns (price_per_unit, basis label)"""
+    basis = UNIT_PRICE_BASIS[pack_unit]
+    return round(price / pack_size * basis, 4), f"{basis:g}{pack_unit}"
+
+
+def strip_pack_size(text):
+    """Remove pack-size mentions ('1L', '6 x 200ml') from text"""
+    return ' '.join(_PACK_RE.sub(' ', text or '').split())
+
+
+class ProductEnricher:
+    """Adds derived category, brand, pack size and search fields to normalized products"""
+
+    def __init__(self, rules=None):
+        self.rules = rules or CATEGORY_RULES
+
+    def infer_category(self, name_key, platform=None):
+        """Infer (category, department) from a normalized product name"""
+        padded = f" {name_key} "
+        for category, department, phrases in self.rules:
+            if any(f" {phrase} " in padded for phrase in phrases):
+                return category, department
+
+        department = PLATFORM_DEPARTMENTS.get(platform or '', 'general')
+        return department, department
+
+    def normalize_brand(self, brand, name):
+        """Tidy brand casing, falling back to the first word of the name"""
+        brand = ' '.join(str(brand or '').split())
+        if not brand:
+            words = str(name or '').split()
+            brand = words[0] if words else ''
+        if brand and (brand.islower() or (brand.isupper() and len(brand) > 4)):
+            brand = brand.title()
+        return brand
+
+    def enrich(self, product):
+        """Enrich a product in place (no-op if already enriched at this version)"""
+        if product.get('enriched') == ENRICHMENT_VERSION:
+            return product
+
+        name = product.get('product_name', '')
+        name_key = normalize_text(name)
+        platform = product.get('platform')
+
+        category, department = self.infer_category(name_key, platform)
+        if product.get('category'):
+            category = str(product['category']).strip().lower()
+            if category in DEPARTMENTS:
+                department = category
+            else:
+                department = CATEGORY_DEPARTMENTS.get(category, department)
+
+        brand = self.normalize_brand(product.get('brand'), name)
+
+        product['category'] = category
+        product['department'] = department
+        product['brand'] = brand
+        product['brand_key'] = brand_key(brand)
+        product['name_key'] = name_key
+
+        if department in PACK_SIZE_DEPARTMENTS:
+            pack_size, pack_unit = parse_pack_size(name)
+            if pack_size:
+                product['pack_size'] = pack_size
+                product['pack_unit'] = pack_unit
+                if product.get('price') is not None:
+                    product['price_per_unit'], product['unit_basis'] = unit_price(
+                        float(product['price']), pack_size, pack_unit
+                    )
+                    # Same product in any pack size, for per-unit comparisons
+                    product['unit_key'] = f"{product['brand_key']}|{strip_pack_size(name_key)}"
+
+        product['search_text'] = ' '.join(
+            part for part in (name_key, normalize_text(brand), normalize_text(category)) if part
+        )
+        product['enriched'] = ENRICHMENT_VERSION
+        return product
@@ -1,15 +1,18 @@
 from data_sources.dataset_source import DatasetSource
 from data_sources.api_source import APISource
+from data_sources.sqlite_source import SQLiteSource
 
 class SourceManager:
-    def __init__(self, data_source='dataset', api_key=None):
+    def __init__(self, data_source='dataset', api_key=None, db_path=None, datasets_dir=None):
         self.data_source = data_source
         if data_source == 'dataset':
-            self.source = DatasetSource()
+            self.source = DatasetSource(datasets_dir)
         elif data_source == 'api':
             self.source = APISource(api_key)
+        elif data_source == 'sqlite':
+            self.source = SQLiteSource(db_path, datasets_dir)
         else:
-            raise ValueError("Invalid data source. Choose 'dataset' or 'api'.")
+            raise ValueError("Invalid data source. Choose 'dataset', 'api' or 'sqlite'.")
 
     def search_products(self, query, platform=None):
         """Unified method to search products regardless of source."""
@@ -19,27 +22,41 @@ class SourceManager:
         """Unified method to load products regardless of source."""
         return self.source.load_products(platform)
 
+    def get_catalog_version(self):
+        """Version marker of the underlying catalog, or None if the source cannot tell."""
+        if hasattr(self.source, 'get_catalog_version'):
+            return self.source.get_catalog_version()
+        return None
+
+    def refresh_catalog(self):
+        """Re-import changed feeds into sources that keep their own copy (SQLite); True if it did."""
+        if hasattr(self.source, 'refresh'):
+            return self.source.refresh()
+        return False
+
     def get_all_platforms(self):
         """Get list of all available platforms."""
         if hasattr(self.source, 'get_platforms'):
             return self.source.get_platforms()
         return ['blinkit', 'zepto', 'instamart', 'bigbasket', 'flipkart', 'amazon', 'ajio', 'myntra', 'meesho', 'shopsy', 'nykaa']
     
-    def get_all_products(self):
-        """Get all products from all platforms."""
-        all_products = []
-        platforms = self.get_all_platforms()
-        
-        for platform in platforms:
+    def iter_all_products(self):
+        """Stream products from all platforms, one at a time (the catalog is never held as a list)."""
+        for platform in self.get_all_platforms():
             try:
-                products = self.load_products(platform)
-                # Add platform info to each product if not already present
+                if hasattr(self.source, 'iter_products'):
+                    products = self.source.iter_products(platform)
+                else:
+                    products = self.load_products(platform)
                 for product in products:
+                    # Add platform info to each product if not already present
                     if 'platform' not in product:
                         product['platform'] = platform
-                all_products.extend(products)
+                    yield product
             except Exception as e:
-                # Silently skip platforms with no data
-                pass
-        
-        return all_products
+                # Skip the rest of a platform that fails to load
+                print(f"⚠ Could not load {platform} products: {e}")
+    
+    def get_all_products(self):
+        """Get all products from all platforms."""
+        return list(self.iter_all_products())
@@ -0,0 +1,259 @@
+"""
+SQLite Data Source
+Serves products from an on-disk SQLite catalog with FTS5 full-text search,
+so catalogs larger than RAM can be queried locally and shared across processes.
+
+Searches (search_products) run on disk. Catalog generations (IndexRebuildManager)
+stream rows through iter_products but still build an in-memory CatalogIndex, so
+the index rebuild, not this source, bounds the catalog size the app can serve.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+from data_sources.dataset_source import DatasetSource, feed_fingerprint
+from data_sources.stream_ingest import StreamIngestor
+from data_sources.enrichment import ENRICHMENT_VERSION
+
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_CORE_COLUMNS = ('product_name', 'brand', 'price', 'category', 'platform', 'image_url')
+_INSERT_BATCH = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    product_name TEXT NOT NULL,
+    brand TEXT NOT NULL DEFAULT '',
+    price REAL NOT NULL,
+    category TEXT NOT NULL DEFAULT '',
+    platform TEXT NOT NULL DEFAULT '',
+    image_url TEXT NOT NULL DEFAULT '',
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_products_price ON products(price);
+CREATE INDEX IF NOT EXISTS idx_products_platform ON products(platform, price);
+CREATE INDEX IF NOT EXISTS idx_products_category ON products(category, price);
+CREATE TABLE IF NOT EXISTS catalog_meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    product_name, brand, category,
+    content='products', content_rowid='id', prefix='2 3'
+);
+"""
+
+
+class _SQLiteCatalogWriter:
+    """Ingest sink that batches normalized products into the products table"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.batch = []
+        self.version = None
+
+    def add_product(self, product):
+        extra = {k: v for k, v in product.items() if k not in _CORE_COLUMNS}
+        self.batch.append((
+            product['product_name'], product.get('brand', ''), product['price'],
+            product.get('category', ''), product.get('platform', ''),
+            product.get('image_url', ''), json.dumps(extra) if extra else None
+        ))
+        if len(self.batch) >= _INSERT_BATCH:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.conn.executemany(
+                "INSERT INTO products (product_name, brand, price, category, platform, image_url, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", self.batch
+            )
+            self.batch = []
+
+    def finalize(self):
+        self.flush()
+
+
+class SQLiteSource:
+    def __init__(self, db_path=None, datasets_dir=None):
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.datasets_dir = datasets_dir or os.path.join(base_dir, 'datasets')
+        self.db_path = db_path or os.environ.get('SQLITE_DB_PATH') or os.path.join(self.datasets_dir, 'catalog.sqlite3')
+        self.has_fts = True
+        self._local = threading.local()
+        self._import_lock = threading.Lock()
+        # Same feed files as the dataset backend, so switching backends keeps the catalog
+        self._feeds = DatasetSource(self.datasets_dir)
+
+        self.refresh()
+        self.has_fts = self._table_exists('products_fts')
+
+    def feed_paths(self):
+        return self._feeds.feed_paths()
+
+    def is_stale(self):
+        """True if the database is missing or was imported from other feeds or enrichment"""
+        return (not os.path.exists(self.db_path)
+                or self.get_meta('enrichment_version') != str(ENRICHMENT_VERSION)
+                or self.get_meta('feed_fingerprint') != feed_fingerprint(self.feed_paths()))
+
+    def refresh(self):
+        """Re-import the feeds if they changed since the last import; returns True if it did.
+
+        Runs at startup and from the catalog refresh scheduler, never from version checks.
+        """
+        with self._import_lock:
+            if not self.is_stale():
+                return False
+            self.import_datasets()
+            return True
+
+    def _connect(self, path=None):
+        conn = sqlite3.connect(path or self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    @property
+    def conn(self):
+        """Per-thread connection so Flask worker threads never share a cursor"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def _table_exists(self, name):
+        row = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = ?", (name,)
+        ).fetchone()
+        return row is not None
+
+    def get_meta(self, key):
+        """Read a catalog metadata value"""
+        if not self._table_exists('catalog_meta'):
+            return None
+        row = self.conn.execute("SELECT value FROM catalog_meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def get_catalog_version(self):
+        """Change marker for the database file (rewritten atomically on import), or None if missing.
+
+        A stat only: feed changes are picked up by refresh(), whose re-import replaces the file.
+        """
+        try:
+            stat = os.stat(self.db_path)
+        except OSError:
+            return None
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def import_datasets(self, paths=None):
+        """Import dataset feeds into a fresh database and swap it in atomically"""
+        paths = paths if paths is not None else self.feed_paths()
+        fingerprint = feed_fingerprint(paths)  # taken before reading: edits during import re-import later
+        tmp_path = f"{self.db_path}.{os.getpid()}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript(_SCHEMA)
+            try:
+                conn.executescript(_FTS_SCHEMA)
+                has_fts = True
+            except sqlite3.OperationalError:
+                print("⚠ SQLite FTS5 not available. Falling back to LIKE search.")
+                has_fts = False
+
+            writer = _SQLiteCatalogWriter(conn)
+            stats = StreamIngestor(index=writer).run(paths)
+
+            if has_fts:
+                conn.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+            conn.execute("INSERT OR REPLACE INTO catalog_meta VALUES ('product_count', ?)",
+                         (str(stats['accepted']),))
+            conn.execute("INSERT OR REPLACE INTO catalog_meta VALUES ('enrichment_version', ?)",
+                         (str(ENRICHMENT_VERSION),))
+            conn.execute("INSERT OR REPLACE INTO catalog_meta VALUES ('feed_fingerprint', ?)",
+                         (fingerprint,))
+            conn.commit()
+            conn.execute("VACUUM")
+        except BaseException:
+            conn.close()
+            os.remove(tmp_path)
+            raise
+        conn.close()
+
+        os.replace(tmp_path, self.db_path)
+
+        # Existing connections still point at the replaced file
+        self._local = threading.local()
+        self.has_fts = has_fts
+        print(f"✓ Imported {stats['accepted']} products into {os.path.basename(self.db_path)}")
+        return stats
+
+    def _row_to_product(self, row):
+        product = {
+            'product_name': row['product_name'],
+            'brand': row['brand'],
+            'price': row['price'],
+            'image_url': row['image_url'],
+            'platform': row['platform'],
+        }
+        if row['category']:
+            product['category'] = row['category']
+        if row['extra']:
+            product.update(json.loads(row['extra']))
+        return product
+
+    def iter_products(self, platform):
+        """Stream products for a platform in insertion order"""
+        cursor = self.conn.execute(
+            "SELECT * FROM products WHERE platform = ? ORDER BY id", (platform,)
+        )
+        for row in cursor:
+            yield self._row_to_product(row)
+
+    def load_products(self, platform):
+        """Load products for a specific platform."""
+        return list(self.iter_products(platform))
+
+    def iter_search(self, query, platform=None, limit=None):
+        """Stream products matching any query word (prefix match on name, brand, category)"""
+        tokens = _TOKEN_RE.findall(query.lower())
+        if not tokens:
+            return
+
+        params = []
+        if self.has_fts:
+            sql = ("SELECT p.* FROM products_fts f JOIN products p ON p.id = f.rowid "
+                   "WHERE products_fts MATCH ?")
+            params.append(' OR '.join(f'"{token}"*' for token in tokens))
+        else:
+            clauses = []
+            for token in tokens:
+                clauses.append("(lower(p.product_name) LIKE ? OR lower(p.brand) LIKE ? OR p.category LIKE ?)")
+                params.extend([f'%{token}%'] * 3)
+            sql = f"SELECT p.* FROM products p WHERE ({' OR '.join(clauses)})"
+
+        if platform:
+            sql += " AND p.platform = ?"
+            params.append(platform)
+        sql += " ORDER BY p.id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        for row in self.conn.execute(sql, params):
+            yield self._row_to_product(row)
+
+    def search_products(self, query, platform=None, limit=None):
+        """Search products by name, brand and category using the FTS5 index."""
+        return list(self.iter_search(query, platform, limit))
+
+    def get_platforms(self):
+        rows = self.conn.execute("SELECT DISTINCT platform FROM products ORDER BY platform")
+        return [row['platform'] for row in rows]
@@ -0,0 +1,404 @@
+"""
+Streaming Ingestion for Platform Feeds
+Parses JSON array, NDJSON and CSV product feeds incrementally with bounded memory,
+validates, normalizes and enriches each product, and writes it to the catalog index and snapshot
+"""
+import csv
+import json
+import os
+import time
+from data_sources.enrichment import ProductEnricher
+
+
+CHUNK_SIZE = 64 * 1024  # characters read per feed chunk
+MAX_RECORD_SIZE = 16 * 1024 * 1024  # largest single product record accepted
+FEED_EXTENSIONS = ('.json', '.ndjson', '.jsonl', '.csv')
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+def _scan_value(buf, start, state=(0, False, False)):
+    """Find where the array element starting at buf[start] ends, without decoding it.
+
+    Only brackets and strings are tracked, so malformed elements can be delimited
+    (and skipped) too. Returns (end, state): end is the index of the ',' or ']'
+    after the element, or None if buf ends first; pass state back to resume the
+    scan on the following data.
+    """
+    depth, in_string, escaped = state
+    for i in range(start, len(buf)):
+        ch = buf[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '[{':
+            depth += 1
+        elif ch in ']}':
+            if depth == 0:
+                if ch == ']':
+                    return i, None
+            else:
+                depth -= 1
+        elif ch == ',' and depth == 0:
+            return i, None
+    return None, (depth, in_string, escaped)
+
+
+def iter_json_array(fp, chunk_size=CHUNK_SIZE):
+    """Yield elements of a top-level JSON array without loading the whole file.
+
+    Malformed, oversized or truncated elements yield None (as malformed NDJSON
+    lines do) and parsing resumes at the next element.
+    """
+    buf = ''
+    pos = 0
+    eof = False
+    started = False
+
+    while True:
+        # Skip whitespace and element separators
+        while pos < len(buf) and buf[pos] in _WHITESPACE + ',':
+            if buf[pos] == ',' and not started:
+                raise ValueError("Malformed JSON feed: expected '['")
+            pos += 1
+
+        if pos >= len(buf):
+            if eof:
+                if not started:
+                    return
+                raise ValueError("Malformed JSON feed: unterminated array")
+            chunk = fp.read(chunk_size)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+
+        if not started:
+            if buf[pos] != '[':
+                raise ValueError("Malformed JSON feed: expected '['")
+            started = True
+            pos += 1
+            continue
+
+        if buf[pos] == ']':
+            return
+
+        try:
+            value, end = _decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            value, end = None, None
+
+        if end is None:
+            # Undecodable: either malformed or cut off at the buffer edge
+            end, _ = _scan_value(buf, pos)
+            if end is not None:
+                print("⚠ Skipping malformed record in JSON feed")
+                yield None
+                pos = end
+                continue
+            truncated = True
+        else:
+            # A value ending exactly at the buffer edge may be truncated; read more first.
+            # Numbers and literals carry no closing delimiter: "2." decodes as 2, so they
+            # only count as complete once a separator follows them
+            truncated = not eof and (
+                end == len(buf)
+                or (not isinstance(value, (str, dict, list)) and buf[end] not in _WHITESPACE + ',]')
+            )
+
+        if truncated:
+            if eof:
+                print("⚠ Skipping truncated record at the end of JSON feed")
+                yield None
+                return
+            if len(buf) - pos > MAX_RECORD_SIZE:
+                print("⚠ Skipping JSON feed record larger than the maximum record size")
+                yield None
+                # Discard the record as it streams past, then resume after it
+                end, state = _scan_value(buf, pos)
+                while end is None:
+                    buf = fp.read(chunk_size)
+                    if not buf:
+                        return
+                    end, state = _scan_value(buf, 0, state)
+                pos = end
+                continue
+            chunk = fp.read(chunk_size)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+
+        yield value
+        pos = end
+
+        # Compact the buffer so memory stays proportional to the chunk size
+        if pos > chunk_size:
+            buf = buf[pos:]
+            pos = 0
+
+
+def iter_ndjson(fp):
+    """Yield one record per non-empty line; malformed lines yield None"""
+    for line in fp:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def iter_csv(fp):
+    """Yield one dict per CSV row keyed by the header"""
+    for row in csv.DictReader(fp):
+        yield row
+
+
+def detect_format(path):
+    """Detect feed format from extension, sniffing .json files for NDJSON"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    if ext == '.csv':
+        return 'csv'
+
+    with open(path, 'r', encoding='utf-8') as f:
+        while True:
+            ch = f.read(1)
+            if not ch or ch not in _WHITESPACE:
+                break
+    return 'ndjson' if ch == '{' else 'json'
+
+
+def iter_feed(path, fmt=None, chunk_size=CHUNK_SIZE):
+    """Yield raw records from a feed file of any supported format"""
+    fmt = fmt or detect_format(path)
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if fmt == 'ndjson':
+            yield from iter_ndjson(f)
+        elif fmt == 'csv':
+            yield from iter_csv(f)
+        else:
+            yield from iter_json_array(f, chunk_size)
+
+
+def platform_from_path(path):
+    """Derive platform name from a feed filename (e.g. 'amazon_products.json' -> 'amazon')"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    if name.endswith('_products'):
+        name = name[:-len('_products')]
+    return name
+
+
+def _parse_price(value):
+    """Parse numeric or formatted ('₹1,299') price values"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        cleaned = value.replace(',', '').replace('₹', '').replace('Rs.', '').strip()
+        try:
+            return float(cleaned)
+        except ValueError:
+            return None
+    return None
+
+
+def normalize_product(raw, platform=None):
+    """Validate and normalize a raw feed record; returns None if it is unusable"""
+    if not isinstance(raw, dict):
+        return None
+
+    name = str(raw.get('product_name') or raw.get('name') or '').strip()
+    if not name:
+        return None
+
+    price = _parse_price(raw.get('price'))
+    if price is None or price < 0 or price != price:
+        return None
+
+    product = {k: v for k, v in raw.items() if v not in (None, '')}
+    product.pop('name', None)
+    product['product_name'] = ' '.join(name.split())
+    product['brand'] = ' '.join(str(raw.get('brand') or '').split())
+    product['price'] = price
+    product['image_url'] = str(raw.get('image_url') or '')
+
+    category = raw.get('category')
+    if category:
+        product['category'] = str(category).strip().lower()
+
+    if platform and 'platform' not in product:
+        product['platform'] = platform
+
+    return product
+
+
+class SnapshotWriter:
+    """Write normalized products as NDJSON, replacing the target atomically on close"""
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(self.tmp_path, 'w', encoding='utf-8')
+        self.count = 0
+
+    def write(self, product):
+        self._file.write(json.dumps(product, ensure_ascii=False))
+        self._file.write('\n')
+        self.count += 1
+
+    def close(self):
+        """Flush and publish the snapshot"""
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Discard a partially written snapshot"""
+        self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class IngestStats:
+    """Counters and throughput for an ingest run"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.read = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.files = 0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started_at
+
+    @property
+    def rate(self):
+        elapsed = self.elapsed
+        return self.read / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self):
+        return {
+            'files': self.files,
+            'read': self.read,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'products_per_second': round(self.rate, 1),
+        }
+
+
+class StreamIngestor:
+    """Stream feeds into a CatalogIndex and/or an NDJSON snapshot"""
+
+    def __init__(self, index=None, snapshot_path=None, progress_every=10000,
+                 progress_callback=None, chunk_size=CHUNK_SIZE, enricher=None):
+        self.index = index
+        self.snapshot_path = snapshot_path
+        self.progress_every = progress_every
+        self.progress_callback = progress_callback
+        self.chunk_size = chunk_size
+        self.enricher = enricher or ProductEnricher()
+        self.stats = IngestStats()
+        self._snapshot = None
+
+    def _report_progress(self):
+        stats = self.stats.to_dict()
+        if self.progress_callback:
+            self.progress_callback(stats)
+        else:
+            print(f"  ... {stats['read']} read, {stats['accepted']} accepted "
+                  f"({stats['products_per_second']:.0f}/s)")
+
+    def _sink(self, product):
+        if self.index is not None:
+            self.index.add_product(product)
+        if self._snapshot is not None:
+            self._snapshot.write(product)
+
+    def ingest_records(self, records, platform=None):
+        """Normalize and store an iterable of raw records"""
+        for raw in records:
+            self.stats.read += 1
+            product = normalize_product(raw, platform)
+            if product is None:
+                self.stats.rejected += 1
+            else:
+                self.stats.accepted += 1
+                self._sink(self.enricher.enrich(product))
+
+            if self.progress_every and self.stats.read % self.progress_every == 0:
+                self._report_progress()
+
+    def ingest_file(self, path, platform=None, fmt=None):
+        """Ingest a single feed file"""
+        platform = platform or platform_from_path(path)
+        self.ingest_records(iter_feed(path, fmt, self.chunk_size), platform)
+        self.stats.files += 1
+
+    def run(self, paths):
+        """Ingest feed files in order, then finalize the index and snapshot"""
+        if self.snapshot_path:
+            self._snapshot = SnapshotWriter(self.snapshot_path)
+
+        try:
+            for path in paths:
+                try:
+                    self.ingest_file(path)
+                except (OSError, ValueError) as e:
+                    print(f"⚠ Skipping feed {os.path.basename(path)}: {e}")
+        except BaseException:
+            if self._snapshot is not None:
+                self._snapshot.abort()
+                self._snapshot = None
+            raise
+
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+        if self.index is not None:
+            self.index.finalize()
+
+        stats = self.stats.to_dict()
+        print(f"✓ Ingested {stats['accepted']} products from {stats['files']} feeds "
+              f"({stats['rejected']} rejected, {stats['products_per_second']:.0f}/s)")
+        return stats
+
+
+def find_feeds(directory):
+    """List feed files in a directory in a stable order"""
+    if not os.path.isdir(directory):
+        return []
+    return [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if name.lower().endswith(FEED_EXTENSIONS)
+    ]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Stream product feeds into a catalog snapshot')
+    parser.add_argument('feeds', nargs='+', help='Feed files or directories')
+    parser.add_argument('--snapshot', help='Path of the NDJSON snapshot to write')
+    args = parser.parse_args()
+
+    paths = []
+    for feed in args.feeds:
+        paths.extend(find_feeds(feed) if os.path.isdir(feed) else [feed])
+
+    StreamIngestor(snapshot_path=args.snapshot).run(paths)
@@ -53,6 +53,9 @@ NLP = {
     'word_embeddings_path': os.path.join(PRETRAINED_DIR, 'word_embeddings.bin'),
     'vocabulary_path': os.path.join(PRETRAINED_DIR, 'vocabulary.pkl'),
     'tfidf_vectorizer_path': os.path.join(PRETRAINED_DIR, 'tfidf_vectorizer.pkl'),
+    'tfidf_matrix_path': os.path.join(PRETRAINED_DIR, 'tfidf_matrix'),  # prefix for memory-mapped .npy arrays
+    'ann_index_path': os.path.join(PRETRAINED_DIR, 'ann_index'),  # prefix for memory-mapped .npy arrays
+    'nltk_data_dir': os.path.join(MODELS_DIR, 'nltk_data'),  # bundled punkt/stopwords/wordnet; never downloaded at runtime
     'max_query_length': 100,
     'embedding_dim': 300,
     'use_spell_correction': True,
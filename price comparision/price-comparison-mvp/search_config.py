@@ -35,6 +35,16 @@ ROTATE_USER_AGENTS = True
 ENABLE_CACHING = True
 CACHE_DURATION = 3600  # 1 hour in seconds
 
+# INDEX REBUILDS
+# How often (seconds) to check the catalog for changes and rebuild indexes in the background
+INDEX_REFRESH_INTERVAL = 300
+CATEGORY_PAGE_SIZE = 24  # Products per category page
+FEED_REFRESH_INTERVAL = 300  # seconds between checks for changed feeds to re-import (SQLite source)
+
+# PRICE CHECKS
+# How often (hours) watched products are re-scraped into the best-price index
+PRICE_CHECK_INTERVAL_HOURS = 1
+
 # API KEYS (for future API integration)
 # Get these from respective platforms
 API_KEYS = {
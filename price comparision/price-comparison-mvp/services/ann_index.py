@@ -0,0 +1,155 @@
+"""
+Approximate Nearest-Neighbour Index
+Inverted-file (IVF) index over L2-normalized product embeddings: a spherical
+k-means coarse quantizer partitions the vectors, and a query scores only the
+vectors in its n_probe closest partitions instead of the whole catalog
+"""
+import math
+import numpy as np
+
+
+N_PROBE = 8  # partitions scanned per query
+KMEANS_ITERATIONS = 10
+TRAINING_POINTS_PER_LIST = 64  # k-means sample size per partition
+EXACT_BELOW = 2048  # smaller catalogs use a single partition (exact search)
+
+
+def normalize_rows(vectors):
+    """L2-normalize rows (zero rows stay zero) as float32"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores, k):
+    """Indices of the k largest scores, best first"""
+    if k <= 0 or not len(scores):
+        return np.empty(0, dtype=np.int64)
+    if len(scores) > k:
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+class IVFIndex:
+    """Cosine-similarity ANN index; item IDs are row numbers of the indexed matrix"""
+
+    ARRAYS = ('centroids', 'vectors', 'ids', 'offsets', 'positions')  # complete persisted state
+
+    def __init__(self, n_lists=None, n_probe=N_PROBE, seed=0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.seed = seed
+        self.centroids = None  # n_lists x dim
+        self.vectors = None  # vectors grouped by partition
+        self.ids = None  # item ID of each row in self.vectors
+        self.offsets = None  # partition p occupies rows offsets[p]:offsets[p + 1]
+        self.positions = None  # item ID -> row in self.vectors
+
+    def __len__(self):
+        return 0 if self.ids is None else len(self.ids)
+
+    @classmethod
+    def from_arrays(cls, arrays, n_probe=N_PROBE):
+        """Rebuild an index from its ARRAYS (e.g. memory-mapped .npy files)"""
+        index = cls(n_lists=len(arrays['centroids']), n_probe=n_probe)
+        for name in cls.ARRAYS:
+            setattr(index, name, arrays[name])
+        return index
+
+    def build(self, vectors):
+        """Partition the vectors (rows are item IDs 0..n-1); returns self"""
+        vectors = normalize_rows(vectors)
+        n = len(vectors)
+        n_lists = self.n_lists
+        if n_lists is None:
+            n_lists = 1 if n < EXACT_BELOW else min(int(math.sqrt(n)), 4096)
+        n_lists = max(min(n_lists, n), 1)
+
+        self.centroids = self._train(vectors, n_lists)
+        assignments = self._assign(vectors)
+        order = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=len(self.centroids))
+
+        self.vectors = np.ascontiguousarray(vectors[order])
+        self.ids = order.astype(np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self.positions = np.empty(n, dtype=np.int64)
+        self.positions[order] = np.arange(n)
+        return self
+
+    def _train(self, vectors, n_lists):
+        """Spherical k-means on a sample of the vectors"""
+        rng = np.random.default_rng(self.seed)
+        if n_lists == 1:
+            return normalize_rows(vectors.mean(axis=0, keepdims=True))
+        sample_size = min(len(vectors), n_lists * TRAINING_POINTS_PER_LIST)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = np.bincount(labels, minlength=n_lists) == 0
+            # Re-seed empty partitions with random sample points
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            centroids = normalize_rows(sums)
+        return centroids
+
+    def _assign(self, vectors, batch_size=65536):
+        labels = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), batch_size):
+            labels[start:start + batch_size] = np.argmax(vectors[start:start + batch_size] @ self.centroids.T, axis=1)
+        return labels
+
+    def _candidate_rows(self, query, n_probe):
+        n_lists = len(self.centroids)
+        if n_probe >= n_lists:
+            return None  # every partition: scan all rows
+        probed = _top_k(self.centroids @ query, n_probe)
+        return np.concatenate([np.arange(self.offsets[p], self.offsets[p + 1]) for p in probed])
+
+    def search(self, query, k=10, n_probe=None, exclude=None):
+        """Approximate top-k item IDs by cosine similarity; returns (ids, scores)"""
+        if not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = normalize_rows(query).ravel()
+        rows = self._candidate_rows(query, n_probe or self.n_probe)
+        scores = self.vectors @ query if rows is None else self.vectors[rows] @ query
+        ids = self.ids if rows is None else self.ids[rows]
+
+        if exclude is not None:
+            keep = ~np.isin(ids, np.fromiter(exclude, dtype=np.int64))
+            ids, scores = ids[keep], scores[keep]
+        top = _top_k(scores, k)
+        return ids[top], scores[top]
+
+    def vector(self, item_id):
+        return self.vectors[self.positions[item_id]]
+
+    def search_item(self, item_id, k=10, n_probe=None):
+        """Nearest neighbours of an indexed item (the item itself excluded)"""
+        return self.search(self.vector(item_id), k, n_probe, exclude=(item_id,))
+
+    def brute_force(self, query, k=10):
+        """Exact top-k over every vector (the recall baseline)"""
+        return self.search(query, k, n_probe=len(self.centroids))
+
+    def recall_at_k(self, k=10, sample=200, n_probe=None, seed=0):
+        """Mean recall@k of search against brute force, using indexed items as queries"""
+        if not len(self):
+            return 1.0
+        rng = np.random.default_rng(seed)
+        queries = rng.choice(len(self), min(sample, len(self)), replace=False)
+        found = 0
+        expected = 0
+        for item_id in queries:
+            vector = self.vector(item_id)
+            exact = set(self.brute_force(vector, k)[0].tolist())
+            approx = set(self.search(vector, k, n_probe)[0].tolist())
+            found += len(exact & approx)
+            expected += len(exact)
+        return found / expected if expected else 1.0
@@ -0,0 +1,92 @@
+"""
+Autocomplete Index
+Prefix table with precomputed top-k completions per prefix, ranked by popularity,
+plus a trigram index for substring fallback, so a keystroke costs dictionary
+lookups instead of a scan over every product name
+"""
+import bisect
+from collections import defaultdict
+from data_sources.enrichment import normalize_text
+
+
+PREFIX_DEPTH = 24  # prefixes up to this length have precomputed top-k lists
+GRAM_SIZE = 3  # substring fallback n-gram size
+TOP_K = 10
+
+
+class AutocompleteIndex:
+    """Completions for a partial query, most popular first"""
+
+    def __init__(self, weights, display=None, top_k=TOP_K):
+        """
+        Args:
+            weights: normalized suggestion text -> popularity weight
+            display: normalized text -> text to show (defaults to the normalized text)
+            top_k: completions precomputed per prefix
+        """
+        display = display or {}
+        self.top_k = top_k
+        # Rank = position in popularity order, so lower ranks are better suggestions
+        self.keys = sorted(weights, key=lambda key: (-weights[key], key))
+        self.display = [display.get(key, key) for key in self.keys]
+        self._sorted_ranks = sorted(range(len(self.keys)), key=self.keys.__getitem__)
+        self._sorted_keys = [self.keys[rank] for rank in self._sorted_ranks]
+
+        prefix_top = {}  # prefix -> ranks of suggestions starting with it
+        word_top = {}  # short prefix -> ranks of suggestions with a later word starting with it
+        grams = defaultdict(list)  # n-gram -> ranks of suggestions containing it (ascending)
+        for rank, key in enumerate(self.keys):
+            self._add_prefixes(prefix_top, key, rank)
+            # Longer substrings are served by the n-gram index
+            for word in set(key.split()[1:]):
+                self._add_prefixes(word_top, word[:GRAM_SIZE - 1], rank)
+            for gram in {key[i:i + GRAM_SIZE] for i in range(len(key) - GRAM_SIZE + 1)}:
+                grams[gram].append(rank)
+
+        self._prefix_top = {prefix: tuple(ranks) for prefix, ranks in prefix_top.items()}
+        self._word_top = {prefix: tuple(ranks) for prefix, ranks in word_top.items()}
+        self._grams = {gram: tuple(ranks) for gram, ranks in grams.items()}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _add_prefixes(self, table, text, rank):
+        # Suggestions arrive best-first, so the first top_k per prefix are its top-k
+        for end in range(1, min(len(text), PREFIX_DEPTH) + 1):
+            ranks = table.setdefault(text[:end], [])
+            if len(ranks) < self.top_k and (not ranks or ranks[-1] != rank):
+                ranks.append(rank)
+
+    def _prefix_matches(self, prefix, limit):
+        if len(prefix) <= PREFIX_DEPTH and limit <= self.top_k:
+            return self._prefix_top.get(prefix, ())[:limit]
+        start = bisect.bisect_left(self._sorted_keys, prefix)
+        end = bisect.bisect_left(self._sorted_keys, prefix + '\uffff')
+        return sorted(self._sorted_ranks[start:end])[:limit]
+
+    def _substring_matches(self, text, limit, exclude):
+        if len(text) < GRAM_SIZE:
+            # Too short for the n-gram index: completions of later words only
+            candidates = self._word_top.get(text, ())
+        else:
+            # Walk the rarest n-gram's postings (best first) and verify the full substring
+            postings = [self._grams.get(text[i:i + GRAM_SIZE], ()) for i in range(len(text) - GRAM_SIZE + 1)]
+            candidates = min(postings, key=len)
+
+        matches = []
+        for rank in candidates:
+            if rank not in exclude and text in self.keys[rank]:
+                matches.append(rank)
+                if len(matches) >= limit:
+                    break
+        return matches
+
+    def suggest(self, partial_query, limit=TOP_K):
+        """Completions starting with the query, then (if too few) containing it"""
+        text = normalize_text(partial_query)
+        if not text:
+            return []
+        ranks = list(self._prefix_matches(text, limit))
+        if len(ranks) < limit:
+            ranks.extend(self._substring_matches(text, limit - len(ranks), set(ranks)))
+        return [self.display[rank] for rank in ranks]
@@ -0,0 +1,182 @@
+"""
+Best Price Index
+Per-cluster min-heaps of offers with lazy deletion, kept current as prices change
+through ingest, live scraping and scheduled price checks, so the cheapest offer
+for a product is an O(1) read. Live and scheduled offers expire after a TTL,
+falling back to the catalog price
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import Counter, deque
+from services.product_matcher import ProductFeatures, cluster_id_for_key
+
+
+LIVE_OFFER_TTL = 3 * 3600  # seconds a scraped price counts before it expires
+MIN_HEAP_COMPACT = 8  # heaps smaller than this are never compacted
+
+
+class BestPriceIndex:
+    """Cheapest offer per product cluster, maintained incrementally"""
+
+    def __init__(self, live_ttl=LIVE_OFFER_TTL):
+        self.live_ttl = live_ttl
+        self._heaps = {}  # cluster_id -> heap of (price, seq, offer_key)
+        self._offers = {}  # offer_key -> (price, seq, product, source, expires_at or None)
+        self._offer_counts = Counter()  # cluster_id -> offers currently in _offers
+        self._catalog = {}  # offer_key -> catalog product (restored when a live offer expires)
+        self._expiry = deque()  # (expires_at, offer_key) of live offers, oldest first
+        self._best = {}  # cluster_id -> cheapest live offer (read without the lock)
+        self._clusters_by_key = {}  # canonical product key -> catalog cluster_id
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._offers)
+
+    def resolve_cluster(self, product):
+        """Cluster ID of a product: its own, the catalog cluster it matches, or a new one"""
+        cluster_id = product.get('cluster_id')
+        if cluster_id:
+            return cluster_id
+        canonical_key = ProductFeatures(product).canonical_key
+        return self._clusters_by_key.get(canonical_key) or cluster_id_for_key(canonical_key)
+
+    def _offer_key(self, cluster_id, product):
+        return (cluster_id, str(product.get('platform', '')).lower(), product.get('product_name', ''))
+
+    def _refresh_best(self, cluster_id):
+        """Drop superseded heap entries from the top and publish the cheapest offer"""
+        heap = self._heaps.get(cluster_id)
+        # Compact once dead entries dominate, so the heap stays proportional to its offers
+        if heap and len(heap) >= MIN_HEAP_COMPACT and len(heap) > 2 * self._offer_counts[cluster_id]:
+            heap = self._heaps[cluster_id] = [entry for entry in heap if self._is_live(entry)]
+            heapq.heapify(heap)
+        while heap:
+            price, seq, offer_key = heap[0]
+            offer = self._offers.get(offer_key)
+            if offer is not None and offer[1] == seq:
+                self._best[cluster_id] = offer[2]
+                return
+            heapq.heappop(heap)
+
+        self._heaps.pop(cluster_id, None)
+        self._best.pop(cluster_id, None)
+
+    def _push(self, cluster_id, product, source, now=None):
+        offer_key = self._offer_key(cluster_id, product)
+        current = self._offers.get(offer_key)
+        expires_at = None
+        if source == 'catalog':
+            self._catalog[offer_key] = product
+            if current is not None and current[4] is not None:
+                return cluster_id  # a scraped price stands until it expires
+        else:
+            expires_at = (now or time.time()) + self.live_ttl
+            self._expiry.append((expires_at, offer_key))
+
+        if current is None:
+            self._offer_counts[cluster_id] += 1
+        elif current[0] == product['price']:
+            # Same price: refresh the stored offer without growing the heap
+            self._offers[offer_key] = (current[0], current[1], product, source, expires_at)
+            return cluster_id
+
+        seq = next(self._seq)
+        self._offers[offer_key] = (product['price'], seq, product, source, expires_at)
+        heapq.heappush(self._heaps.setdefault(cluster_id, []), (product['price'], seq, offer_key))
+        return cluster_id
+
+    def _drop(self, offer_key):
+        """Delete an offer (lazy: its heap entry is discarded when it reaches the top)"""
+        if self._offers.pop(offer_key, None) is not None:
+            self._offer_counts[offer_key[0]] -= 1
+            if not self._offer_counts[offer_key[0]]:
+                del self._offer_counts[offer_key[0]]
+
+    def _expire(self, now):
+        """Retire live offers past their TTL; returns the clusters touched"""
+        touched = set()
+        while self._expiry and self._expiry[0][0] <= now:
+            _, offer_key = self._expiry.popleft()
+            offer = self._offers.get(offer_key)
+            # Skip offers refreshed since (a later expiry entry covers them) and catalog offers
+            if offer is None or offer[4] is None or offer[4] > now:
+                continue
+            self._drop(offer_key)
+            catalog_product = self._catalog.get(offer_key)
+            if catalog_product is not None:
+                self._push(offer_key[0], catalog_product, 'catalog')
+            touched.add(offer_key[0])
+        return touched
+
+    def record_offers(self, products, source='live'):
+        """Record a batch of offers (e.g. one scrape); returns the number recorded"""
+        with self._lock:
+            now = time.time()
+            touched = self._expire(now)
+            recorded = set()
+            for product in products:
+                if product.get('price') is None:
+                    continue
+                recorded.add(self._push(self.resolve_cluster(product), product, source, now))
+            for cluster_id in touched | recorded:
+                self._refresh_best(cluster_id)
+            return len(recorded)
+
+    def expire_offers(self):
+        """Retire live offers past their TTL (also done on every record_offers)"""
+        with self._lock:
+            for cluster_id in self._expire(time.time()):
+                self._refresh_best(cluster_id)
+
+    def load_catalog(self, products):
+        """Sync with a newly ingested catalog, replacing offers from the previous one"""
+        with self._lock:
+            self._clusters_by_key = {}
+            for product in products:
+                if product.get('cluster_id'):
+                    canonical_key = ProductFeatures(product).canonical_key
+                    self._clusters_by_key.setdefault(canonical_key, product['cluster_id'])
+
+            touched = self._expire(time.time())
+            previous = {key for key, offer in self._offers.items() if offer[3] == 'catalog'}
+            self._catalog = {}
+            for product in products:
+                cluster_id = self._push(self.resolve_cluster(product), product, 'catalog')
+                previous.discard(self._offer_key(cluster_id, product))
+                touched.add(cluster_id)
+
+            # Offers that disappeared from the catalog
+            for offer_key in previous:
+                self._drop(offer_key)
+                touched.add(offer_key[0])
+
+            for cluster_id in touched:
+                self._refresh_best(cluster_id)
+
+    def _is_live(self, entry):
+        offer = self._offers.get(entry[2])
+        return offer is not None and offer[1] == entry[1]
+
+    def best(self, cluster_id):
+        """Cheapest current offer for a cluster, or None (O(1))"""
+        return self._best.get(cluster_id)
+
+    def best_many(self, cluster_ids):
+        """Cheapest offer for each requested cluster"""
+        best = self._best
+        return {cluster_id: best.get(cluster_id) for cluster_id in cluster_ids}
+
+    def best_for_product(self, product):
+        """Cheapest offer for the cluster a product belongs to"""
+        return self._best.get(self.resolve_cluster(product))
+
+    def stats(self):
+        return {
+            'clusters': len(self._best),
+            'offers': len(self._offers),
+            'live_offers': sum(1 for offer in self._offers.values() if offer[4] is not None),
+            'heap_entries': sum(len(heap) for heap in self._heaps.values()),
+        }
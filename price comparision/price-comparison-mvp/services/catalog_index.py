@@ -0,0 +1,653 @@
+"""
+Catalog Index Service
+In-memory product catalog with an inverted token index, built incrementally during ingest
+"""
+import base64
+import bisect
+import hashlib
+import heapq
+import math
+import re
+from array import array
+from collections import defaultdict
+import numpy as np
+from data_sources.enrichment import ProductEnricher, brand_key
+from services.negative_cache import BloomFilter
+from services.price_stats import PriceStats, PriceStatsBreakdown
+
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Presorted catalog orderings: price ascending, discount and popularity descending
+SORT_ORDERS = ('price', 'discount', 'popularity')
+
+# Walk a presorted order when matches are at least this fraction of the catalog;
+# sparser match sets are ranked directly instead
+_DENSE_MATCH_RATIO = 1 / 16
+
+# Lower bounds of the price facet buckets
+PRICE_BUCKETS = (0, 100, 500, 1000, 5000, 10000, 50000)
+
+# Terms in at least this fraction of products keep a precomputed numpy postings array
+_DENSE_TERM_RATIO = 1 / 64
+
+
+def tokenize_text(text):
+    """Split text into lowercase alphanumeric tokens"""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+class SearchFilters:
+    """Structured search filters applied inside the catalog index"""
+
+    def __init__(self, min_price=None, max_price=None, brands=None, categories=None, platforms=None):
+        self.min_price = min_price
+        self.max_price = max_price
+        self.brands = {brand_key(b) for b in brands or () if brand_key(b)}
+        self.categories = {str(c).strip().lower() for c in categories or () if str(c).strip()}
+        self.platforms = {str(p).strip().lower() for p in platforms or () if str(p).strip()}
+
+    def __bool__(self):
+        return bool(self.min_price is not None or self.max_price is not None
+                    or self.brands or self.categories or self.platforms)
+
+    @classmethod
+    def from_args(cls, args):
+        """Filters from request arguments (min_price, max_price, brand, category, platform)"""
+        def split(name):
+            return [v for value in args.getlist(name) for v in value.split(',') if v.strip()]
+
+        return cls(
+            min_price=_as_float(args.get('min_price')) if args.get('min_price') else None,
+            max_price=_as_float(args.get('max_price')) if args.get('max_price') else None,
+            brands=split('brand'),
+            categories=split('category'),
+            platforms=split('platform'),
+        )
+
+    @classmethod
+    def from_entities(cls, entities):
+        """Filters from NLPService.extract_entities output: only the price range ("under 2000").
+
+        Brand and category words in free text are too ambiguous to exclude products
+        ("apple juice", "coca cola beverage"); see preferences_from_entities.
+        """
+        price_range = entities.get('price_range') or {}
+        return cls(min_price=price_range.get('min'), max_price=price_range.get('max'))
+
+    @classmethod
+    def preferences_from_entities(cls, entities, enricher=None):
+        """Brands and categories named in a query, for ranking rather than filtering"""
+        enricher = enricher or ProductEnricher()
+        categories = []
+        for word in entities.get('categories', []):
+            # Map query words ('phone', 'shoes') to catalog categories ('smartphones', 'footwear')
+            category, department = enricher.infer_category(word)
+            if department != 'general':
+                categories.append(category)
+        return cls(brands=entities.get('brands', []), categories=categories)
+
+    def matches(self, product):
+        """Whether one product passes the filters (categories also match departments)"""
+        price = product.get('price')
+        if self.min_price is not None and (price is None or price < self.min_price):
+            return False
+        if self.max_price is not None and (price is None or price > self.max_price):
+            return False
+        if self.brands and (product.get('brand_key') or brand_key(product.get('brand'))) not in self.brands:
+            return False
+        if self.categories and not ({product.get('category'), product.get('department')} & self.categories):
+            return False
+        return not self.platforms or str(product.get('platform', '')).lower() in self.platforms
+
+    def merge(self, other):
+        """Combine with another filter set; explicit values in other win"""
+        if other.min_price is not None:
+            self.min_price = other.min_price
+        if other.max_price is not None:
+            self.max_price = other.max_price
+        self.brands = other.brands or self.brands
+        self.categories = other.categories or self.categories
+        self.platforms = other.platforms or self.platforms
+        return self
+
+    def to_dict(self):
+        return {
+            'min_price': self.min_price,
+            'max_price': self.max_price,
+            'brands': sorted(self.brands),
+            'categories': sorted(self.categories),
+            'platforms': sorted(self.platforms),
+        }
+
+
+def ids_to_mask(ids, size):
+    """Boolean mask over product IDs (True for each ID in ids)"""
+    mask = np.zeros(size, dtype=bool)
+    if not isinstance(ids, np.ndarray):
+        ids = np.fromiter(ids, dtype=np.int64, count=len(ids))
+    mask[ids] = True
+    return mask
+
+
+def _facet_codes(groups, size, labels):
+    """Per-product code of its facet value (index into labels; len(labels) = none)"""
+    codes = np.full(size, len(labels), dtype=np.intp)  # bincount's native index type
+    for code, label in enumerate(labels):
+        codes[np.asarray(groups[label], dtype=np.int64)] = code
+    return codes
+
+
+def _as_float(value):
+    try:
+        value = float(str(value).replace(',', '').replace('₹', ''))
+    except (TypeError, ValueError):
+        return None
+    return value if value == value else None
+
+
+def product_discount(product, cluster_max_price=None):
+    """Discount as a fraction: against the listed MRP when the feed has one,
+    otherwise against the priciest listing of the same product"""
+    price = product.get('price', 0)
+    listed = _as_float(product.get('original_price') or product.get('mrp'))
+    if not listed or listed <= price:
+        listed = cluster_max_price
+    if not listed or listed <= price:
+        return 0.0
+    return (listed - price) / listed
+
+
+def product_popularity(product, offer_count=1):
+    """Popularity score: platforms listing the product, weighted by rating and review volume"""
+    rating = _as_float(product.get('rating')) or 0.0
+    reviews = _as_float(product.get('reviews') or product.get('review_count')) or 0.0
+    return offer_count + rating + math.log1p(reviews)
+
+
+class CatalogIndex:
+    """Product catalog addressed by integer IDs with token postings"""
+
+    def __init__(self):
+        self.products = []  # product_id -> product dict
+        self.postings = defaultdict(list)  # token -> sorted product ids
+        self.platforms = defaultdict(list)  # platform -> product ids
+        self.brands = defaultdict(list)  # brand key -> product ids
+        self.department_views = {}  # department -> product ids sorted by price
+        self.category_views = {}  # category -> product ids sorted by price
+        self.clusters = {}  # cluster_id -> product ids sorted by price
+        self.orderings = {}  # sort order -> permutation of all product ids
+        self.ranks = {}  # sort order -> product id -> position in that permutation
+        self.sorted_prices = array('d')  # prices in 'price' order, for bisecting price ranges
+        self.price_array = np.empty(0)  # product id -> price, for vectorized summaries
+        self.facet_labels = {}  # facet -> value labels (a product's code indexes into them)
+        self.facet_codes = {}  # facet -> value code per product (len(labels) = none)
+        self.term_arrays = {}  # dense term -> numpy array of its postings
+        self.term_filter = None  # Bloom filter over term substrings, for rejecting unmatchable queries
+        self.version = None
+        self._sorted_terms = None
+        self._price_stats = None
+        self._category_sets = {}
+        self._hasher = hashlib.sha1()
+
+    def __len__(self):
+        return len(self.products)
+
+    def __iter__(self):
+        return iter(self.products)
+
+    def add_product(self, product):
+        """Append a normalized product and index its tokens; returns its ID"""
+        product_id = len(self.products)
+        self.products.append(product)
+
+        text = f"{product.get('product_name', '')} {product.get('brand', '')} {product.get('category', '')}"
+        for token in set(tokenize_text(text)):
+            self.postings[token].append(product_id)
+
+        platform = product.get('platform')
+        if platform:
+            self.platforms[str(platform).lower()].append(product_id)
+
+        brand = product.get('brand_key') or brand_key(product.get('brand'))
+        if brand:
+            self.brands[brand].append(product_id)
+
+        self._hasher.update(
+            f"{product.get('product_name', '')}|{platform}|{product.get('price', '')}\n".encode('utf-8')
+        )
+        self._sorted_terms = None
+        self._price_stats = None
+        self.term_filter = None
+        self.version = None
+        return product_id
+
+    def finalize(self):
+        """Freeze the catalog version and materialize views once ingest is complete"""
+        self.version = self._hasher.hexdigest()[:12]
+        self._sorted_terms = sorted(self.postings)
+        self.department_views = self._build_price_views('department')
+        self.category_views = self._build_price_views('category')
+        self.clusters = self._build_price_views('cluster_id')
+        self._build_orderings()
+        self._build_facets()
+        self.term_filter = BloomFilter.from_substrings(self.postings)
+        self._category_sets = {}
+        return self.version
+
+    def _build_facets(self):
+        """Precompute one value-code array per facet (platform, brand, category, price bucket).
+
+        Counting a facet is then a single bincount over the matched products' codes:
+        one integer per product and facet, whatever the facet's cardinality.
+        """
+        size = len(self.products)
+        brands = {}
+        for key, ids in self.brands.items():
+            # Label each brand key with the display name of its first product
+            brands.setdefault(self.products[ids[0]].get('brand') or key, []).extend(ids)
+
+        price_buckets = {}
+        for lower, upper in zip(PRICE_BUCKETS, PRICE_BUCKETS[1:] + (None,)):
+            label = f"{lower}-{upper}" if upper is not None else f"{lower}+"
+            start, end = self.price_positions(lower, None)
+            if upper is not None:
+                end = bisect.bisect_left(self.sorted_prices, upper)
+            price_buckets[label] = self.orderings['price'][start:max(start, end)]
+
+        min_postings = max(int(size * _DENSE_TERM_RATIO), 1)
+        self.term_arrays = {
+            term: np.asarray(ids, dtype=np.int64) for term, ids in self.postings.items() if len(ids) >= min_postings
+        }
+
+        # Labels sort alphabetically, so ties in count break by label via the code;
+        # price buckets keep range order
+        self.facet_labels = {}
+        self.facet_codes = {}
+        for facet, groups, ordered in (
+            ('platform', self.platforms, False),
+            ('brand', brands, False),
+            ('category', self.category_views, False),
+            ('price', price_buckets, True),
+        ):
+            labels = [label for label in (groups if ordered else sorted(groups)) if len(groups[label])]
+            self.facet_labels[facet] = labels
+            self.facet_codes[facet] = _facet_codes(groups, size, labels)
+
+    def _build_orderings(self):
+        """Presort the whole catalog once per version for every supported sort order"""
+        products = self.products
+        offer_counts = {}
+        max_prices = {}
+        for cluster_id, ids in self.clusters.items():
+            offer_counts[cluster_id] = len(ids)
+            max_prices[cluster_id] = products[ids[-1]].get('price', 0)
+
+        prices = [product.get('price', 0) for product in products]
+        discounts = [product_discount(product, max_prices.get(product.get('cluster_id'))) for product in products]
+        popularity = [product_popularity(product, offer_counts.get(product.get('cluster_id'), 1)) for product in products]
+
+        ids = range(len(products))
+        self.orderings = {
+            'price': array('l', sorted(ids, key=lambda i: (prices[i], i))),
+            'discount': array('l', sorted(ids, key=lambda i: (-discounts[i], prices[i], i))),
+            'popularity': array('l', sorted(ids, key=lambda i: (-popularity[i], prices[i], i))),
+        }
+        self.sorted_prices = array('d', (prices[i] for i in self.orderings['price']))
+        self.price_array = np.asarray(prices, dtype=np.float64)
+        self.ranks = {}
+        for sort, order in self.orderings.items():
+            rank = array('l', bytes(order.itemsize * len(order)))
+            for position, product_id in enumerate(order):
+                rank[product_id] = position
+            self.ranks[sort] = rank
+
+    def _build_price_views(self, field):
+        """Group product IDs by a field value, each group presorted by price"""
+        groups = defaultdict(list)
+        for product_id, product in enumerate(self.products):
+            key = product.get(field)
+            if key:
+                groups[str(key).lower()].append(product_id)
+
+        products = self.products
+        return {
+            key: array('l', sorted(ids, key=lambda pid: (products[pid].get('price', 0), pid)))
+            for key, ids in groups.items()
+        }
+
+    def price_stats(self):
+        """Overall, per-platform and per-category price stats (computed once per version)"""
+        if self._price_stats is None:
+            self._price_stats = PriceStatsBreakdown().add_all(self.products)
+        return self._price_stats
+
+    def match_price_stats(self, match):
+        """Price stats of a match set given as a boolean mask (vectorized)"""
+        return PriceStats.from_prices(self.price_array[match])
+
+    def match_mask(self, query, platform=None, filters=None):
+        """Match set of a query as a boolean mask, scattering precomputed arrays of dense terms"""
+        size = len(self.products)
+        if filters:
+            return ids_to_mask(self.match_set(query, platform, filters), size)
+
+        mask = np.zeros(size, dtype=bool)
+        sparse_ids = []
+        for token in tokenize_text(query):
+            for term in self.terms_with_prefix(token):
+                term_ids = self.term_arrays.get(term)
+                if term_ids is not None:
+                    mask[term_ids] = True
+                else:
+                    sparse_ids.extend(self.postings[term])
+        if sparse_ids:
+            mask[np.asarray(sparse_ids, dtype=np.int64)] = True
+        if platform:
+            mask &= ids_to_mask(self.platforms.get(str(platform).lower(), ()), size)
+        return mask
+
+    def facet_counts(self, match, max_values=20):
+        """Facet counts for a match set (boolean mask or IDs), one bincount per facet.
+
+        Returns facet -> [{value, count}] for platform, brand, category and price;
+        only the max_values largest counts of each facet are ranked. Every
+        non-empty price bucket is kept, in range order.
+        """
+        if isinstance(match, np.ndarray) and match.dtype == bool:
+            ids = np.flatnonzero(match)
+        else:
+            ids = np.fromiter(match, dtype=np.intp, count=len(match))
+        facets = {}
+        for facet, labels in self.facet_labels.items():
+            counts = np.bincount(self.facet_codes[facet].take(ids), minlength=len(labels) + 1)[:len(labels)]
+            codes = np.flatnonzero(counts)
+            if facet != 'price':  # price buckets stay in range order
+                if len(codes) > max_values:
+                    # Keep values tied with the max_values-th count; the sort settles ties by label
+                    threshold = np.partition(counts[codes], len(codes) - max_values)[len(codes) - max_values]
+                    codes = codes[counts[codes] >= threshold]
+                codes = codes[np.lexsort((codes, -counts[codes]))][:max_values]
+            facets[facet] = [{'value': labels[code], 'count': int(counts[code])} for code in codes]
+        return facets
+
+    def cluster_best_price(self, cluster_id):
+        """Lowest catalog price for a cluster, or None"""
+        ids = self.clusters.get(cluster_id)
+        return self.products[ids[0]].get('price') if ids else None
+
+    def cluster_offers(self, cluster_id):
+        """All listings of a matched product across platforms, cheapest first"""
+        return [self.products[pid] for pid in self.clusters.get(cluster_id, ())]
+
+    def category_view(self, name):
+        """Price-sorted product IDs for a department or fine-grained category"""
+        name = (name or '').lower()
+        view = self.department_views.get(name)
+        if view is None:
+            view = self.category_views.get(name, array('l'))
+        return view
+
+    def category_count(self, name):
+        """Number of products in a department or category"""
+        return len(self.category_view(name))
+
+    def category_ids(self, name):
+        """Membership set of a department or category (cached per version)"""
+        name = (name or '').lower()
+        ids = self._category_sets.get(name)
+        if ids is None:
+            ids = frozenset(self.category_view(name))
+            self._category_sets[name] = ids
+        return ids
+
+    def ordered_page(self, sort='price', limit=20, after=-1, candidates=None):
+        """Next page of product IDs in a presorted order, intersected with a match set.
+
+        candidates is a set of IDs or a boolean mask (match_mask). Resumes after
+        position `after` of the sort permutation. Returns (ids, last_position),
+        where last_position is None once the order is exhausted.
+        """
+        order = self.orderings.get(sort)
+        if order is None:
+            raise ValueError(f"Unknown sort order: {sort}")
+        start = after + 1
+
+        if candidates is None:
+            positions = range(start, min(start + limit + 1, len(order)))
+        elif isinstance(candidates, np.ndarray):
+            # Boolean mask: rank every match in one vectorized read, keep the next limit + 1
+            positions = np.frombuffer(self.ranks[sort], dtype='l')[candidates]
+            positions = positions[positions >= start]
+            if len(positions) > limit + 1:
+                positions = np.partition(positions, limit)[:limit + 1]
+            positions = np.sort(positions).tolist()
+        elif len(candidates) >= len(order) * _DENSE_MATCH_RATIO:
+            # Dense match set: walk the permutation, O(page / match ratio)
+            positions = []
+            for position in range(start, len(order)):
+                if order[position] in candidates:
+                    positions.append(position)
+                    if len(positions) > limit:
+                        break
+        else:
+            # Sparse match set: rank the matches directly, O(matches)
+            rank = self.ranks[sort]
+            positions = heapq.nsmallest(limit + 1, (rank[pid] for pid in candidates if rank[pid] >= start))
+
+        positions = list(positions)
+        has_more = len(positions) > limit
+        positions = positions[:limit]
+        ids = [order[position] for position in positions]
+        return ids, (positions[-1] if has_more and positions else None)
+
+    def make_cursor(self, sort, position):
+        """Opaque pagination cursor bound to this catalog version"""
+        if position is None:
+            return None
+        raw = f"{self.version}:{sort}:{position}".encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def parse_cursor(self, cursor):
+        """Decode a cursor into (sort, position); ValueError if malformed or from another version"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+            version, sort, position = raw.split(':')
+            position = int(position)
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Malformed cursor")
+        if version != self.version or sort not in self.orderings:
+            raise ValueError("Cursor expired: the catalog has been rebuilt")
+        return sort, position
+
+    def page(self, sort='price', cursor=None, limit=20, candidates=None):
+        """Cursor-paginated products in a presorted order; returns (products, next_cursor)"""
+        after = -1
+        if cursor:
+            sort, after = self.parse_cursor(cursor)
+        ids, last_position = self.ordered_page(sort, limit, after, candidates)
+        return [self.products[pid] for pid in ids], self.make_cursor(sort, last_position)
+
+    def category_page(self, name, sort='price', cursor=None, limit=20):
+        """Cursor-paginated products of a department or category; returns (products, next_cursor).
+
+        Price order (the default) slices the category's presorted price view, so a
+        page costs O(log category + page); other orders page through the membership set.
+        """
+        after = -1
+        if cursor:
+            sort, after = self.parse_cursor(cursor)
+        if sort != 'price':
+            ids, last_position = self.ordered_page(sort, limit, after, self.category_ids(name))
+            return [self.products[pid] for pid in ids], self.make_cursor(sort, last_position)
+
+        # The view and the catalog price order share the (price, id) key, so global
+        # price ranks increase along the view: bisect for the first one after the cursor
+        view = self.category_view(name)
+        rank = self.ranks['price']
+        low, high = 0, len(view)
+        while low < high:
+            mid = (low + high) // 2
+            if rank[view[mid]] <= after:
+                low = mid + 1
+            else:
+                high = mid
+        ids = view[low:low + limit]
+        has_more = low + limit < len(view)
+        next_cursor = self.make_cursor('price', rank[ids[-1]]) if has_more and ids else None
+        return [self.products[pid] for pid in ids], next_cursor
+
+    def get(self, product_id):
+        """Get product by ID"""
+        return self.products[product_id]
+
+    def terms_with_prefix(self, prefix):
+        """Get indexed terms starting with prefix"""
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self.postings)
+        terms = self._sorted_terms
+        start = bisect.bisect_left(terms, prefix)
+        end = bisect.bisect_left(terms, prefix + '\uffff')
+        return terms[start:end]
+
+    def may_match(self, query):
+        """False when no query token occurs in any indexed term, so neither a prefix
+        lookup nor a substring scan can match (Bloom filter: no false negatives)"""
+        tokens = tokenize_text(query)
+        if self.term_filter is None:
+            return bool(tokens)
+        return any(self.term_filter.may_contain_substring(token) for token in tokens)
+
+    def price_positions(self, min_price=None, max_price=None):
+        """Bisect the price-sorted order: [start, end) positions with price in range"""
+        start = 0 if min_price is None else bisect.bisect_left(self.sorted_prices, min_price)
+        end = len(self.sorted_prices) if max_price is None else bisect.bisect_right(self.sorted_prices, max_price)
+        return start, max(start, end)
+
+    def filter_ids(self, filters, candidates=None):
+        """Apply structured filters inside the index; returns an ID set (None = unfiltered)"""
+        if not filters:
+            return None if candidates is None else set(candidates)
+
+        groups = []
+        if candidates is not None:
+            groups.append(candidates)
+        if filters.brands:
+            groups.append(self._union(self.brands.get(b, ()) for b in filters.brands))
+        if filters.categories:
+            groups.append(self._union(self.category_ids(c) for c in filters.categories))
+        if filters.platforms:
+            groups.append(self._union(self.platforms.get(p, ()) for p in filters.platforms))
+
+        start, end = self.price_positions(filters.min_price, filters.max_price)
+        price_filtered = start > 0 or end < len(self.sorted_prices)
+
+        if not groups:
+            return set(self.orderings['price'][start:end])
+
+        # Intersect smallest first so each step scans the fewest IDs
+        groups.sort(key=len)
+        result = set(groups[0])
+        for group in groups[1:]:
+            result.intersection_update(group)
+            if not result:
+                return result
+
+        if price_filtered:
+            rank = self.ranks['price']
+            result = {pid for pid in result if start <= rank[pid] < end}
+        return result
+
+    def filter_mask(self, filters):
+        """Structured filters as a boolean mask over product IDs (None = unfiltered).
+
+        Built with vectorized writes from the presorted price order and the facet
+        postings, so no per-request Python set of matching IDs is materialized.
+        """
+        if not filters:
+            return None
+        size = len(self.products)
+        start, end = self.price_positions(filters.min_price, filters.max_price)
+        mask = np.zeros(size, dtype=bool)
+        mask[np.frombuffer(self.orderings['price'], dtype='l')[start:end]] = True
+
+        for values, groups in ((filters.brands, self.brands.get),
+                               (filters.categories, self.category_view),
+                               (filters.platforms, self.platforms.get)):
+            if values:
+                allowed = np.zeros(size, dtype=bool)
+                for value in values:
+                    ids = groups(value)
+                    if ids:
+                        allowed[np.asarray(ids, dtype=np.int64)] = True
+                mask &= allowed
+        return mask
+
+    @staticmethod
+    def _union(id_groups):
+        ids = set()
+        for group in id_groups:
+            ids.update(group)
+        return ids
+
+    def match_set(self, query, platform=None, filters=None):
+        """Set of IDs of products matching any query token (prefix match), filtered in-index"""
+        matched = set()
+        for token in tokenize_text(query):
+            for term in self.terms_with_prefix(token):
+                matched.update(self.postings[term])
+
+        if platform:
+            matched.intersection_update(self.platforms.get(str(platform).lower(), []))
+        if filters:
+            matched = self.filter_ids(filters, matched)
+
+        return matched
+
+    def match_many(self, keywords, mode='any', platform=None, filters=None):
+        """Resolve several keywords in one pass; returns {product_id: keywords matched}.
+
+        mode='any' keeps products matching at least one keyword, mode='all' only
+        those matching every keyword.
+        """
+        if mode not in ('any', 'all'):
+            raise ValueError(f"Unknown keyword mode: {mode}")
+
+        keyword_terms = []
+        for keyword in keywords:
+            tokens = tokenize_text(keyword)
+            if tokens:
+                keyword_terms.append({term for token in tokens for term in self.terms_with_prefix(token)})
+        if not keyword_terms:
+            return {}
+
+        counts = defaultdict(int)
+        for terms in keyword_terms:
+            ids = set()
+            for term in terms:
+                ids.update(self.postings[term])
+            for product_id in ids:
+                counts[product_id] += 1
+
+        if mode == 'all':
+            required = len(keyword_terms)
+            counts = {pid: count for pid, count in counts.items() if count == required}
+
+        if platform or filters:
+            allowed = set(counts)
+            if platform:
+                allowed.intersection_update(self.platforms.get(str(platform).lower(), []))
+            if filters:
+                allowed = self.filter_ids(filters, allowed)
+            counts = {pid: counts[pid] for pid in allowed}
+        return dict(counts)
+
+    def match_ids(self, query, platform=None, filters=None):
+        """Get IDs of products matching any query token (prefix match)"""
+        return sorted(self.match_set(query, platform, filters))
+
+    def search(self, query, platform=None, filters=None):
+        """Search products by name, brand and category tokens"""
+        return [self.products[pid] for pid in self.match_ids(query, platform, filters)]
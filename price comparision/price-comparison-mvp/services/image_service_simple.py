@@ -2,7 +2,8 @@ import os
 from PIL import Image
 
 class ImageService:
-    def __init__(self):
+    def __init__(self, search_service=None):
+        self.search_service = search_service
         self.upload_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'images', 'uploads')
 
     def save_uploaded_image(self, file):
@@ -31,24 +32,12 @@ class ImageService:
         """Search products based on filename keywords."""
         keywords = self.extract_keywords_from_filename(image_path)
         
-        from services.text_search_service import TextSearchService
-        search_service = TextSearchService()
+        if self.search_service is None:
+            from services.text_search_service import TextSearchService
+            self.search_service = TextSearchService()
         
-        all_results = []
-        for keyword in keywords:
-            results = search_service.search_products(keyword)
-            all_results.extend(results)
-        
-        # Remove duplicates
-        seen = set()
-        unique_results = []
-        for product in all_results:
-            key = (product['product_name'], product['platform'])
-            if key not in seen:
-                seen.add(key)
-                unique_results.append(product)
-        
-        return unique_results[:20]
+        # One batched pass over all keywords, already deduplicated
+        return self.search_service.search_many(keywords, mode='any', limit=20)
 
     def extract_keywords_from_filename(self, image_path):
         """Extract keywords from filename."""
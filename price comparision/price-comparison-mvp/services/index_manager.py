@@ -0,0 +1,168 @@
+"""
+Index Rebuild Manager
+Builds catalog-derived structures (catalog index, NLP vocabulary, recommendation
+features) in the background and swaps complete generations in atomically
+"""
+import threading
+import time
+from services.catalog_index import CatalogIndex
+from services.nlp_service import NLPService
+from services.product_matcher import ProductMatcher
+from services.recommendation_engine import RecommendationEngine
+from services.text_pipeline import CatalogText
+
+
+class CatalogGeneration:
+    """Consistent, read-only set of structures built from one catalog version"""
+
+    def __init__(self, generation_id, index, nlp_service, recommendation_engine, source_version=None):
+        self.generation_id = generation_id
+        self.index = index
+        self.nlp_service = nlp_service
+        self.recommendation_engine = recommendation_engine
+        self.source_version = source_version
+        self.built_at = time.time()
+
+    @property
+    def version(self):
+        return self.index.version
+
+    @property
+    def products(self):
+        return self.index.products
+
+    def describe(self):
+        return {
+            'generation': self.generation_id,
+            'version': self.version,
+            'products': len(self.index),
+            'clusters': len(self.index.clusters),
+            'ann_recall_at_10': self.nlp_service.ann_recall,
+            'built_at': self.built_at,
+        }
+
+
+class IndexRebuildManager:
+    """Double-buffered rebuilds: requests read the current generation while the next one builds"""
+
+    def __init__(self, source_manager, user_state_engine=None, refresh_interval=300, best_price_index=None,
+                 query_log=None):
+        self.source_manager = source_manager
+        self.user_state_engine = user_state_engine  # owns interactions shared across generations
+        self.best_price_index = best_price_index  # outlives generations; synced on every swap
+        self.query_log = query_log  # QueryLog weighting autocomplete, re-applied every refresh interval
+        self.refresh_interval = refresh_interval
+        self.matcher = ProductMatcher()
+        self._current = None
+        self._next_id = 1
+        self._ready = threading.Event()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._build_lock = threading.Lock()
+        self._thread = None
+
+    def current(self, timeout=30):
+        """Get the live generation, waiting for the first build if necessary"""
+        generation = self._current
+        if generation is None and timeout:
+            self._ready.wait(timeout)
+            generation = self._current
+        return generation
+
+    def build_generation(self):
+        """Build a complete generation off the request path"""
+        source_version = self.source_manager.get_catalog_version()
+
+        # Products stream from the source straight into the index, so the generation
+        # holds the only copy (sources hand out fresh dicts and cache nothing)
+        index = CatalogIndex()
+        for product in self.source_manager.iter_all_products():
+            index.add_product(product)
+        # Offline matching stage: cross-platform listings of one product share a cluster_id
+        self.matcher.assign_clusters(index.products)
+        index.finalize()
+
+        # NLP indexes exported for this catalog version (e.g. by another worker) load warm
+        nlp_service = NLPService()
+        query_counts = self.query_log.popular() if self.query_log is not None else None
+        if not nlp_service.load_artifacts(index.products, index.version, query_counts):
+            # Names and brands are tokenized once and shared by every NLP index
+            catalog_text = CatalogText(index.products)
+            nlp_service.build_vocabulary(index.products, query_counts, catalog_text)
+            nlp_service.build_semantic_index(index.products, index.version, catalog_text)
+            nlp_service.save_artifacts()
+
+        recommendation_engine = RecommendationEngine()
+        recommendation_engine.ann_index = nlp_service.ann_index  # one embedding index for both
+        if self.user_state_engine is not None:
+            recommendation_engine.adopt_user_state(self.user_state_engine)
+        recommendation_engine.build_item_features(index.products)
+        recommendation_engine.compute_item_similarity()
+
+        generation = CatalogGeneration(
+            self._next_id, index, nlp_service, recommendation_engine, source_version
+        )
+        self._next_id += 1
+        return generation
+
+    def rebuild(self):
+        """Build a new generation and swap it in; returns the generation now live"""
+        with self._build_lock:
+            started = time.perf_counter()
+            generation = self.build_generation()
+            # Single reference assignment: readers see the old or new generation, never a mix
+            self._current = generation
+            self._ready.set()
+            if self.best_price_index is not None:
+                self.best_price_index.load_catalog(generation.products)
+            print(f"✓ Catalog generation {generation.generation_id} live "
+                  f"({len(generation.index)} products, version {generation.version}, "
+                  f"{time.perf_counter() - started:.2f}s)")
+            return generation
+
+    def refresh_popularity(self):
+        """Decay the query log and re-rank the live generation's autocomplete with it"""
+        generation = self._current
+        if self.query_log is None or generation is None:
+            return
+        self.query_log.decay()
+        generation.nlp_service.update_query_weights(self.query_log.popular())
+
+    def request_rebuild(self):
+        """Ask the background worker to rebuild as soon as possible"""
+        self._wakeup.set()
+
+    def _is_stale(self):
+        generation = self._current
+        if generation is None:
+            return True
+        source_version = self.source_manager.get_catalog_version()
+        return source_version is not None and source_version != generation.source_version
+
+    def _run(self):
+        force = False
+        while not self._stopped.is_set():
+            try:
+                if force or self._is_stale():
+                    self.rebuild()
+                else:
+                    # Search popularity changes between catalog versions too
+                    self.refresh_popularity()
+            except Exception as e:
+                print(f"⚠ Catalog rebuild failed: {e}")
+                # Unblock waiting requests; they keep the previous generation (or none)
+                self._ready.set()
+
+            force = self._wakeup.wait(self.refresh_interval)
+            self._wakeup.clear()
+
+    def start(self):
+        """Start the background worker (builds the first generation immediately)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='catalog-rebuild', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
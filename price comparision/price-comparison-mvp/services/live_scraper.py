@@ -37,7 +37,7 @@ class LiveProductScraper:
             'Upgrade-Insecure-Requests': '1'
         }
     
-    def scrape_amazon(self, query, max_results=10):
+    def scrape_amazon(self, query, max_results=10, failures=None):
         """Scrape Amazon India for products"""
         products = []
         try:
@@ -87,12 +87,16 @@ class LiveProductScraper:
                         print(f"Error parsing Amazon item: {e}")
                         continue
                         
+            else:
+                self._record_failure(failures, 'Amazon')
+                        
         except Exception as e:
             print(f"Amazon scraping error: {e}")
+            self._record_failure(failures, 'Amazon')
         
         return products
     
-    def scrape_flipkart(self, query, max_results=10):
+    def scrape_flipkart(self, query, max_results=10, failures=None):
         """Scrape Flipkart for products"""
         products = []
         try:
@@ -142,12 +146,16 @@ class LiveProductScraper:
                         print(f"Error parsing Flipkart item: {e}")
                         continue
                         
+            else:
+                self._record_failure(failures, 'Flipkart')
+                        
         except Exception as e:
             print(f"Flipkart scraping error: {e}")
+            self._record_failure(failures, 'Flipkart')
         
         return products
     
-    def scrape_myntra(self, query, max_results=10):
+    def scrape_myntra(self, query, max_results=10, failures=None):
         """Scrape Myntra for fashion products"""
         products = []
         try:
@@ -191,33 +199,47 @@ class LiveProductScraper:
                         print(f"Error parsing Myntra item: {e}")
                         continue
                         
+            else:
+                self._record_failure(failures, 'Myntra')
+                        
         except Exception as e:
             print(f"Myntra scraping error: {e}")
+            self._record_failure(failures, 'Myntra')
         
         return products
     
-    def search_all_platforms(self, query, max_per_platform=10):
-        """Search across all platforms"""
+    @staticmethod
+    def _record_failure(failures, platform):
+        """Note a platform that did not answer (error or non-200 response)"""
+        if failures is not None:
+            failures.append(platform)
+    
+    def search_all_platforms(self, query, max_per_platform=10, failures=None):
+        """Search across all platforms
+        
+        Platforms that fail to answer are appended to failures (if given), so callers
+        can tell "no products" from "no answer".
+        """
         all_products = []
         
         print(f"🔍 Searching for '{query}' across platforms...")
         
         # Amazon
         print("  - Scraping Amazon...")
-        amazon_products = self.scrape_amazon(query, max_per_platform)
+        amazon_products = self.scrape_amazon(query, max_per_platform, failures)
         all_products.extend(amazon_products)
         time.sleep(1)  # Rate limiting
         
         # Flipkart
         print("  - Scraping Flipkart...")
-        flipkart_products = self.scrape_flipkart(query, max_per_platform)
+        flipkart_products = self.scrape_flipkart(query, max_per_platform, failures)
         all_products.extend(flipkart_products)
         time.sleep(1)
         
         # Myntra (for fashion items)
         if any(keyword in query.lower() for keyword in ['shoe', 'shirt', 'jeans', 'dress', 'fashion', 'clothes']):
             print("  - Scraping Myntra...")
-            myntra_products = self.scrape_myntra(query, max_per_platform)
+            myntra_products = self.scrape_myntra(query, max_per_platform, failures)
             all_products.extend(myntra_products)
             time.sleep(1)
         
@@ -0,0 +1,100 @@
+"""
+Negative Query Cache
+Bloom filter over indexed term substrings plus a TTL cache of zero-result queries,
+so misspelled or nonsense queries skip dataset scans and live scrapes
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+SUBSTRING_LENGTH = 8  # longest term substring stored; longer words are checked window by window
+NEGATIVE_CACHE_TTL = 600  # seconds a zero-result query stays cached
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter (no false negatives, tunable false-positive rate)"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(int(capacity), 1)
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.max_length = SUBSTRING_LENGTH
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        # Double hashing: k positions from two independent hashes
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    @classmethod
+    def from_substrings(cls, terms, max_length=SUBSTRING_LENGTH, error_rate=0.01):
+        """Filter over every substring (up to max_length chars) of the given terms"""
+        substrings = set()
+        for term in terms:
+            for start in range(len(term)):
+                for end in range(start + 1, min(start + max_length, len(term)) + 1):
+                    substrings.add(term[start:end])
+        bloom = cls(len(substrings), error_rate)
+        bloom.max_length = max_length
+        for substring in substrings:
+            bloom.add(substring)
+        return bloom
+
+    def may_contain_substring(self, word):
+        """False only if word is certainly not a substring of any term (from_substrings filters)"""
+        size = self.max_length
+        if len(word) <= size:
+            return word in self
+        # Longer words: every window must be present (a necessary condition)
+        return all(word[i:i + size] in self for i in range(len(word) - size + 1))
+
+
+class NegativeResultCache:
+    """Bounded TTL cache of queries known to return nothing for a catalog version"""
+
+    def __init__(self, ttl=NEGATIVE_CACHE_TTL, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()  # (query, version) -> expiry time
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, query, version=None):
+        with self._lock:
+            key = (query, version)
+            self._entries[key] = time.monotonic() + self.ttl
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, item):
+        query, version = item
+        with self._lock:
+            expiry = self._entries.get((query, version))
+            if expiry is None:
+                return False
+            if expiry < time.monotonic():
+                del self._entries[(query, version)]
+                return False
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
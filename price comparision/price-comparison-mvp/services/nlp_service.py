@@ -2,58 +2,136 @@
 Natural Language Processing Service for Smart Search
 Handles query understanding, spell correction, semantic search, and autocomplete
 """
+import glob
+import hashlib
 import os
 import re
-import string
-from collections import Counter
+import threading
+from collections import OrderedDict
 import warnings
 warnings.filterwarnings('ignore')
 
-try:
-    import nltk
-    from nltk.corpus import stopwords
-    from nltk.tokenize import word_tokenize
-    from nltk.stem import WordNetLemmatizer
-    from nltk.metrics.distance import edit_distance
-    _HAS_NLTK = True
-    
-    # Download required NLTK data
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt', quiet=True)
-    try:
-        nltk.data.find('corpora/stopwords')
-    except LookupError:
-        nltk.download('stopwords', quiet=True)
-    try:
-        nltk.data.find('corpora/wordnet')
-    except LookupError:
-        nltk.download('wordnet', quiet=True)
-    
-except ImportError:
-    _HAS_NLTK = False
-    print("NLTK not available. Using basic text processing.")
-
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
 import numpy as np
 import joblib
+from scipy.sparse import csc_matrix
+from data_sources.enrichment import normalize_text
+from ml_config import NLP
+from services import nltk_resources
+from services.ann_index import IVFIndex
+from services.autocomplete_index import AutocompleteIndex
+from services.catalog_index import product_popularity
+from services.spell_index import SpellIndex
+from services.text_pipeline import CatalogText, TermAnalyzer, clean_text
+from services.word_embeddings import load_word_embeddings, quantize, quantized_scores
+
+
+QUERY_LOG_WEIGHT = 1.0  # autocomplete weight added per logged search of a suggestion
+EMBEDDING_DIM = 64  # LSA product embedding size indexed for nearest-neighbour search
+SYNONYM_MIN_SIMILARITY = 0.6  # word-embedding neighbours at least this close expand queries
+EMBEDDING_MIN_SIMILARITY = 0.5  # minimum query/product similarity in embedding mode
+TFIDF_MIN_SIMILARITY = 0.1  # minimum query/product similarity in TF-IDF mode
+ANN_SEARCH_MIN_PRODUCTS = 50000  # smaller catalogs are scored exactly in TF-IDF mode
+ANN_CANDIDATE_FACTOR = 4  # ANN candidates fetched per requested result (headroom for filters)
+_MATRIX_ARRAYS = ('data', 'indices', 'indptr')  # CSC components stored as .npy files
+QUERY_PLAN_CACHE_SIZE = 4096  # compiled query plans kept per NLPService (LRU)
+LEMMA_CACHE_SIZE = 100000  # memoized lemmas before the cache is reset
+MAX_COMPARED = 4  # products a comparison query is split into
+
+# Price and intent operators that spelling correction must leave intact
+_QUERY_WORDS = frozenset((
+    'under', 'below', 'less', 'than', 'above', 'over', 'more', 'between', 'and', 'to',
+    'cheap', 'affordable', 'budget', 'best', 'top', 'premium', 'quality',
+    'compare', 'vs', 'versus', 'difference',
+))
+_PRICE_RANGE_RE = re.compile(r'between\s+(\d+)\s+(?:and|to|-)\s+(\d+)')
+_MAX_PRICE_RE = re.compile(r'under\s+(\d+)|below\s+(\d+)|less\s+than\s+(\d+)')
+_MIN_PRICE_RE = re.compile(r'above\s+(\d+)|over\s+(\d+)|more\s+than\s+(\d+)')
+_COMPARISON_RE = re.compile(r'\b(?:compare|vs|versus|difference)\b')
+_COMPARISON_WORDS_RE = re.compile(r'\b(?:compare|comparison|difference|between|prices?)\b')
+_COMPARISON_SPLIT_RE = re.compile(r'\b(?:vs|versus|and|or|with)\b')
+
+
+def _atomic_dump(obj, path):
+    """joblib.dump via a temporary file so readers never see a partial artifact"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _save_array(path, array):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def _version_tag(catalog_version):
+    """Filename-safe tag of a catalog version (versions may contain ':' and the like)"""
+    return hashlib.sha1(str(catalog_version).encode()).hexdigest()[:12]
+
+
+def _remove_other_versions(prefix, tag):
+    """Delete .npy arrays under prefix that belong to another catalog version"""
+    for path in glob.glob(f"{glob.escape(prefix)}.*.npy"):
+        if os.path.basename(path)[len(os.path.basename(prefix)) + 1:].split('.')[0] == tag:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # still memory-mapped elsewhere (Windows); removed on a later save
+
+
+class QueryPlan:
+    """Everything query understanding derives from one query, computed in one pass.
+    
+    Plans are cached and shared between requests, so treat them as read-only.
+    """
+    
+    __slots__ = ('text', 'tokens', 'corrected_tokens', 'corrected_query', 'corrections',
+                 'lemmas', 'keywords', 'entities', 'intent', 'sub_queries')
+    
+    def __init__(self, text, tokens, corrected_tokens, lemmas, keywords, entities, intent, sub_queries=()):
+        self.text = text  # normalized query (the cache key)
+        self.tokens = tokens
+        self.corrected_tokens = corrected_tokens
+        self.corrected_query = ' '.join(corrected_tokens)
+        self.corrections = {
+            token: corrected for token, corrected in zip(tokens, corrected_tokens) if token != corrected
+        }
+        self.lemmas = lemmas  # corrected tokens without stopwords, lemmatized
+        self.keywords = keywords  # lemmas followed by their synonym expansions
+        self.entities = entities
+        self.intent = intent
+        self.sub_queries = list(sub_queries)  # products compared by a comparison query, else empty
+    
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
 
 
 class NLPService:
     """Advanced NLP for intelligent search"""
     
     def __init__(self):
-        self.lemmatizer = None
-        self.stop_words = set()
+        self._lemma_cache = {}  # word -> lemma (vocabulary-sized)
         self.tfidf_vectorizer = None
+        self.tfidf_matrix = None  # products x terms, built once per catalog version
+        self.tfidf_products = None  # catalog the matrix rows refer to
+        self.catalog_version = None
+        self.embedding_model = None  # TF-IDF -> dense product embedding (LSA)
+        self.ann_index = None  # IVFIndex over product embeddings, shared with RecommendationEngine
+        self.ann_recall = None  # recall@10 of the ANN index against brute force
+        self._vocabulary_rows = None  # embedding rows of catalog vocabulary words
+        self.product_vectors = None  # (int8 codes, scales) of mean word vectors per product
         self.vocabulary = {}
+        self.spell_index = None  # SymSpell deletion dictionary over the vocabulary
         self.product_names = []  # For autocomplete
-        
-        if _HAS_NLTK:
-            self.lemmatizer = WordNetLemmatizer()
-            self.stop_words = set(stopwords.words('english'))
+        self.autocomplete_index = None
+        self.suggestion_weights = {}  # normalized product name -> catalog popularity (autocomplete base)
+        self.suggestion_display = {}  # normalized product name -> name shown
+        self._plans = OrderedDict()  # normalized query -> QueryPlan (LRU)
+        self._plans_lock = threading.Lock()
         
         self.common_brands = {
             'apple', 'samsung', 'nike', 'adidas', 'puma', 'sony', 'lg',
@@ -69,38 +147,43 @@ class NLPService:
             'headphones': ['earphones', 'headset', 'earbuds'],
         }
     
+    # NLTK resources and word vectors load on first use, never at import or construction
+    
+    @property
+    def lemmatizer(self):
+        return nltk_resources.lemmatizer()
+    
+    @property
+    def stop_words(self):
+        return nltk_resources.stop_words()
+    
+    @property
+    def word_embeddings(self):
+        """Pretrained word vectors (int8, memory-mapped; None when not installed)"""
+        return load_word_embeddings(NLP['word_embeddings_path'])
+    
     def preprocess_text(self, text):
         """Clean and normalize text"""
-        if not text:
-            return ""
-        
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove special characters except hyphens (for product names)
-        text = re.sub(r'[^a-z0-9\s\-]', ' ', text)
-        
-        # Remove extra whitespace
-        text = ' '.join(text.split())
-        
-        return text
+        return clean_text(text)
     
     def tokenize(self, text):
         """Tokenize text into words"""
-        text = self.preprocess_text(text)
-        
-        if _HAS_NLTK:
-            tokens = word_tokenize(text)
-        else:
-            tokens = text.split()
-        
-        return tokens
+        return self._split(self.preprocess_text(text))
+    
+    def _split(self, cleaned):
+        """Tokenize text that already went through preprocess_text"""
+        return nltk_resources.word_tokenizer()(cleaned)
     
     def lemmatize(self, word):
         """Get lemma (base form) of word"""
-        if self.lemmatizer:
-            return self.lemmatizer.lemmatize(word)
-        return word
+        lemma = self._lemma_cache.get(word)
+        if lemma is None:
+            lemmatizer = self.lemmatizer
+            lemma = lemmatizer.lemmatize(word) if lemmatizer else word
+            if len(self._lemma_cache) >= LEMMA_CACHE_SIZE:
+                self._lemma_cache.clear()
+            self._lemma_cache[word] = lemma
+        return lemma
     
     def remove_stopwords(self, tokens):
         """Remove common stopwords"""
@@ -110,18 +193,29 @@ class NLPService:
     
     def expand_query(self, query):
         """Expand query with synonyms and related terms"""
-        tokens = self.tokenize(query)
-        expanded_tokens = set(tokens)
+        return self._expand(self.tokenize(query))
+    
+    def _expand(self, tokens):
+        expanded_tokens = list(tokens)
         
         # Add synonyms
         for token in tokens:
             if token in self.category_synonyms:
-                expanded_tokens.update(self.category_synonyms[token])
+                expanded_tokens.extend(self.category_synonyms[token])
+            # Nearest catalog words in embedding space
+            expanded_tokens.extend(word for word, _ in self.similar_words(token))
         
-        return list(expanded_tokens)
+        return list(dict.fromkeys(expanded_tokens))
+    
+    def similar_words(self, word, top_n=3):
+        """Catalog vocabulary words close to word in the pretrained embedding space"""
+        if self.word_embeddings is None or self._vocabulary_rows is None or word not in self.word_embeddings:
+            return []
+        return self.word_embeddings.most_similar(word, top_n, rows=self._vocabulary_rows,
+                                                 min_similarity=SYNONYM_MIN_SIMILARITY)
     
     def spell_correct(self, word):
-        """Correct spelling using edit distance"""
+        """Correct spelling to the nearest vocabulary word (edit distance <= 2, most frequent on ties)"""
         if not self.vocabulary:
             return word
         
@@ -129,25 +223,10 @@ class NLPService:
         if word in self.vocabulary:
             return word
         
-        # Find closest match
-        min_distance = float('inf')
-        best_match = word
-        
-        for vocab_word in self.vocabulary:
-            if _HAS_NLTK:
-                dist = edit_distance(word, vocab_word)
-            else:
-                dist = self.simple_edit_distance(word, vocab_word)
-            
-            if dist < min_distance:
-                min_distance = dist
-                best_match = vocab_word
-        
-        # Only correct if distance is small
-        if min_distance <= 2:
-            return best_match
-        
-        return word
+        # Closest word within edit distance 2 from the precomputed deletion dictionary
+        if self.spell_index is None:
+            self.spell_index = SpellIndex(dict.fromkeys(self.vocabulary, 1))
+        return self.spell_index.correct(word)
     
     def simple_edit_distance(self, s1, s2):
         """Simple Levenshtein distance calculation"""
@@ -171,22 +250,21 @@ class NLPService:
     
     def correct_query(self, query):
         """Correct spelling in entire query"""
-        tokens = self.tokenize(query)
-        corrected_tokens = []
-        
-        for token in tokens:
-            # Don't correct brands or very short words
-            if token in self.common_brands or len(token) <= 2:
-                corrected_tokens.append(token)
-            else:
-                corrected_tokens.append(self.spell_correct(token))
-        
-        return ' '.join(corrected_tokens)
+        return ' '.join(self._correct_tokens(self.tokenize(query)))
+    
+    def _correct_tokens(self, tokens):
+        # Don't correct brands, numbers (price caps), query operators or very short words
+        return [
+            token if token in self.common_brands or token in _QUERY_WORDS or token.isdigit() or len(token) <= 2
+            else self.spell_correct(token)
+            for token in tokens
+        ]
     
     def extract_entities(self, query):
         """Extract product entities from query"""
-        tokens = self.tokenize(query)
-        
+        return self._entities(query, self.tokenize(query))
+    
+    def _entities(self, query, tokens):
         entities = {
             'brands': [],
             'categories': [],
@@ -205,107 +283,320 @@ class NLPService:
                 entities['categories'].append(category)
         
         # Extract price information
-        price_pattern = r'under\s+(\d+)|below\s+(\d+)|less\s+than\s+(\d+)'
-        price_match = re.search(price_pattern, query)
-        if price_match:
-            price = next(g for g in price_match.groups() if g)
-            entities['price_range'] = {'max': int(price)}
+        range_match = _PRICE_RANGE_RE.search(query)
+        if range_match:
+            low, high = sorted(int(g) for g in range_match.groups())
+            entities['price_range'] = {'min': low, 'max': high}
+        else:
+            price_match = _MAX_PRICE_RE.search(query)
+            if price_match:
+                price = next(g for g in price_match.groups() if g)
+                entities['price_range'] = {'max': int(price)}
+
+            min_match = _MIN_PRICE_RE.search(query)
+            if min_match:
+                price = next(g for g in min_match.groups() if g)
+                entities['price_range'] = dict(entities['price_range'] or {}, min=int(price))
         
         return entities
     
     def get_autocomplete_suggestions(self, partial_query, max_suggestions=10):
-        """Generate autocomplete suggestions"""
+        """Generate autocomplete suggestions: name completions, then substring matches, most popular first"""
         if not partial_query or len(partial_query) < 2:
             return []
         
-        partial_query = partial_query.lower()
-        suggestions = []
-        
-        # Search in product names
-        for product_name in self.product_names:
-            if product_name.lower().startswith(partial_query):
-                suggestions.append(product_name)
-                if len(suggestions) >= max_suggestions:
-                    break
-        
-        # If not enough, search for contains
-        if len(suggestions) < max_suggestions:
-            for product_name in self.product_names:
-                if partial_query in product_name.lower() and product_name not in suggestions:
-                    suggestions.append(product_name)
-                    if len(suggestions) >= max_suggestions:
-                        break
-        
-        return suggestions[:max_suggestions]
+        if self.autocomplete_index is None:
+            return []
+        return self.autocomplete_index.suggest(partial_query, max_suggestions)
     
-    def build_vocabulary(self, products):
-        """Build vocabulary from product catalog"""
-        all_text = []
-        self.product_names = []
-        
-        for product in products:
-            name = product.get('product_name', '')
-            brand = product.get('brand', '')
-            
-            all_text.append(name)
-            all_text.append(brand)
-            self.product_names.append(name)
-        
-        # Tokenize and build vocabulary
-        vocab_counter = Counter()
-        for text in all_text:
-            tokens = self.tokenize(text)
-            vocab_counter.update(tokens)
-        
-        # Store vocabulary
+    def build_vocabulary(self, products, query_counts=None, catalog_text=None):
+        """Build vocabulary, spell index and autocomplete index from product catalog
+        
+        Args:
+            products: Catalog products
+            query_counts: Optional {normalized query: times searched} of popular queries
+                (QueryLog.popular) boosting autocomplete ranking
+            catalog_text: Optional CatalogText of products, shared with build_semantic_index
+        """
+        catalog_text = self._catalog_text(products, catalog_text)
+        self.product_names = [product.get('product_name', '') for product in products]
+        
+        # Store vocabulary and its spell index
+        vocab_counter = catalog_text.token_counts
         self.vocabulary = set(vocab_counter.keys())
+        self.spell_index = SpellIndex(vocab_counter)
+        # Catalog words are lemmatized once here instead of on every query
+        self._lemma_cache.update(catalog_text.lemmas)
+        self._build_suggestion_weights(products)
+        self.update_query_weights(query_counts or {})
         
         print(f"Built vocabulary with {len(self.vocabulary)} words and {len(self.product_names)} products")
     
-    def semantic_search(self, query, products, top_k=50):
-        """Perform semantic search using TF-IDF"""
+    def _build_suggestion_weights(self, products):
+        """Autocomplete base: product names weighted by catalog popularity"""
+        listings = {}
+        for product in products:
+            key = product.get('name_key') or normalize_text(product.get('product_name', ''))
+            if key:
+                listings.setdefault(key, []).append(product)
+
+        self.suggestion_weights = {}
+        self.suggestion_display = {}
+        for key, group in listings.items():
+            # A name listed on more platforms, better rated or more reviewed ranks higher
+            self.suggestion_weights[key] = max(product_popularity(product, len(group)) for product in group)
+            self.suggestion_display[key] = group[0].get('product_name', key)
+    
+    def is_catalog_query(self, query):
+        """True if every word of the query is a catalog word (or a stopword)"""
+        tokens = self.tokenize(query)
+        return (any(token in self.vocabulary for token in tokens)
+                and all(token in self.vocabulary or token in ENGLISH_STOP_WORDS for token in tokens))
+    
+    def update_query_weights(self, query_counts):
+        """Re-rank autocomplete with current search popularity, off the request path.
+        
+        Past queries boost matching product names and are suggested themselves only
+        when made of catalog words. The new index is swapped in with one assignment,
+        so concurrent lookups see the old or the new ranking.
+        """
+        weights = dict(self.suggestion_weights)
+        for query, count in query_counts.items():
+            key = normalize_text(query)
+            if key and (key in weights or self.is_catalog_query(key)):
+                weights[key] = weights.get(key, 0.0) + count * QUERY_LOG_WEIGHT
+        self.autocomplete_index = AutocompleteIndex(weights, self.suggestion_display)
+    
+    def build_semantic_index(self, products, catalog_version=None, catalog_text=None):
+        """Fit TF-IDF once for a catalog version; rows are L2-normalized, so cosine = dot product"""
+        catalog_text = self._catalog_text(products, catalog_text)
+        corpus = [catalog_text.product_tokens(i) for i in range(len(products))]
+        self.tfidf_vectorizer = TfidfVectorizer(
+            max_features=500,
+            # Unigrams and bigrams of the shared pipeline tokens (stopwords removed)
+            analyzer=TermAnalyzer(ENGLISH_STOP_WORDS if nltk_resources.nltk_available() else ()),
+            norm='l2'
+        )
+        tfidf_matrix = self.tfidf_vectorizer.fit_transform(corpus)
+        # Column-major, so a query only touches the postings of its own terms
+        self.tfidf_matrix = tfidf_matrix.tocsc()
+        self.tfidf_products = products
+        self.catalog_version = catalog_version
+        self._build_ann_index(tfidf_matrix)
+        self._attach_word_embeddings(products, catalog_text)
+    
+    def _catalog_text(self, products, catalog_text=None):
+        """Tokenized catalog text: the one passed in if it covers products, else processed now"""
+        if catalog_text is not None and catalog_text.products is products:
+            return catalog_text
+        return CatalogText(products)
+    
+    def _build_ann_index(self, tfidf_matrix):
+        """Dense product embeddings (truncated SVD of TF-IDF) and their nearest-neighbour index"""
+        self.embedding_model = None
+        self.ann_index = None
+        n_components = min(EMBEDDING_DIM, tfidf_matrix.shape[0] - 1, tfidf_matrix.shape[1] - 1)
+        if n_components < 1:
+            return
+        self.embedding_model = TruncatedSVD(n_components=n_components, random_state=0)
+        embeddings = self.embedding_model.fit_transform(tfidf_matrix)
+        self.ann_index = IVFIndex().build(embeddings)
+        self.ann_recall = self.ann_index.recall_at_k(k=10, sample=100)
+        print(f"Built ANN index over {len(self.ann_index)} products (recall@10 {self.ann_recall:.3f})")
+    
+    def _attach_word_embeddings(self, products, catalog_text=None):
+        """Index the vocabulary and product names against the pretrained word vectors"""
+        if self.word_embeddings is None:
+            return
+        catalog_text = self._catalog_text(products, catalog_text)
+        self._vocabulary_rows = self.word_embeddings.rows_for(self.vocabulary)
+        vectors = np.zeros((len(products), self.word_embeddings.dim), dtype=np.float32)
+        for i in range(len(products)):
+            vector = self.word_embeddings.mean_vector(catalog_text.product_tokens(i))
+            if vector is not None:
+                vectors[i] = vector
+        self.product_vectors = quantize(vectors)
+    
+    def _nearest_products(self, query_vec, top_k, mask=None):
+        """Approximate top-k (indices, scores) from the ANN index, or None to score exactly.
+        
+        Only large catalogs use the index. Scores are cosine similarities of the
+        LSA embeddings. A filter mask is applied to an over-fetched candidate list;
+        if it leaves fewer than top_k products, the caller falls back to exact scoring.
+        """
+        if self.ann_index is None or len(self.ann_index) < ANN_SEARCH_MIN_PRODUCTS:
+            return None
+        embedding = self.embedding_model.transform(query_vec)[0]
+        ids, scores = self.ann_index.search(embedding, top_k * ANN_CANDIDATE_FACTOR)
+        keep = scores > TFIDF_MIN_SIMILARITY
+        if mask is not None:
+            keep &= mask[ids]
+            if np.count_nonzero(keep) < top_k:
+                return None
+        return ids[keep][:top_k], scores[keep][:top_k]
+    
+    def _array_path(self, prefix, name, catalog_version):
+        """Arrays are written under their catalog version, so a load never mixes versions"""
+        return f"{NLP[prefix]}.{_version_tag(catalog_version)}.{name}.npy"
+    
+    def save_artifacts(self):
+        """Export vocabulary, the spell index, autocomplete name weights, the TF-IDF index and the ANN index
+        to the ml_config NLP paths (the autocomplete index itself depends on search popularity and is rebuilt)"""
+        if self.tfidf_matrix is None or self.catalog_version is None:
+            return False
         try:
-            # Build corpus
-            corpus = [f"{p.get('product_name', '')} {p.get('brand', '')}" 
-                     for p in products]
-            
-            # Initialize or use existing vectorizer
-            if self.tfidf_vectorizer is None:
-                self.tfidf_vectorizer = TfidfVectorizer(
-                    max_features=500,
-                    ngram_range=(1, 2),
-                    stop_words='english' if _HAS_NLTK else None
-                )
-                tfidf_matrix = self.tfidf_vectorizer.fit_transform(corpus)
-            else:
-                tfidf_matrix = self.tfidf_vectorizer.transform(corpus)
-            
-            # Transform query
-            query_vec = self.tfidf_vectorizer.transform([query])
+            # Arrays first, under versioned names; the vectorizer file is the manifest:
+            # it names the version to load and is atomically written last
+            version = self.catalog_version
+            for name in _MATRIX_ARRAYS:
+                _save_array(self._array_path('tfidf_matrix_path', name, version), getattr(self.tfidf_matrix, name))
+            if self.ann_index is not None:
+                for name in IVFIndex.ARRAYS:
+                    _save_array(self._array_path('ann_index_path', name, version), getattr(self.ann_index, name))
+            _atomic_dump({
+                'catalog_version': self.catalog_version,
+                'vocabulary': self.vocabulary,
+                'product_names': self.product_names,
+                'spell_index': self.spell_index,
+                'suggestion_weights': self.suggestion_weights,
+                'suggestion_display': self.suggestion_display,
+            }, NLP['vocabulary_path'])
+            _atomic_dump({
+                'catalog_version': self.catalog_version,
+                'vectorizer': self.tfidf_vectorizer,
+                'shape': self.tfidf_matrix.shape,
+                'embedding_model': self.embedding_model,
+                'ann_recall': self.ann_recall if self.ann_index is not None else None,
+            }, NLP['tfidf_vectorizer_path'])
+            for prefix in ('tfidf_matrix_path', 'ann_index_path'):
+                _remove_other_versions(NLP[prefix], _version_tag(version))
+            return True
+        except Exception as e:
+            print(f"⚠ Could not save NLP artifacts: {e}")
+            return False
+    
+    def load_artifacts(self, products, catalog_version, query_counts=None):
+        """Load artifacts exported for this catalog version (TF-IDF matrix and ANN vectors memory-mapped).
+        
+        Autocomplete is re-ranked with query_counts (as in build_vocabulary), so a
+        warm start reflects current search popularity rather than the exporter's.
+        Returns False, leaving the service unchanged, if they are missing or built
+        from a different catalog.
+        """
+        if catalog_version is None:
+            return False
+        try:
+            tfidf = joblib.load(NLP['tfidf_vectorizer_path'])
+            vocabulary = joblib.load(NLP['vocabulary_path'])
+            if (tfidf.get('catalog_version') != catalog_version
+                    or vocabulary.get('catalog_version') != catalog_version
+                    or 'suggestion_weights' not in vocabulary
+                    or tfidf['shape'][0] != len(products)):
+                return False
+            arrays = [np.load(self._array_path('tfidf_matrix_path', name, catalog_version), mmap_mode='r')
+                      for name in _MATRIX_ARRAYS]
+            matrix = csc_matrix(tuple(arrays), shape=tfidf['shape'], copy=False)
+            ann_index = None
+            if tfidf.get('embedding_model') is not None:
+                ann_index = IVFIndex.from_arrays({
+                    name: np.load(self._array_path('ann_index_path', name, catalog_version), mmap_mode='r')
+                    for name in IVFIndex.ARRAYS
+                })
+                if len(ann_index) != len(products):
+                    return False
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"⚠ Could not load NLP artifacts: {e}")
+            return False
+        
+        self.vocabulary = vocabulary['vocabulary']
+        self.product_names = vocabulary['product_names']
+        self.spell_index = vocabulary['spell_index']
+        self.suggestion_weights = vocabulary['suggestion_weights']
+        self.suggestion_display = vocabulary['suggestion_display']
+        self.update_query_weights(query_counts or {})
+        self.tfidf_vectorizer = tfidf['vectorizer']
+        self.tfidf_matrix = matrix
+        self.tfidf_products = products
+        self.catalog_version = catalog_version
+        self.embedding_model = tfidf.get('embedding_model')
+        self.ann_index = ann_index
+        self.ann_recall = tfidf.get('ann_recall')
+        self._attach_word_embeddings(products)
+        return True
+    
+    def semantic_search(self, query, products, top_k=50, allowed_ids=None, mode='tfidf'):
+        """Perform semantic search (optionally restricted to allowed product indices)
+        
+        allowed_ids is a collection of product indices or a boolean mask over products
+        (CatalogIndex.filter_mask).
+        
+        mode='tfidf' scores term overlap, exactly for catalogs below
+        ANN_SEARCH_MIN_PRODUCTS and through the ANN index above it; mode='embedding'
+        compares the query's mean word vector with each product's (falls back to
+        TF-IDF without embeddings).
+        """
+        try:
+            # Refit only when searching a different catalog than the index was built for
+            if self.tfidf_matrix is None or products is not self.tfidf_products:
+                self.build_semantic_index(products)
             
-            # Calculate similarities
-            similarities = cosine_similarity(query_vec, tfidf_matrix).flatten()
+            mask = None
+            if allowed_ids is not None:
+                if isinstance(allowed_ids, np.ndarray) and allowed_ids.dtype == bool:
+                    mask = allowed_ids
+                else:
+                    mask = np.zeros(len(products), dtype=bool)
+                    mask[list(allowed_ids)] = True
             
-            # Get top results
-            top_indices = np.argsort(similarities)[::-1][:top_k]
+            if mode == 'embedding' and self.product_vectors is not None:
+                query_vector = self.word_embeddings.mean_vector(self.tokenize(query))
+                if query_vector is None:
+                    return []
+                similarities = quantized_scores(*self.product_vectors, query_vector)
+                min_similarity = EMBEDDING_MIN_SIMILARITY
+            else:
+                # Sparse dot product of the (L2-normalized) query with the matching term columns
+                query_vec = self.tfidf_vectorizer.transform([query])
+                if not query_vec.nnz:
+                    return []
+                nearest = self._nearest_products(query_vec, top_k, mask)
+                if nearest is not None:
+                    return self._scored_products(products, *nearest)
+                similarities = self.tfidf_matrix[:, query_vec.indices] @ query_vec.data
+                min_similarity = TFIDF_MIN_SIMILARITY
+            if mask is not None:
+                # Filtered-out products never enter the ranking
+                similarities[~mask] = 0.0
             
-            results = []
-            for idx in top_indices:
-                if similarities[idx] > 0.1:  # Minimum similarity threshold
-                    product = products[idx].copy()
-                    product['relevance_score'] = float(similarities[idx])
-                    results.append(product)
+            # Top-k above the minimum similarity without sorting every product
+            candidates = np.flatnonzero(similarities > min_similarity)
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(-similarities[candidates], top_k - 1)[:top_k]]
+            top_indices = candidates[np.argsort(-similarities[candidates], kind='stable')]
             
-            return results
+            return self._scored_products(products, top_indices, similarities[top_indices])
         
         except Exception as e:
             print(f"Error in semantic search: {e}")
             return []
     
+    @staticmethod
+    def _scored_products(products, indices, scores):
+        """Copies of the ranked products with their relevance_score"""
+        results = []
+        for idx, score in zip(indices, scores):
+            product = products[idx].copy()
+            product['relevance_score'] = float(score)
+            results.append(product)
+        return results
+    
     def analyze_query_intent(self, query):
         """Analyze user intent from query"""
-        query_lower = query.lower()
-        
+        return self._intent(query.lower())
+    
+    def _intent(self, query_lower):
         intent = {
             'type': 'product_search',  # default
             'modifiers': []
@@ -323,27 +614,66 @@ class NLPService:
         if any(brand in query_lower for brand in self.common_brands):
             intent['modifiers'].append('brand_specific')
         
-        # Comparison intent
-        if any(word in query_lower for word in ['compare', 'vs', 'versus', 'difference']):
+        # Comparison intent (whole words: 'canvas' is not 'vs')
+        if _COMPARISON_RE.search(query_lower):
             intent['type'] = 'comparison'
         
         return intent
     
+    def comparison_queries(self, query):
+        """Products compared by a query ('iphone 15 vs galaxy s24' -> ['iphone 15', 'galaxy s24']).
+        
+        Price clauses apply to every side and are dropped. Returns [] unless at
+        least two products are named.
+        """
+        return self._sub_queries(self.preprocess_text(query))
+    
+    def _sub_queries(self, text):
+        for pattern in (_PRICE_RANGE_RE, _MAX_PRICE_RE, _MIN_PRICE_RE):
+            text = pattern.sub(' ', text)
+        text = _COMPARISON_WORDS_RE.sub(' ', text)
+        parts = (' '.join(part.split()) for part in _COMPARISON_SPLIT_RE.split(text))
+        sub_queries = list(dict.fromkeys(part for part in parts if part))
+        return sub_queries[:MAX_COMPARED] if len(sub_queries) > 1 else []
+    
     def generate_search_keywords(self, query):
         """Generate optimized search keywords from query"""
-        # Preprocess
-        cleaned = self.preprocess_text(query)
-        
-        # Tokenize
-        tokens = self.tokenize(cleaned)
-        
-        #Remove stopwords
-        tokens = self.remove_stopwords(tokens)
-        
-        # Lemmatize
-        tokens = [self.lemmatize(t) for t in tokens]
-        
-        # Expand with synonyms
-        expanded = self.expand_query(' '.join(tokens))
-        
-        return list(set(expanded))
+        return self._expand(self._lemmas(self.tokenize(query)))
+    
+    def _lemmas(self, tokens):
+        # Remove stopwords, then lemmatize
+        return [self.lemmatize(t) for t in self.remove_stopwords(tokens)]
+    
+    def plan_query(self, query):
+        """Compiled QueryPlan for a query: tokenized, corrected, parsed and expanded once.
+        
+        Plans are memoized per normalized query (LRU), so repeated queries cost a dict lookup.
+        """
+        text = self.preprocess_text(query)
+        with self._plans_lock:
+            plan = self._plans.get(text)
+            if plan is not None:
+                self._plans.move_to_end(text)
+                return plan
+        
+        tokens = self._split(text)
+        corrected_tokens = self._correct_tokens(tokens)
+        corrected_query = ' '.join(corrected_tokens)
+        lemmas = self._lemmas(corrected_tokens)
+        intent = self._intent(text)
+        plan = QueryPlan(
+            text=text,
+            tokens=tokens,
+            corrected_tokens=corrected_tokens,
+            lemmas=lemmas,
+            keywords=self._expand(lemmas),
+            entities=self._entities(corrected_query, corrected_tokens),
+            intent=intent,
+            sub_queries=self._sub_queries(corrected_query) if intent['type'] == 'comparison' else (),
+        )
+        
+        with self._plans_lock:
+            self._plans[text] = plan
+            while len(self._plans) > QUERY_PLAN_CACHE_SIZE:
+                self._plans.popitem(last=False)
+        return plan
@@ -0,0 +1,80 @@
+"""
+NLTK Resources
+Lazy, offline access to NLTK: nothing is imported or loaded until first use,
+resources are read from the bundled data directory (or installed NLTK data
+paths) and never downloaded; missing pieces fall back to pure-Python equivalents
+"""
+import re
+import threading
+from functools import lru_cache
+from ml_config import NLP
+
+
+# Fallback tokenizer: words (keeping inner hyphens/apostrophes) and single punctuation marks
+_FALLBACK_TOKEN_RE = re.compile(r"[A-Za-z0-9]+(?:[-'][A-Za-z0-9]+)*|[^\sA-Za-z0-9]")
+
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _nltk():
+    """The nltk module with the bundled data directory on its search path, or None"""
+    with _lock:
+        try:
+            import nltk
+        except ImportError:
+            print("NLTK not available. Using basic text processing.")
+            return None
+        data_dir = NLP.get('nltk_data_dir')
+        if data_dir and data_dir not in nltk.data.path:
+            nltk.data.path.insert(0, data_dir)
+        return nltk
+
+
+def nltk_available():
+    return _nltk() is not None
+
+
+@lru_cache(maxsize=None)
+def has_resource(name):
+    """True if an NLTK resource (e.g. 'corpora/wordnet') is installed locally"""
+    nltk = _nltk()
+    if nltk is None:
+        return False
+    try:
+        nltk.data.find(name)
+        return True
+    except LookupError:
+        return False
+
+
+def fallback_tokenize(text):
+    """Pure-Python word tokenizer used when NLTK's punkt models are not installed"""
+    return _FALLBACK_TOKEN_RE.findall(text)
+
+
+@lru_cache(maxsize=None)
+def word_tokenizer():
+    """NLTK word_tokenize when its punkt models are available locally, else the fallback"""
+    if has_resource('tokenizers/punkt') or has_resource('tokenizers/punkt_tab'):
+        from nltk.tokenize import word_tokenize
+        return word_tokenize
+    return fallback_tokenize
+
+
+@lru_cache(maxsize=None)
+def stop_words():
+    """English stopwords from the local NLTK corpus (empty if not installed)"""
+    if not has_resource('corpora/stopwords'):
+        return frozenset()
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words(NLP.get('language', 'english')))
+
+
+@lru_cache(maxsize=None)
+def lemmatizer():
+    """WordNet lemmatizer if the wordnet corpus is installed locally, else None"""
+    if not has_resource('corpora/wordnet'):
+        return None
+    from nltk.stem import WordNetLemmatizer
+    return WordNetLemmatizer()
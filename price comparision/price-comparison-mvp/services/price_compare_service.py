@@ -1,45 +1,143 @@
+import heapq
+from services.product_matcher import ProductMatcher
+from services.price_stats import PriceStats
+
+
 class PriceCompareService:
-    def __init__(self):
-        pass
+    def __init__(self, matcher=None):
+        self.matcher = matcher or ProductMatcher()
 
-    def compare_prices(self, products):
-        """Compare prices and mark the best price for each product."""
-        if not products:
-            return []
-
-        # Group products by name
-        product_groups = {}
-        for product in products:
-            key = product['product_name'].lower()
-            if key not in product_groups:
-                product_groups[key] = []
-            product_groups[key].append(product)
-
-        # Find best price for each group
-        compared_products = []
-        for group in product_groups.values():
-            # Sort by price ascending
-            sorted_group = sorted(group, key=lambda x: x['price'])
-            best_price = sorted_group[0]['price']
-            
-            for product in group:
-                product_copy = product.copy()
-                product_copy['is_best_price'] = product['price'] == best_price
-                compared_products.append(product_copy)
-
-        # Sort all products by price ascending
-        compared_products.sort(key=lambda x: x['price'])
-        return compared_products
+    def cluster_ids(self, products):
+        """Canonical cluster ID per product; catalog products carry one from the offline matching stage."""
+        if all(product.get('cluster_id') for product in products):
+            return [product['cluster_id'] for product in products]
+        # Live results are matched on the fly, joining catalog clusters where they match
+        return self.matcher.cluster(products)
 
-    def get_price_summary(self, products):
-        """Get price summary statistics."""
+    @staticmethod
+    def unit_groups(cluster_ids, products):
+        """Per-unit comparison group per product: its cluster, joined with every cluster
+        sharing a unit_key (the same product in another pack size).
+
+        Listings the matcher put in one cluster always share a group, even when their
+        names differ ("Amul Milk 1L" / "Amul Taaza Milk 1 L") and so their unit_keys do.
+        """
+        parent = {}
+
+        def find(key):
+            root = parent.setdefault(key, key)
+            while root != parent[root]:
+                root = parent[root]
+            parent[key] = root
+            return root
+
+        for cluster_id, product in zip(cluster_ids, products):
+            if product.get('unit_key'):
+                cluster_root = find(('cluster', cluster_id))
+                unit_root = find(('unit', product['unit_key']))
+                if cluster_root != unit_root:
+                    parent[max(cluster_root, unit_root)] = min(cluster_root, unit_root)
+        return [find(('cluster', cluster_id)) for cluster_id in cluster_ids]
+
+    def compare(self, products, limit=None, offset=0, sort_by_price=True, best_prices=None, mode='item'):
+        """Compare prices in one pass; returns the requested page, price summary and total.
+
+        Best prices per cluster and the summary come from a single scan. Only the
+        page is selected (partial top-k by price) and copied, so broad queries with
+        tens of thousands of offers never sort or copy the full result set.
+        Pass sort_by_price=False to keep an already ordered page (e.g. by discount),
+        and best_prices (cluster_id -> price) when products are one page of a larger
+        result set, so best-price flags reflect every offer rather than the page.
+
+        mode='unit' compares price_per_unit (precomputed at ingest) across pack
+        sizes of the same product (see unit_groups); offers without a pack size rank
+        after those with one.
+        """
         if not products:
-            return {}
+            return {'results': [], 'summary': {}, 'total': 0}
+
+        cluster_ids = self.cluster_ids(products)
+        if mode == 'unit':
+            group_keys = self.unit_groups(cluster_ids, products)
+            values = [(0, product['price_per_unit']) if 'price_per_unit' in product else (1, product['price'])
+                      for product in products]
+            best_values = {}
+        elif mode == 'item':
+            group_keys = cluster_ids
+            values = [product['price'] for product in products]
+            best_values = dict(best_prices or {})
+        else:
+            raise ValueError(f"Unknown comparison mode: {mode}")
+
+        stats = PriceStats()
+        for group_key, value, product in zip(group_keys, values, products):
+            stats.add(product['price'])
+            best = best_values.get(group_key)
+            if best is None or value < best:
+                best_values[group_key] = value
+
+        # Stable: equal values keep input order, as with a full sort
+        value_of = values.__getitem__
+        if not sort_by_price:
+            end = len(products) if limit is None else offset + limit
+            page = range(offset, min(end, len(products)))
+        elif limit is None:
+            page = sorted(range(len(products)), key=value_of)[offset:]
+        else:
+            page = heapq.nsmallest(offset + limit, range(len(products)), key=value_of)[offset:]
+
+        results = []
+        for i in page:
+            results.append(dict(products[i], cluster_id=cluster_ids[i],
+                                is_best_price=values[i] == best_values[group_keys[i]]))
 
-        prices = [p['price'] for p in products]
         return {
-            'min_price': min(prices),
-            'max_price': max(prices),
-            'avg_price': sum(prices) / len(prices),
-            'total_products': len(products)
+            'results': results,
+            'summary': stats.to_dict(),
+            'total': len(products),
         }
+
+    def compare_prices(self, products, limit=None, offset=0, sort_by_price=True, best_prices=None, mode='item'):
+        """Compare prices and mark the best price for each product (cheapest first by default)."""
+        return self.compare(products, limit, offset, sort_by_price, best_prices, mode)['results']
+
+    def price_matrix(self, sides):
+        """Side-by-side cross-platform prices for a comparison query.
+
+        sides is a list of (query, offers) with offers closest match first
+        (TextSearchService.compare_search). Each side resolves to the product
+        cluster of its closest offer; its row holds that product's cheapest offer
+        on every platform (None where it is not listed), and the platforms are
+        the union over all rows, so rows line up column by column.
+        """
+        rows = []
+        for query, offers in sides:
+            cheapest = {}
+            if offers:
+                cluster_ids = self.cluster_ids(offers)
+                for cluster_id, offer in zip(cluster_ids, offers):
+                    platform = offer.get('platform')
+                    if cluster_id != cluster_ids[0] or not platform:
+                        continue
+                    if platform not in cheapest or offer['price'] < cheapest[platform]['price']:
+                        cheapest[platform] = dict(offer, cluster_id=cluster_id)
+            best = min(cheapest.values(), key=lambda offer: offer['price']) if cheapest else None
+            for offer in cheapest.values():
+                offer['is_best_price'] = offer['price'] == best['price']
+            rows.append({
+                'query': query,
+                'product_name': best['product_name'] if best else None,
+                'cluster_id': best['cluster_id'] if best else None,
+                'offers': cheapest,
+                'best_price': best['price'] if best else None,
+                'best_platform': best['platform'] if best else None,
+            })
+
+        platforms = sorted({platform for row in rows for platform in row['offers']})
+        for row in rows:
+            row['offers'] = {platform: row['offers'].get(platform) for platform in platforms}
+        return {'platforms': platforms, 'rows': rows}
+
+    def get_price_summary(self, products):
+        """Get price summary statistics (min/max/mean/std and p10/median/p90)."""
+        return self.compare(products, limit=0)['summary']
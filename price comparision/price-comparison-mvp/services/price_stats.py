@@ -0,0 +1,165 @@
+"""
+Streaming Price Statistics
+Single-pass price summaries: Welford mean/variance plus a log-bucketed histogram
+for percentiles with bounded relative error. Accumulators merge exactly, so
+per-shard, per-platform and per-category summaries combine without the raw prices
+"""
+import math
+from collections import defaultdict
+import numpy as np
+
+
+RELATIVE_ACCURACY = 0.01  # percentile estimates are within 1% of a true price
+PERCENTILES = (('p10_price', 0.10), ('median_price', 0.50), ('p90_price', 0.90))
+
+
+class PriceStats:
+    """Mergeable streaming accumulator for a set of prices"""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max', 'zero_count', 'buckets', '_gamma_log')
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean (Welford)
+        self.min = None
+        self.max = None
+        self.zero_count = 0
+        self.buckets = defaultdict(int)  # log-scale bucket index -> count
+        gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._gamma_log = math.log(gamma)
+
+    @classmethod
+    def from_prices(cls, prices, relative_accuracy=RELATIVE_ACCURACY):
+        """Accumulator for an array of prices, built with vectorized operations"""
+        stats = cls(relative_accuracy)
+        prices = np.asarray(prices, dtype=np.float64)
+        if not len(prices):
+            return stats
+        stats.count = len(prices)
+        stats.mean = float(prices.mean())
+        stats.m2 = float(np.square(prices - stats.mean).sum())
+        stats.min = float(prices.min())
+        stats.max = float(prices.max())
+        positive = prices[prices > 0]
+        stats.zero_count = stats.count - len(positive)
+        indexes, counts = np.unique(np.ceil(np.log(positive) / stats._gamma_log).astype(np.int64),
+                                    return_counts=True)
+        stats.buckets.update(zip(indexes.tolist(), counts.tolist()))
+        return stats
+
+    def add(self, price):
+        """Add one price"""
+        price = float(price)
+        self.count += 1
+        delta = price - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (price - self.mean)
+
+        if self.min is None or price < self.min:
+            self.min = price
+        if self.max is None or price > self.max:
+            self.max = price
+
+        if price > 0:
+            self.buckets[math.ceil(math.log(price) / self._gamma_log)] += 1
+        else:
+            self.zero_count += 1
+        return self
+
+    def merge(self, other):
+        """Fold another accumulator into this one (parallel Welford update)"""
+        if other.count == 0:
+            return self
+        if other._gamma_log != self._gamma_log:
+            raise ValueError("Cannot merge price stats with different accuracy")
+        if self.count == 0:
+            self.mean, self.m2 = other.mean, other.m2
+        else:
+            total = self.count + other.count
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / total
+            self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count += other.count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.zero_count += other.zero_count
+        for index, count in other.buckets.items():
+            self.buckets[index] += count
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def quantile(self, q):
+        """Estimated price at quantile q (0..1)"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Bucket midpoint (in log space), clamped to the observed range
+                estimate = 2 * math.exp(index * self._gamma_log) / (1 + math.exp(self._gamma_log))
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def to_dict(self):
+        """Summary in the get_price_summary shape"""
+        if self.count == 0:
+            return {}
+        summary = {
+            'min_price': self.min,
+            'max_price': self.max,
+            'avg_price': self.mean,
+            'std_price': self.std,
+            'total_products': self.count,
+        }
+        for name, q in PERCENTILES:
+            summary[name] = round(self.quantile(q), 2)
+        return summary
+
+
+class PriceStatsBreakdown:
+    """Overall, per-platform and per-category price stats gathered in one pass"""
+
+    def __init__(self):
+        self.overall = PriceStats()
+        self.platforms = defaultdict(PriceStats)
+        self.categories = defaultdict(PriceStats)
+
+    def add(self, product):
+        price = product['price']
+        self.overall.add(price)
+        self.platforms[str(product.get('platform') or 'unknown').lower()].add(price)
+        self.categories[product.get('category') or 'uncategorized'].add(price)
+        return self
+
+    def add_all(self, products):
+        for product in products:
+            self.add(product)
+        return self
+
+    def merge(self, other):
+        """Combine with a breakdown computed on another shard"""
+        self.overall.merge(other.overall)
+        for name, stats in other.platforms.items():
+            self.platforms[name].merge(stats)
+        for name, stats in other.categories.items():
+            self.categories[name].merge(stats)
+        return self
+
+    def to_dict(self):
+        return {
+            'overall': self.overall.to_dict(),
+            'platforms': {name: stats.to_dict() for name, stats in sorted(self.platforms.items())},
+            'categories': {name: stats.to_dict() for name, stats in sorted(self.categories.items())},
+        }
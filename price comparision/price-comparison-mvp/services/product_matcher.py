@@ -0,0 +1,164 @@
+"""
+Product Matching Service
+Groups listings of the same product across platforms ("Amul Milk 1L" on Blinkit,
+"Amul Taaza Milk 1 L" on Zepto) under one canonical cluster ID using MinHash/LSH
+blocking on normalized names, verified against brand, model numbers and pack size
+"""
+import hashlib
+import random
+import zlib
+from collections import defaultdict
+from data_sources.enrichment import brand_key, normalize_text, parse_pack_size, strip_pack_size
+
+
+NUM_PERM = 48  # MinHash permutations per signature
+BANDS = 12  # LSH bands (rows per band = NUM_PERM // BANDS)
+SIMILARITY_THRESHOLD = 0.5  # minimum shingle Jaccard similarity for a match
+SHINGLE_SIZE = 3
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def cluster_id_for_key(canonical_key):
+    """Stable cluster ID for a canonical product key"""
+    return 'c' + hashlib.sha1(canonical_key.encode('utf-8')).hexdigest()[:12]
+
+
+class ProductFeatures:
+    """Normalized matching features for one product listing"""
+
+    __slots__ = ('brand', 'title', 'models', 'pack', 'shingles', 'canonical_key')
+
+    def __init__(self, product):
+        name_key = product.get('name_key') or normalize_text(product.get('product_name', ''))
+        self.brand = product.get('brand_key') or brand_key(product.get('brand'))
+
+        pack_size = product.get('pack_size')
+        pack_unit = product.get('pack_unit')
+        if pack_size is None and not product.get('enriched'):
+            pack_size, pack_unit = parse_pack_size(name_key)
+        self.pack = (round(pack_size, 1), pack_unit) if pack_size else None
+
+        title = strip_pack_size(name_key) if self.pack else name_key
+        tokens = title.split()
+        # Tokens with digits are model numbers ("s24", "501", "hd9252"); they must agree exactly
+        self.models = frozenset(token for token in tokens if any(ch.isdigit() for ch in token))
+        self.title = ' '.join(tokens)
+
+        padded = f" {self.title} "
+        self.shingles = frozenset(
+            padded[i:i + SHINGLE_SIZE] for i in range(max(len(padded) - SHINGLE_SIZE + 1, 1))
+        )
+        pack_key = f"{self.pack[0]:g}{self.pack[1]}" if self.pack else ''
+        self.canonical_key = f"{self.brand}|{self.title}|{pack_key}"
+
+    def compatible(self, other):
+        """Hard constraints: same brand, model numbers and pack size where both are known"""
+        if self.brand and other.brand and self.brand != other.brand:
+            return False
+        if self.models != other.models:
+            return False
+        if self.pack and other.pack and self.pack != other.pack:
+            return False
+        return True
+
+    def similarity(self, other):
+        """Jaccard similarity of name shingles"""
+        if not self.shingles or not other.shingles:
+            return 0.0
+        shared = len(self.shingles & other.shingles)
+        return shared / (len(self.shingles) + len(other.shingles) - shared)
+
+
+class ProductMatcher:
+    """MinHash/LSH product matcher assigning canonical cluster IDs"""
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, threshold=SIMILARITY_THRESHOLD, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def minhash(self, shingles):
+        """MinHash signature of a shingle set"""
+        hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles]
+        if not hashes:
+            return (_MAX_HASH,) * self.num_perm
+        return tuple(
+            min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH
+            for a, b in self._perms
+        )
+
+    def _candidate_pairs(self, features):
+        """Index pairs sharing at least one LSH band bucket"""
+        buckets = defaultdict(list)
+        for i, feature in enumerate(features):
+            signature = self.minhash(feature.shingles)
+            for band in range(self.bands):
+                start = band * self.rows
+                buckets[(band, signature[start:start + self.rows])].append(i)
+
+        pairs = set()
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+        return pairs
+
+    def cluster(self, products, seeded=True):
+        """Cluster IDs for products (parallel list); products are not modified.
+
+        With seeded=True, products that already carry a cluster_id keep it and
+        unclustered listings that match them join that cluster.
+        """
+        features = [ProductFeatures(product) for product in products]
+        existing = [product.get('cluster_id') if seeded else None for product in products]
+        parent = list(range(len(products)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j in self._candidate_pairs(features):
+            if existing[i] and existing[j]:
+                continue  # already resolved by an earlier matching run
+            if not features[i].compatible(features[j]):
+                continue
+            if features[i].similarity(features[j]) < self.threshold:
+                continue
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+        members = defaultdict(list)
+        for i in range(len(products)):
+            members[find(i)].append(i)
+
+        cluster_ids = [None] * len(products)
+        for group in members.values():
+            seeded = sorted(existing[i] for i in group if existing[i])
+            if seeded:
+                cluster_id = seeded[0]
+            else:
+                # Derived from member content so IDs stay stable across rebuilds
+                cluster_id = cluster_id_for_key(min(features[i].canonical_key for i in group))
+            for i in group:
+                cluster_ids[i] = existing[i] or cluster_id
+        return cluster_ids
+
+    def assign_clusters(self, products):
+        """Offline matching stage: store a cluster_id on every product; returns cluster count"""
+        cluster_ids = self.cluster(products, seeded=False)
+        for product, cluster_id in zip(products, cluster_ids):
+            product['cluster_id'] = cluster_id
+        return len(set(cluster_ids))
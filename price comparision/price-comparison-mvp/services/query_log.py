@@ -0,0 +1,55 @@
+"""
+Search Query Log
+Bounded, decaying counts of successful searches. Autocomplete only learns from
+queries searched often enough, so one-off (possibly personal) queries never
+become public suggestions
+"""
+import threading
+import time
+from data_sources.enrichment import normalize_text
+
+
+QUERY_LOG_SIZE = 5000  # distinct queries kept; the least searched are dropped beyond it
+QUERY_LOG_HALF_LIFE = 24 * 3600  # seconds for a query's count to halve
+MIN_QUERY_COUNT = 3  # decayed searches before a query can be suggested
+
+
+class QueryLog:
+    """Popularity of normalized queries, bounded in size and decaying over time"""
+
+    def __init__(self, max_size=QUERY_LOG_SIZE, half_life=QUERY_LOG_HALF_LIFE):
+        self.max_size = max_size
+        self.half_life = half_life
+        self._counts = {}  # normalized query -> decayed count
+        self._decayed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._counts)
+
+    def record(self, query):
+        """Count one successful search of a query"""
+        key = normalize_text(query)
+        if not key:
+            return
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0.0) + 1.0
+            # Prune in batches: once twice over the cap, keep the max_size most searched
+            if len(self._counts) > 2 * self.max_size:
+                ranked = sorted(self._counts.items(), key=lambda item: -item[1])
+                self._counts = dict(ranked[:self.max_size])
+
+    def decay(self, now=None):
+        """Scale every count by the time since the last decay; drop those near zero"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            factor = 0.5 ** ((now - self._decayed_at) / self.half_life)
+            self._decayed_at = now
+            self._counts = {key: count * factor for key, count in self._counts.items() if count * factor >= 0.5}
+
+    def popular(self, min_count=MIN_QUERY_COUNT, limit=None):
+        """{query: count} for queries searched at least min_count times, most searched first"""
+        with self._lock:
+            ranked = sorted((item for item in self._counts.items() if item[1] >= min_count),
+                            key=lambda item: (-item[1], item[0]))
+        return dict(ranked[:limit] if limit is not None else ranked)
@@ -26,6 +26,8 @@ class RecommendationEngine:
         self.user_preferences = defaultdict(dict)  # user_id -> preferences
         self.item_similarity_matrix = None
         self.products_catalog = []
+        self.ann_index = None  # shared IVFIndex over catalog embeddings (item ID = catalog position)
+        self._catalog_rows = {}  # product ID -> catalog position
         
         if _HAS_SKLEARN:
             self.tfidf_vectorizer = TfidfVectorizer(max_features=100)
@@ -34,6 +36,11 @@ class RecommendationEngine:
             self.tfidf_vectorizer = None
             self.scaler = None
     
+    def adopt_user_state(self, other):
+        """Share another engine's interaction history and preferences (used across catalog rebuilds)"""
+        self.user_interactions = other.user_interactions
+        self.user_preferences = other.user_preferences
+    
     def add_interaction(self, user_id, product, interaction_type='view', weight=1.0):
         """Record user interaction with a product"""
         self.user_interactions[user_id].append({
@@ -82,6 +89,11 @@ class RecommendationEngine:
         """Build feature vectors for products"""
         self.products_catalog = products
         
+        if self.ann_index is not None:
+            # Neighbours come from the shared ANN index; no per-engine feature vectors needed
+            self._catalog_rows = {self._get_product_id(p): i for i, p in enumerate(products)}
+            return
+        
         if not _HAS_SKLEARN or not products:
             return
         
@@ -89,7 +101,8 @@ class RecommendationEngine:
             # Create text representations
             product_texts = []
             for product in products:
-                text = f"{product.get('product_name', '')} {product.get('brand', '')} {product.get('category', '')}"
+                # Search key precomputed at ingest (name, brand, inferred category)
+                text = product.get('search_text') or f"{product.get('product_name', '')} {product.get('brand', '')} {product.get('category', '')}"
                 product_texts.append(text)
             
             # Create TF-IDF features
@@ -110,8 +123,8 @@ class RecommendationEngine:
         return f"{product.get('product_name', '')}_{product.get('platform', '')}"
     
     def compute_item_similarity(self):
-        """Compute item-item similarity matrix"""
-        if not self.product_features or not _HAS_SKLEARN:
+        """Compute item-item similarity matrix (skipped when an ANN index answers neighbour queries)"""
+        if self.ann_index is not None or not self.product_features or not _HAS_SKLEARN:
             return
         
         try:
@@ -139,6 +152,15 @@ class RecommendationEngine:
         """Find similar products (content-based)"""
         product_id = self._get_product_id(product)
         
+        if self.ann_index is not None and product_id in self._catalog_rows:
+            ids, scores = self.ann_index.search_item(self._catalog_rows[product_id], top_k)
+            similar_products = []
+            for similar_id, score in zip(ids, scores):
+                p_copy = self.products_catalog[similar_id].copy()
+                p_copy['similarity_score'] = float(score)
+                similar_products.append(p_copy)
+            return similar_products
+        
         if self.item_similarity_matrix and product_id in self.item_similarity_matrix:
             # Get similarities
             similarities = self.item_similarity_matrix[product_id]
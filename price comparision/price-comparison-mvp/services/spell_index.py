@@ -0,0 +1,76 @@
+"""
+Spell Index
+SymSpell-style deletion dictionary over the catalog vocabulary: candidates within
+the maximum edit distance are found by dictionary lookups of the query's deletion
+variants instead of measuring the distance to every vocabulary word
+"""
+from collections import defaultdict
+
+
+MAX_EDIT_DISTANCE = 2
+
+
+def deletes(word, max_distance=MAX_EDIT_DISTANCE):
+    """All strings obtained by deleting up to max_distance characters (word included)"""
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants |= frontier
+    return variants
+
+
+def levenshtein(s1, s2, max_distance=None):
+    """Levenshtein distance; returns max_distance + 1 once it is known to exceed max_distance"""
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    if max_distance is not None and len(s1) - len(s2) > max_distance:
+        return max_distance + 1
+    if not s2:
+        return len(s1)
+
+    previous_row = list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1):
+        current_row = [i + 1]
+        for j, c2 in enumerate(s2):
+            current_row.append(min(previous_row[j + 1] + 1, current_row[j] + 1, previous_row[j] + (c1 != c2)))
+        if max_distance is not None and min(current_row) > max_distance:
+            return max_distance + 1
+        previous_row = current_row
+    return previous_row[-1]
+
+
+class SpellIndex:
+    """Deletion dictionary answering "closest vocabulary word within distance N" """
+
+    def __init__(self, word_counts, max_distance=MAX_EDIT_DISTANCE):
+        self.max_distance = max_distance
+        self.counts = dict(word_counts)  # word -> corpus frequency
+        self._deletes = defaultdict(list)  # deletion variant -> vocabulary words producing it
+        for word in self.counts:
+            for variant in deletes(word, max_distance):
+                self._deletes[variant].append(word)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, word):
+        return word in self.counts
+
+    def candidates(self, word):
+        """Vocabulary words within max_distance of word, as {word: distance}"""
+        found = {}
+        for variant in deletes(word, self.max_distance):
+            for candidate in self._deletes.get(variant, ()):
+                if candidate not in found:
+                    found[candidate] = levenshtein(word, candidate, self.max_distance)
+        return {candidate: distance for candidate, distance in found.items() if distance <= self.max_distance}
+
+    def correct(self, word):
+        """Closest vocabulary word (ties: most frequent, then alphabetical), or word itself"""
+        if word in self.counts:
+            return word
+        candidates = self.candidates(word)
+        if not candidates:
+            return word
+        return min(candidates, key=lambda c: (candidates[c], -self.counts[c], c))
@@ -0,0 +1,110 @@
+"""
+Catalog Text Pipeline
+Bulk tokenization of catalog names and brands, done once per catalog version and
+shared by the vocabulary, spell, autocomplete, TF-IDF and word-embedding builds:
+distinct strings are tokenized in chunks across a process pool, and each distinct
+token is lemmatized once
+"""
+import multiprocessing
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from services import nltk_resources
+
+
+CHUNK_SIZE = 2000  # distinct strings per worker task
+PARALLEL_MIN_TEXTS = 20000  # below this, starting worker processes costs more than it saves
+MAX_WORKERS = os.cpu_count() or 1
+
+_CLEAN_RE = re.compile(r'[^a-z0-9\s\-]')
+
+
+def clean_text(text):
+    """Lowercase, keep letters, digits and hyphens (for product names), collapse whitespace"""
+    if not text:
+        return ""
+    return ' '.join(_CLEAN_RE.sub(' ', text.lower()).split())
+
+
+def tokenize(text):
+    return nltk_resources.word_tokenizer()(clean_text(text))
+
+
+def _tokenize_chunk(texts):
+    tokenizer = nltk_resources.word_tokenizer()
+    return [tokenizer(clean_text(text)) for text in texts]
+
+
+def tokenize_all(texts, workers=None, chunk_size=CHUNK_SIZE):
+    """Tokens of each distinct text, as {text: tokens}; large inputs use a process pool"""
+    distinct = list(dict.fromkeys(texts))
+    chunks = [distinct[i:i + chunk_size] for i in range(0, len(distinct), chunk_size)]
+    workers = min(workers or MAX_WORKERS, len(chunks))
+    results = None
+    if workers > 1 and len(distinct) >= PARALLEL_MIN_TEXTS:
+        try:
+            # spawn, not fork: the web process holds locks and threads (index rebuilds,
+            # scheduler) that a forked child would inherit in whatever state they were in
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                results = list(pool.map(_tokenize_chunk, chunks))
+        except (OSError, RuntimeError) as e:
+            # No process pool available here (e.g. restricted sandbox): tokenize serially
+            print(f"⚠ Parallel tokenization unavailable ({e}), tokenizing serially")
+    if results is None:
+        results = [_tokenize_chunk(chunk) for chunk in chunks]
+
+    tokens = {}
+    for chunk, chunk_tokens in zip(chunks, results):
+        tokens.update(zip(chunk, chunk_tokens))
+    return tokens
+
+
+class CatalogText:
+    """Tokenized names and brands of a catalog, row-aligned with its products"""
+
+    def __init__(self, products, workers=None):
+        names = [product.get('product_name', '') or '' for product in products]
+        brands = [product.get('brand', '') or '' for product in products]
+        # Listings repeat names and brands across platforms: tokenize each string once
+        occurrences = Counter(names)
+        occurrences.update(brands)
+        tokens = tokenize_all(occurrences, workers)
+
+        self.products = products
+        self.name_tokens = [tokens[name] for name in names]
+        self.brand_tokens = [tokens[brand] for brand in brands]
+        self.token_counts = Counter()  # token -> occurrences across all names and brands
+        for text, count in occurrences.items():
+            for token in tokens[text]:
+                self.token_counts[token] += count
+
+        lemmatizer = nltk_resources.lemmatizer()
+        self.lemmas = {
+            token: lemmatizer.lemmatize(token) if lemmatizer else token
+            for token in self.token_counts
+        }
+
+    def __len__(self):
+        return len(self.name_tokens)
+
+    def product_tokens(self, i):
+        """Tokens of product i's name followed by its brand"""
+        return self.name_tokens[i] + self.brand_tokens[i]
+
+
+class TermAnalyzer:
+    """TF-IDF analyzer over pipeline tokens: unigrams and bigrams, stopwords removed.
+
+    Takes raw text (queries) or a pre-tokenized list (catalog rows from CatalogText),
+    so fitting reuses the pipeline's tokens and queries are analyzed the same way.
+    """
+
+    def __init__(self, stop_words=()):
+        self.stop_words = frozenset(stop_words)
+
+    def __call__(self, doc):
+        tokens = tokenize(doc) if isinstance(doc, str) else doc
+        words = [token for token in tokens if len(token) > 1 and token not in self.stop_words]
+        return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
@@ -2,21 +2,51 @@
 Enhanced Text Search Service with Live Scraping Support
 Searches products using both local datasets and live web scraping
 """
+import heapq
 import os
+from concurrent.futures import ThreadPoolExecutor
 from data_sources.source_manager import SourceManager
+from data_sources.enrichment import ProductEnricher, normalize_text
+from services.negative_cache import NegativeResultCache
+from services.query_log import QueryLog
+
+
+COMPARISON_CANDIDATES = 200  # closest catalog offers kept per side of a comparison
+
+
+def _match_rank(product, query_words):
+    """Sort key: closest name match first, then cheapest
+
+    Name words beyond the query count against a match unless they are the brand
+    or carry digits (storage, size, model variants), so accessories for a
+    product ("iphone 15 silicone case") rank below the product itself.
+    """
+    words = (product.get('name_key') or normalize_text(product.get('product_name', ''))).split()
+    brand_words = set(normalize_text(product.get('brand', '')).split())
+    extra = sum(1 for word in words
+                if word not in query_words and word not in brand_words and not any(ch.isdigit() for ch in word))
+    return extra, product.get('price') or 0
 
 
 class TextSearchService:
-    def __init__(self, use_live_scraping=True):
+    def __init__(self, use_live_scraping=True, source_manager=None):
         """
         Initialize search service
         
         Args:
             use_live_scraping: If True, scrape live data from e-commerce sites
+            source_manager: SourceManager to search (shared with the app so the catalog
+                is loaded once); defaults to one for the DATA_SOURCE environment variable
         """
-        data_source = os.environ.get('DATA_SOURCE', 'dataset')
-        self.source_manager = SourceManager(data_source=data_source)
+        if source_manager is None:
+            source_manager = SourceManager(data_source=os.environ.get('DATA_SOURCE', 'dataset'))
+        self.source_manager = source_manager
         self.use_live_scraping = use_live_scraping
+        self.enricher = ProductEnricher()
+        self.best_price_index = None  # optional BestPriceIndex fed with every live scrape
+        self.index_manager = None  # optional IndexRebuildManager serving the catalog index
+        self.negative_cache = NegativeResultCache()  # queries known to return nothing
+        self.query_log = QueryLog()  # successful searches (autocomplete popularity)
         
         # Initialize live scraper if enabled
         self.live_scraper = None
@@ -47,45 +77,310 @@ class TextSearchService:
         # Determine whether to use live scraping
         should_use_live = use_live if use_live is not None else self.use_live_scraping
         
+        generation = self._current_generation()
+        version = generation.version if generation else None
+        if self.is_known_miss(query, version):
+            return []
+        
+        # No query token occurs in the catalog: a dataset scan cannot match, and if the
+        # query looks like a misspelling the caller offers a suggestion instead of scraping
+        cannot_match = generation is not None and not generation.index.may_match(query)
+        if cannot_match and (not should_use_live or self.suggest_correction(query, generation)):
+            self.negative_cache.add(normalize_text(query), version)
+            return []
+        
         results = []
+        failed = False
         
         # Try live scraping first if enabled
         if should_use_live and self.live_scraper:
             try:
                 print(f"🔍 Searching live data for: '{query}'")
-                live_results = self.live_scraper.search_all_platforms(query, max_per_platform=10)
-                results.extend(live_results)
+                failures = []
+                live_results = self.live_scraper.search_all_platforms(query, max_per_platform=10,
+                                                                      failures=failures)
+                # A platform that did not answer may list the product: not a genuine miss
+                failed = bool(failures)
+                # Live offers never went through ingest, so enrich them on arrival
+                results.extend(self.enricher.enrich(p) for p in live_results)
+                self._record_live_prices(results)
                 print(f"✓ Found {len(live_results)} live products")
             except Exception as e:
+                failed = True
                 print(f"⚠ Live scraping failed: {e}")
                 print("  Falling back to local datasets...")
         
         # If no live results or live scraping disabled, use local datasets
-        if not results:
+        if not results and not cannot_match:
             try:
-                dataset_results = self.source_manager.search_products(query, platform=platform)
+                if generation is not None:
+                    # The live generation indexes the whole catalog: no feed scan per query
+                    dataset_results = generation.index.search(query, platform)
+                else:
+                    dataset_results = self.source_manager.search_products(query, platform=platform)
                 results.extend(dataset_results or [])
                 if results:
                     print(f"✓ Found {len(results)} products in local datasets")
             except Exception as e:
+                failed = True
                 print(f"⚠ Dataset search error: {e}")
         
+        # Remember genuine misses (not platform-restricted ones or failures) for this catalog version
+        if not results and not platform and not failed:
+            self.negative_cache.add(normalize_text(query), version)
+        
         return results or []
     
+    def search_page(self, index, query, sort='price', cursor=None, limit=50, platform=None, use_live=None,
+                    filters=None, facets=False):
+        """
+        One page of search results with cursor pagination
+        
+        The first page prefers live offers (as search_products does). Otherwise the
+        query's catalog matches are intersected with the index's presorted order,
+        so a page costs O(page) rather than sorting every match. Structured filters
+        (SearchFilters) are applied inside the index and skip the live path.
+        
+        Queries the catalog's term filter rules out (or that are cached as misses)
+        skip the index; misspelled ones also skip the live scrape and return a
+        spelling suggestion instead.
+        
+        The price summary and facet counts cover every match, so they are only
+        computed when requested (facets=True) and only for the first page.
+        
+        Returns:
+            Dict with products, next_cursor, total, summary and facets (first page with
+            facets=True, else None),
+            live flag, best_prices (catalog-wide cheapest price per cluster on the page)
+            and suggestion (corrected query when nothing matched, else None)
+        """
+        should_use_live = use_live if use_live is not None else self.use_live_scraping
+        try_live = not cursor and should_use_live and self.live_scraper and not filters
+
+        # Unmatchable queries skip the index and, when misspelled, the live scrape too
+        known_miss = self.is_known_miss(query, index.version)
+        if known_miss or not index.may_match(query):
+            suggestion = self.suggest_correction(query)
+            live_results, answered = [], True
+            if try_live and not known_miss and not suggestion:
+                live_results, answered = self._scrape_live(query)
+            if live_results:
+                return {'products': live_results, 'next_cursor': None, 'total': len(live_results),
+                        'summary': None, 'facets': None, 'live': True, 'best_prices': None,
+                        'suggestion': None}
+            # Only a miss every live source confirmed is cached (as in search_products)
+            if answered:
+                self.negative_cache.add(normalize_text(query), index.version)
+            return {'products': [], 'next_cursor': None, 'total': 0, 'summary': None, 'facets': None,
+                    'live': False, 'best_prices': None, 'suggestion': suggestion}
+
+        if try_live:
+            live_results = self.search_live_only(query)
+            if live_results:
+                return {'products': live_results, 'next_cursor': None, 'total': len(live_results),
+                        'summary': None, 'facets': None, 'live': True, 'best_prices': None,
+                        'suggestion': None}
+
+        # A faceted first page resolves the query once, as a mask that feeds the page,
+        # the vectorized price summary and the facet counts
+        with_facets = facets and not cursor
+        if with_facets:
+            matches = index.match_mask(query, platform, filters)
+            total = int(matches.sum())
+        else:
+            matches = index.match_set(query, platform, filters)
+            total = len(matches)
+        products, next_cursor = index.page(sort, cursor, limit, matches)
+
+        summary = facet_counts = None
+        if not cursor and total:
+            self.query_log.record(query)
+        if with_facets:
+            summary = index.match_price_stats(matches).to_dict()
+            facet_counts = index.facet_counts(matches)
+
+        best_prices = {}
+        for product in products:
+            cluster_id = product.get('cluster_id')
+            if cluster_id and cluster_id not in best_prices:
+                best_prices[cluster_id] = index.cluster_best_price(cluster_id)
+
+        suggestion = self.suggest_correction(query) if not total and not cursor else None
+
+        return {'products': products, 'next_cursor': next_cursor, 'total': total,
+                'summary': summary, 'facets': facet_counts, 'live': False, 'best_prices': best_prices,
+                'suggestion': suggestion}
+    
+    def search_many(self, keywords, mode='any', limit=None, platform=None, filters=None, index=None):
+        """
+        Search several keywords at once and return deduplicated, scored results
+        
+        All keywords are resolved in one catalog index pass instead of one search
+        per keyword. Results are ordered by the share of keywords matched
+        (search_score), then by price.
+        
+        Args:
+            keywords: Iterable of keyword strings
+            mode: 'any' (match at least one keyword) or 'all' (match every keyword)
+            limit: Maximum number of results
+            index: CatalogIndex to use (defaults to the live catalog generation)
+        """
+        keywords = [k for k in dict.fromkeys(keywords or []) if k and k.strip()]
+        if not keywords:
+            return []
+
+        if index is None and self.index_manager is not None:
+            generation = self.index_manager.current()
+            index = generation.index if generation else None
+
+        if index is not None:
+            counts = index.match_many(keywords, mode, platform, filters)
+            price_rank = index.ranks.get('price')
+            order_key = (lambda pid: (-counts[pid], price_rank[pid])) if price_rank else (lambda pid: (-counts[pid], pid))
+            ids = sorted(counts, key=order_key)
+            if limit is not None:
+                ids = ids[:limit]
+            return [dict(index.products[pid], search_score=counts[pid] / len(keywords)) for pid in ids]
+
+        # No index yet: one dataset scan for the combined keywords, scored per keyword
+        scored = []
+        for product in self.search_datasets_only(' '.join(keywords), platform=platform):
+            text = product.get('search_text') or product.get('product_name', '').lower()
+            matched = sum(1 for keyword in keywords if keyword.lower() in text)
+            if matched and (mode == 'any' or matched == len(keywords)):
+                scored.append(dict(product, search_score=matched / len(keywords)))
+        scored.sort(key=lambda p: (-p['search_score'], p['price']))
+        return scored[:limit] if limit is not None else scored
+
+    def smart_search(self, plan, generation, filters=None, preferences=None, limit=50, semantic_mode='tfidf'):
+        """
+        Ranked results for a planned single-product query (NLPService.plan_query)
+
+        Semantic ranking of the corrected query, falling back to the expanded
+        keywords. Only filters exclude products; preferences (brands and
+        categories the query names) move matching results first, and select
+        the most popular preferred products when nothing matches the text.
+
+        Args:
+            plan: QueryPlan of the query
+            generation: CatalogGeneration to search
+            filters: Optional SearchFilters every result must pass
+            preferences: Optional SearchFilters ranking matching results first
+            limit: Maximum number of results
+            semantic_mode: 'tfidf' or 'embedding' (NLPService.semantic_search)
+        """
+        index = generation.index
+        allowed_ids = index.filter_mask(filters)
+        results = generation.nlp_service.semantic_search(plan.corrected_query, generation.products, top_k=limit,
+                                                         allowed_ids=allowed_ids, mode=semantic_mode)
+        if not results:
+            results = self.search_many(plan.keywords[:5], mode='any', limit=limit, filters=filters, index=index)
+        if not preferences:
+            return results
+        if results:
+            # Stable: preferred results first, each group in relevance order
+            return sorted(results, key=lambda product: not preferences.matches(product))
+
+        preferred = index.filter_mask(preferences)
+        if allowed_ids is not None:
+            preferred &= allowed_ids
+        ids, _ = index.ordered_page('popularity', limit, candidates=preferred)
+        return [dict(index.products[pid]) for pid in ids]
+
+    def compare_search(self, queries, index, filters=None, use_live=None, limit=COMPARISON_CANDIDATES):
+        """
+        Offers for each product of a comparison query, searched in parallel
+        
+        Every sub-query's catalog lookup and live scrape runs on its own worker,
+        so the comparison takes about as long as its slowest sub-query rather
+        than their sum. As in search_page, structured filters skip the live path.
+        
+        Args:
+            queries: Sub-queries, one per compared product (NLPService.comparison_queries)
+            index: CatalogIndex to search
+            filters: Optional SearchFilters applied to every side
+            limit: Catalog offers kept per side
+        
+        Returns:
+            List of (query, offers) in query order, offers closest match first
+        """
+        queries = [query for query in dict.fromkeys(queries or []) if normalize_text(query)]
+        if not queries:
+            return []
+        should_use_live = use_live if use_live is not None else self.use_live_scraping
+        try_live = bool(should_use_live and self.live_scraper and not filters)
+        
+        with ThreadPoolExecutor(max_workers=len(queries) * (2 if try_live else 1)) as pool:
+            catalog = [pool.submit(self._comparison_offers, index, query, filters, limit) for query in queries]
+            live = [pool.submit(self.search_live_only, query) if try_live else None for query in queries]
+            sides = []
+            for query, catalog_future, live_future in zip(queries, catalog, live):
+                offers = catalog_future.result() + (live_future.result() if live_future else [])
+                query_words = set(normalize_text(query).split())
+                offers.sort(key=lambda product: _match_rank(product, query_words))
+                sides.append((query, offers))
+        return sides
+    
+    def _comparison_offers(self, index, query, filters, limit):
+        """Closest catalog offers matching every word of one side of a comparison"""
+        words = normalize_text(query).split()
+        counts = index.match_many(words, 'all', filters=filters)
+        query_words = set(words)
+        ids = heapq.nsmallest(limit, counts, key=lambda pid: _match_rank(index.products[pid], query_words))
+        return [index.products[pid] for pid in ids]
+    
+    def _current_generation(self):
+        """Live catalog generation, without waiting for the first build"""
+        if self.index_manager is None:
+            return None
+        return self.index_manager.current(timeout=0)
+
+    def is_known_miss(self, query, version=None):
+        """True if the query recently returned nothing for this catalog version"""
+        return (normalize_text(query), version) in self.negative_cache
+
+    def suggest_correction(self, query, generation=None):
+        """Spelling suggestion from the catalog vocabulary that can match, or None"""
+        generation = generation or self._current_generation()
+        if generation is None:
+            return None
+        nlp_service = generation.nlp_service
+        corrected = nlp_service.correct_query(query)
+        if not corrected or corrected == ' '.join(nlp_service.tokenize(query)):
+            return None
+        return corrected if generation.index.may_match(corrected) else None
+    
     def search_live_only(self, query):
         """Search only live data from e-commerce platforms"""
+        return self._scrape_live(query)[0]
+    
+    def _scrape_live(self, query):
+        """Live results and whether every platform answered (False on any error)"""
         if not self.live_scraper:
             print("⚠ Live scraping not available")
-            return []
+            return [], False
         
         try:
-            return self.live_scraper.search_all_platforms(query, max_per_platform=10)
+            failures = []
+            live_results = self.live_scraper.search_all_platforms(query, max_per_platform=10,
+                                                                  failures=failures)
+            results = [self.enricher.enrich(p) for p in live_results]
+            self._record_live_prices(results)
+            return results, not failures
         except Exception as e:
             print(f"Live search error: {e}")
-            return []
+            return [], False
     
+    def _record_live_prices(self, products):
+        """Push freshly scraped prices into the best-price index"""
+        if self.best_price_index is not None and products:
+            self.best_price_index.record_offers(products, source='live')
+
     def search_datasets_only(self, query, platform=None):
-        """Search only local datasets"""
+        """Search only local datasets (through the live generation's index once built)"""
+        generation = self._current_generation()
+        if generation is not None:
+            return generation.index.search(query, platform)
         try:
             return self.source_manager.search_products(query, platform=platform) or []
         except Exception as e:
@@ -0,0 +1,195 @@
+"""
+Quantized Word Embeddings
+Pretrained word vectors (word2vec text or binary format) stored as int8 codes with
+a per-row scale in memory-mapped .npy files: a quarter of the float32 footprint,
+scored with chunked NumPy dot products
+"""
+import os
+import threading
+import numpy as np
+
+try:
+    from gensim.models import KeyedVectors
+    _HAS_GENSIM = True
+except ImportError:
+    _HAS_GENSIM = False
+
+
+CHUNK_ROWS = 65536  # rows dequantized per dot-product batch
+
+
+def quantize(vectors):
+    """L2-normalize rows and quantize them to int8 codes with one float32 scale per row"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors = vectors / norms
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def quantized_scores(codes, scales, query, rows=None):
+    """Cosine similarity of a vector to quantized unit rows, dequantizing in chunks"""
+    query = np.asarray(query, dtype=np.float32)
+    total = len(codes) if rows is None else len(rows)
+    norm = np.linalg.norm(query)
+    if norm == 0:
+        return np.zeros(total, dtype=np.float32)
+    query = query / norm
+    scores = np.empty(total, dtype=np.float32)
+    for start in range(0, total, CHUNK_ROWS):
+        chunk = slice(start, min(start + CHUNK_ROWS, total))
+        selected = chunk if rows is None else rows[chunk]
+        scores[chunk] = (codes[selected].astype(np.float32) @ query) * scales[selected]
+    return scores
+
+
+def _read_word2vec(path):
+    """Minimal word2vec reader (text or binary) for deployments without gensim"""
+    with open(path, 'rb') as f:
+        count, dim = (int(x) for x in f.readline().split())
+        binary = path.endswith('.bin')
+        words = []
+        vectors = np.empty((count, dim), dtype=np.float32)
+        for row in range(count):
+            if binary:
+                word = bytearray()
+                while True:
+                    ch = f.read(1)
+                    if ch == b' ' or not ch:
+                        break
+                    if ch != b'\n':
+                        word.extend(ch)
+                words.append(word.decode('utf-8', errors='ignore'))
+                vectors[row] = np.frombuffer(f.read(4 * dim), dtype=np.float32)
+            else:
+                parts = f.readline().decode('utf-8', errors='ignore').rstrip().split(' ')
+                words.append(parts[0])
+                vectors[row] = np.asarray(parts[1:dim + 1], dtype=np.float32)
+    return words, vectors
+
+
+class QuantizedEmbeddings:
+    """Read-only int8 embedding table with cosine-similarity search"""
+
+    def __init__(self, words, codes, scales):
+        self.words = list(words)
+        self.codes = codes  # n x dim int8 (memory-mapped when loaded from disk)
+        self.scales = scales  # n float32: row vector = codes[row] * scales[row]
+        self.index = {word: row for row, word in enumerate(self.words)}
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.index
+
+    @property
+    def dim(self):
+        return self.codes.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.scales.nbytes
+
+    def vector(self, word):
+        """Dequantized unit vector of a word, or None if unknown"""
+        row = self.index.get(word)
+        if row is None:
+            return None
+        return self.codes[row].astype(np.float32) * self.scales[row]
+
+    def mean_vector(self, tokens):
+        """Average vector of the known tokens, or None if none are known"""
+        rows = [self.index[token] for token in tokens if token in self.index]
+        if not rows:
+            return None
+        rows = np.asarray(rows)
+        return (self.codes[rows].astype(np.float32) * self.scales[rows, None]).mean(axis=0)
+
+    def rows_for(self, words):
+        """Row numbers of the given words that have embeddings"""
+        return np.asarray(sorted(self.index[word] for word in words if word in self.index), dtype=np.int64)
+
+    def scores(self, query, rows=None):
+        """Cosine similarity of a vector to every row (or the given rows)"""
+        return quantized_scores(self.codes, self.scales, query, rows)
+
+    def most_similar(self, word, top_n=10, rows=None, min_similarity=0.0):
+        """Nearest words to a word (optionally among the given rows); returns [(word, score)]"""
+        query = self.vector(word)
+        if query is None:
+            return []
+        scores = self.scores(query, rows)
+        candidate_rows = np.arange(len(self)) if rows is None else rows
+        order = np.argsort(-scores, kind='stable')
+        similar = []
+        for i in order:
+            if scores[i] < min_similarity or len(similar) >= top_n:
+                break
+            candidate = self.words[candidate_rows[i]]
+            if candidate != word:
+                similar.append((candidate, float(scores[i])))
+        return similar
+
+    @staticmethod
+    def _cache_paths(path):
+        return f"{path}.int8.npy", f"{path}.scales.npy", f"{path}.words.txt"
+
+    def save(self, path):
+        """Write the quantized cache next to the source embeddings"""
+        codes_path, scales_path, words_path = self._cache_paths(path)
+        for target, array in ((codes_path, self.codes), (scales_path, self.scales)):
+            tmp_path = f"{target}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, target)
+        tmp_path = f"{words_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.words))
+        os.replace(tmp_path, words_path)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map the quantized cache of path, converting the source first if needed"""
+        codes_path, scales_path, words_path = cls._cache_paths(path)
+        fresh = os.path.exists(words_path) and (
+            not os.path.exists(path) or os.path.getmtime(words_path) >= os.path.getmtime(path)
+        )
+        if not fresh:
+            if not os.path.exists(path):
+                return None
+            embeddings = cls.from_word2vec(path)
+            embeddings.save(path)
+        with open(words_path, encoding='utf-8') as f:
+            words = f.read().split('\n')
+        return cls(words, np.load(codes_path, mmap_mode='r'), np.load(scales_path, mmap_mode='r'))
+
+    @classmethod
+    def from_word2vec(cls, path):
+        """Quantize word2vec-format vectors (via gensim when installed)"""
+        if _HAS_GENSIM:
+            vectors = KeyedVectors.load_word2vec_format(path, binary=path.endswith('.bin'))
+            words, matrix = list(vectors.index_to_key), vectors.vectors
+        else:
+            words, matrix = _read_word2vec(path)
+        codes, scales = quantize(matrix)
+        return cls(words, codes, scales)
+
+
+_loaded = {}
+_load_lock = threading.Lock()
+
+
+def load_word_embeddings(path):
+    """Process-wide quantized embeddings for path (None if the file is not installed)"""
+    with _load_lock:
+        if path not in _loaded:
+            try:
+                _loaded[path] = QuantizedEmbeddings.load(path)
+            except Exception as e:
+                print(f"⚠ Could not load word embeddings: {e}")
+                _loaded[path] = None
+        return _loaded[path]
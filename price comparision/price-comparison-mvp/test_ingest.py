@@ -0,0 +1,215 @@
+"""
+Test Suite for Catalog Ingest
+Tests streaming feed parsing, the SQLite/FTS data source and ingest-time enrichment
+"""
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_sources import stream_ingest
+from data_sources.dataset_source import DatasetSource
+from data_sources.enrichment import ENRICHMENT_VERSION, ProductEnricher, brand_key, parse_pack_size
+from data_sources.source_manager import SourceManager
+from data_sources.stream_ingest import StreamIngestor, iter_json_array
+from utils.scheduler import CatalogRefreshScheduler
+
+
+def print_section(title):
+    """Print section header"""
+    print("\n" + "="*60)
+    print(f" {title}")
+    print("="*60 + "\n")
+
+
+def write_feed(directory, name, records):
+    """Write a JSON array feed file; records given as strings are written verbatim"""
+    items = [record if isinstance(record, str) else json.dumps(record) for record in records]
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[' + ',\n'.join(items) + ']')
+    return path
+
+
+class ListSink:
+    """Ingest sink collecting products in a list"""
+
+    def __init__(self):
+        self.products = []
+
+    def add_product(self, product):
+        self.products.append(product)
+
+    def finalize(self):
+        pass
+
+
+def test_stream_skips_bad_records():
+    """A malformed or oversized JSON element is skipped; the rest of the feed still loads"""
+    print_section("Streaming ingest: bad records")
+
+    document = ('[{"product_name": "Amul Milk", "price": 30}, {"product_name": tru},'
+                ' {"product_name": "Bread, \\"brown\\"]", "price": 40}, {broken, "x": [1, 2]},'
+                ' {"product_name": "Tea", "price": 120}]')
+    for chunk_size in range(1, 20):
+        records = list(iter_json_array(io.StringIO(document), chunk_size=chunk_size))
+        names = [record and record['product_name'] for record in records]
+        assert names == ['Amul Milk', None, 'Bread, "brown"]', None, 'Tea'], \
+            f"chunk_size={chunk_size}: {names}"
+    print("✓ Malformed elements yield None and parsing resumes")
+
+    max_record_size = stream_ingest.MAX_RECORD_SIZE
+    stream_ingest.MAX_RECORD_SIZE = 100
+    try:
+        document = '[{"product_name": "A", "price": 1}, {"blob": "' + 'x' * 1000 + '"}, {"product_name": "B", "price": 2}]'
+        records = list(iter_json_array(io.StringIO(document), chunk_size=16))
+    finally:
+        stream_ingest.MAX_RECORD_SIZE = max_record_size
+    assert [record and record['product_name'] for record in records] == ['A', None, 'B']
+    print("✓ Oversized element skipped without buffering it")
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = write_feed(directory, 'zepto_products.json', [
+            {'product_name': 'Maggi Noodles', 'price': 14}, '{"product_name": }', {'price': 5},
+            {'product_name': 'Amul Butter', 'price': '₹56'},
+        ])
+        sink = ListSink()
+        stats = StreamIngestor(index=sink).run([path])
+        assert stats['accepted'] == 2 and stats['rejected'] == 2, stats
+        assert [product['platform'] for product in sink.products] == ['zepto', 'zepto']
+        print(f"✓ Ingest counted {stats['accepted']} accepted, {stats['rejected']} rejected")
+
+        source = DatasetSource(directory)
+        first = list(source.iter_products('zepto'))
+        second = list(source.iter_products('zepto'))
+        assert [p['product_name'] for p in first] == ['Maggi Noodles', 'Amul Butter']
+        assert first[0] is not second[0], "products must be fresh per read, not cached"
+        print("✓ DatasetSource streams fresh products per read")
+    finally:
+        shutil.rmtree(directory)
+
+
+class RebuildRecorder:
+    """Stands in for IndexRebuildManager, counting rebuild requests"""
+
+    def __init__(self):
+        self.requests = 0
+
+    def request_rebuild(self):
+        self.requests += 1
+
+
+def test_sqlite_source():
+    """FTS search on disk; version checks are side-effect free and re-imports run on refresh"""
+    print_section("SQLite/FTS data source")
+
+    directory = tempfile.mkdtemp()
+    try:
+        feed = write_feed(directory, 'blinkit_products.json', [
+            {'product_name': 'Amul Taaza Milk 1 L', 'brand': 'Amul', 'price': 56},
+            {'product_name': 'Britannia Brown Bread', 'brand': 'Britannia', 'price': 45},
+            {'product_name': 'Amul Butter 100g', 'brand': 'Amul', 'price': 58},
+        ])
+        manager = SourceManager('sqlite', db_path=os.path.join(directory, 'catalog.sqlite3'),
+                                datasets_dir=directory)
+        source = manager.source
+        names = sorted(p['product_name'] for p in source.search_products('amul'))
+        assert names == ['Amul Butter 100g', 'Amul Taaza Milk 1 L'], names
+        assert [p['product_name'] for p in source.search_products('brea')] == ['Britannia Brown Bread']
+        assert source.search_products('amul', platform='zepto') == []
+        print(f"✓ FTS search (fts5 available: {source.has_fts})")
+
+        version = source.get_catalog_version()
+        write_feed(directory, 'blinkit_products.json', [
+            {'product_name': 'Amul Taaza Milk 1 L', 'brand': 'Amul', 'price': 54},
+        ])
+        os.utime(feed, ns=(0, 10**18))
+        assert source.get_catalog_version() == version, "version check must not re-import"
+        assert source.is_stale()
+
+        rebuilds = RebuildRecorder()
+        scheduler = CatalogRefreshScheduler(manager, rebuilds)
+        assert scheduler.run_refresh() and rebuilds.requests == 1
+        assert source.get_catalog_version() != version
+        assert [p['price'] for p in source.load_products('blinkit')] == [54.0]
+        assert not scheduler.run_refresh() and rebuilds.requests == 1
+        print("✓ Feed change re-imported by the refresh scheduler, not the version check")
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_enrichment_rules():
+    """Category, department, brand and pack-size rules applied at ingest"""
+    print_section("Ingest-time enrichment")
+
+    enricher = ProductEnricher()
+    cases = [
+        # (product, expected category, expected department)
+        ({'product_name': 'Amul Taaza Milk 1 L', 'price': 54, 'platform': 'blinkit'}, 'dairy', 'groceries'),
+        ({'product_name': 'Kwality Walls Ice Cream Tub', 'price': 199}, 'frozen', 'groceries'),
+        ({'product_name': 'Apple iPhone 15', 'price': 79900, 'platform': 'amazon'}, 'smartphones', 'electronics'),
+        ({'product_name': 'Mystery Box', 'price': 99, 'platform': 'nykaa'}, 'beauty', 'beauty'),
+        ({'product_name': 'Mystery Box', 'price': 99, 'platform': 'amazon'}, 'general', 'general'),
+        ({'product_name': 'Running Tee', 'price': 499, 'category': 'Clothing'}, 'clothing', 'fashion'),
+        ({'product_name': 'Dumbbell Set', 'price': 999, 'category': 'sports'}, 'sports', 'sports'),
+    ]
+    for product, category, department in cases:
+        enriched = enricher.enrich(dict(product))
+        assert (enriched['category'], enriched['department']) == (category, department), \
+            f"{product['product_name']}: {enriched['category']}/{enriched['department']}"
+    print(f"✓ {len(cases)} category/department rules")
+
+    assert enricher.normalize_brand('', 'nike air max') == 'Nike'
+    assert enricher.normalize_brand('SAMSUNG', 'x') == 'Samsung'
+    assert enricher.normalize_brand('HP', 'x') == 'HP'
+    assert brand_key("Levi's") == 'levis' and brand_key('H&M') == 'hm'
+    print("✓ Brand normalization")
+
+    assert parse_pack_size('Amul Milk 1L') == (1000.0, 'ml')
+    assert parse_pack_size('Coke 6 x 200ml') == (1200.0, 'ml')
+    assert parse_pack_size('Atta 5 kg') == (5000.0, 'g')
+    assert parse_pack_size('Eggs 12 pcs') == (12.0, 'pc')
+    assert parse_pack_size('Nike Air Max') == (None, None)
+    milk = enricher.enrich({'product_name': 'Amul Milk 500 ml', 'brand': 'Amul', 'price': 30, 'platform': 'zepto'})
+    assert milk['price_per_unit'] == 6.0 and milk['unit_basis'] == '100ml', milk
+    shoes = enricher.enrich({'product_name': 'Nike Shoes Size 10 pcs', 'price': 3000, 'platform': 'myntra'})
+    assert 'pack_size' not in shoes, "pack sizes only apply to consumables"
+    print("✓ Pack sizes and unit prices")
+
+    assert enricher.enrich(milk) is milk and milk['enriched'] == ENRICHMENT_VERSION
+    assert milk['search_text'] == 'amul milk 500 ml amul dairy', milk['search_text']
+    print("✓ Search keys precomputed once")
+
+
+def run_all_tests():
+    """Run all tests"""
+    print("\n" + "*"*60)
+    print(" CATALOG INGEST TEST SUITE")
+    print("*"*60)
+
+    try:
+        test_stream_skips_bad_records()
+        test_sqlite_source()
+        test_enrichment_rules()
+
+        print("\n" + "="*60)
+        print(" ✓ ALL TESTS COMPLETED SUCCESSFULLY!")
+        print("="*60 + "\n")
+
+        return True
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
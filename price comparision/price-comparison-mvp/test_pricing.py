@@ -0,0 +1,220 @@
+"""
+Test Suite for Price Comparison
+Tests cross-platform product matching and the price comparison structures
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_sources.enrichment import ProductEnricher
+from services.best_price_index import MIN_HEAP_COMPACT, BestPriceIndex
+from services.price_compare_service import PriceCompareService
+from services.price_stats import RELATIVE_ACCURACY, PriceStats, PriceStatsBreakdown
+from services.product_matcher import ProductMatcher
+
+
+def print_section(title):
+    """Print section header"""
+    print("\n" + "="*60)
+    print(f" {title}")
+    print("="*60 + "\n")
+
+
+def enriched(product_name, price, platform, brand=''):
+    """A product as it leaves ingest"""
+    return ProductEnricher().enrich({'product_name': product_name, 'price': price,
+                                     'platform': platform, 'brand': brand})
+
+
+def test_product_matching():
+    """Listings of one product share a cluster; brand, model and pack-size conflicts never do"""
+    print_section("Product matching")
+
+    products = [
+        enriched('Amul Milk 1L', 60, 'blinkit', 'Amul'),
+        enriched('Amul Taaza Milk 1 L', 58, 'zepto', 'Amul'),
+        enriched('Amul Taaza Milk 500 ml', 30, 'instamart', 'Amul'),
+        enriched('Samsung Galaxy S24 5G', 79999, 'amazon', 'Samsung'),
+        enriched('Samsung Galaxy S24 5G (Onyx Black)', 78999, 'flipkart', 'Samsung'),
+        enriched('Samsung Galaxy S23 5G', 59999, 'flipkart', 'Samsung'),
+        enriched('Mother Dairy Milk 1L', 56, 'zepto', 'Mother Dairy'),
+    ]
+    matcher = ProductMatcher()
+    ids = matcher.cluster(products)
+
+    assert ids[0] == ids[1], "same milk on two platforms must share a cluster"
+    assert ids[3] == ids[4], "same phone on two platforms must share a cluster"
+    assert ids[2] != ids[1], "pack sizes differ"
+    assert ids[5] != ids[3], "model numbers differ"
+    assert ids[6] != ids[0], "brands differ"
+    print(f"✓ {len(set(ids))} clusters from {len(products)} listings")
+
+    assert matcher.cluster(list(reversed(products))) == list(reversed(ids)), "IDs depend on input order"
+    assert ProductMatcher().cluster(products) == ids, "IDs differ between matcher instances"
+    print("✓ Cluster IDs stable across runs and input order")
+
+    live = dict(enriched('AMUL Taaza Milk 1 Litre', 57, 'amazon', 'Amul'))
+    seeded = [dict(product, cluster_id=cluster_id) for product, cluster_id in zip(products, ids)]
+    assert matcher.cluster(seeded + [live])[-1] == ids[0], "live listing must join the catalog cluster"
+    print("✓ Live listings join existing catalog clusters")
+
+    catalog = [dict(product) for product in products]
+    assert matcher.assign_clusters(catalog) == len(set(ids))
+    assert [product['cluster_id'] for product in catalog] == ids
+    assert all('cluster_id' not in product for product in products), "cluster() must not modify products"
+    print("✓ assign_clusters stores IDs on the catalog products")
+
+
+def test_unit_price_comparison():
+    """Per-unit best prices span pack sizes and every listing in a product cluster"""
+    print_section("Per-unit price comparison")
+
+    products = [
+        enriched('Amul Milk 1L', 60, 'blinkit', 'Amul'),
+        enriched('Amul Taaza Milk 1 L', 58, 'zepto', 'Amul'),
+        enriched('Amul Taaza Milk 500 ml', 30, 'instamart', 'Amul'),
+        enriched('Mother Dairy Milk 1L', 56, 'zepto', 'Mother Dairy'),
+        enriched('Amul Butter Cookies', 40, 'amazon', 'Amul'),
+    ]
+    assert products[0]['unit_key'] != products[1]['unit_key'], "names differ, so unit keys do"
+    service = PriceCompareService()
+    results = {product['product_name']: product
+               for product in service.compare(products, mode='unit')['results']}
+
+    assert results['Amul Milk 1L']['cluster_id'] == results['Amul Taaza Milk 1 L']['cluster_id']
+    assert not results['Amul Milk 1L']['is_best_price'], "6.0/100ml is not the cluster's best"
+    assert results['Amul Taaza Milk 1 L']['is_best_price']
+    assert not results['Amul Taaza Milk 500 ml']['is_best_price'], "other pack sizes share the comparison"
+    assert results['Mother Dairy Milk 1L']['is_best_price'], "other brands are compared separately"
+    assert results['Amul Butter Cookies']['is_best_price'], "offers without a pack size group by cluster"
+    print("✓ One best per-unit price per product cluster")
+
+
+def test_best_price_index():
+    """Cheapest offer per cluster under catalog loads, live updates, TTL expiry and compaction"""
+    print_section("Best-price index")
+
+    catalog = [
+        {'product_name': 'Amul Milk 1L', 'platform': 'blinkit', 'price': 60, 'cluster_id': 'milk'},
+        {'product_name': 'Amul Taaza Milk 1 L', 'platform': 'zepto', 'price': 58, 'cluster_id': 'milk'},
+        {'product_name': 'Maggi 70g', 'platform': 'zepto', 'price': 14, 'cluster_id': 'maggi'},
+    ]
+    index = BestPriceIndex(live_ttl=0.2)
+    index.load_catalog(catalog)
+    assert index.best('milk')['price'] == 58 and index.best('maggi')['price'] == 14
+    print("✓ Catalog load publishes the cheapest offer per cluster")
+
+    index.record_offers([dict(catalog[0], price=55)])
+    assert index.best('milk')['price'] == 55
+    index.load_catalog(catalog)
+    assert index.best('milk')['price'] == 55, "a catalog reload must not override an unexpired live price"
+    index.record_offers([dict(catalog[1], price=70)])
+    assert index.best('milk')['price'] == 55, "a higher live price must replace, not add to, its offer"
+    print("✓ Live prices override catalog prices per offer")
+
+    time.sleep(0.25)
+    index.expire_offers()
+    assert index.best('milk')['price'] == 58, "expired live prices must fall back to the catalog"
+    assert index.stats()['live_offers'] == 0
+    print("✓ Live offers expire back to catalog prices")
+
+    index.load_catalog(catalog[1:])
+    assert index.best('milk')['price'] == 58
+    index.load_catalog(catalog[2:])
+    assert index.best('milk') is None, "offers that left the catalog must be dropped"
+    print("✓ Offers removed from the catalog are dropped")
+
+    index = BestPriceIndex()
+    index.load_catalog(catalog)
+    for step in range(1000):
+        index.record_offers([dict(catalog[0], price=200 - step % 50)])
+    stats = index.stats()
+    assert index.best('milk')['price'] == 58
+    assert stats['offers'] == 3
+    assert stats['heap_entries'] <= max(MIN_HEAP_COMPACT, 2 * stats['offers']) + 1, stats
+    print(f"✓ Heaps compacted ({stats['heap_entries']} entries after 1000 price changes)")
+
+
+def assert_summaries_equal(actual, expected, label):
+    assert actual.keys() == expected.keys(), f"{label}: {sorted(actual)} != {sorted(expected)}"
+    for key, value in expected.items():
+        assert abs(actual[key] - value) <= 1e-6 * max(1.0, abs(value)), f"{label}: {key} {actual[key]} != {value}"
+
+
+def test_price_stats():
+    """Merged shards equal one pass; vectorized and streaming accumulators agree; percentiles within 1%"""
+    print_section("Price statistics")
+
+    rng = random.Random(3)
+    prices = [0.0] * 5 + [round(rng.lognormvariate(6, 1.2), 2) for _ in range(20000)]
+    rng.shuffle(prices)
+
+    single = PriceStats()
+    for price in prices:
+        single.add(price)
+    merged = PriceStats()
+    for start in range(0, len(prices), 3000):
+        shard = PriceStats()
+        for price in prices[start:start + 3000]:
+            shard.add(price)
+        merged.merge(shard)
+    merged.merge(PriceStats())
+    assert_summaries_equal(merged.to_dict(), single.to_dict(), "merge")
+    assert dict(merged.buckets) == dict(single.buckets)
+    print("✓ Merged shards equal a single pass")
+
+    assert_summaries_equal(PriceStats.from_prices(prices).to_dict(), single.to_dict(), "from_prices")
+    assert PriceStats.from_prices([]).to_dict() == {}
+    print("✓ Vectorized accumulator equals the streaming one")
+
+    summary = single.to_dict()
+    assert abs(summary['avg_price'] - statistics.fmean(prices)) < 1e-6
+    assert abs(summary['std_price'] - statistics.pstdev(prices)) < 1e-6
+    ordered = sorted(prices)
+    for name, q in (('p10_price', 0.10), ('median_price', 0.50), ('p90_price', 0.90)):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert abs(summary[name] - exact) <= 2 * RELATIVE_ACCURACY * exact + 0.01, (name, summary[name], exact)
+    print("✓ Mean, std and percentiles match exact values")
+
+    products = [{'price': price, 'platform': ('zepto', 'blinkit')[i % 2], 'category': 'dairy'}
+                for i, price in enumerate(prices[:1000])]
+    halves = PriceStatsBreakdown().add_all(products[:500]).merge(PriceStatsBreakdown().add_all(products[500:]))
+    assert_summaries_equal(halves.overall.to_dict(), PriceStatsBreakdown().add_all(products).overall.to_dict(),
+                           "breakdown")
+    assert_summaries_equal(halves.platforms['zepto'].to_dict(),
+                           PriceStats.from_prices(prices[:1000:2]).to_dict(), "breakdown")
+    print("✓ Per-platform breakdowns merge")
+
+
+def run_all_tests():
+    """Run all tests"""
+    print("\n" + "*"*60)
+    print(" PRICE COMPARISON TEST SUITE")
+    print("*"*60)
+
+    try:
+        test_product_matching()
+        test_unit_price_comparison()
+        test_best_price_index()
+        test_price_stats()
+
+        print("\n" + "="*60)
+        print(" ✓ ALL TESTS COMPLETED SUCCESSFULLY!")
+        print("="*60 + "\n")
+
+        return True
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,250 @@
+"""
+Equivalence Tests for the Search Indexes
+Checks each fast path against the straightforward computation it replaces:
+SymSpell correction vs brute-force edit distance, sparse TF-IDF top-k vs dense
+cosine, IVF recall vs exact search, cursor pagination vs the full sorted list,
+and streamed JSON parsing vs json.loads
+"""
+import io
+import json
+import os
+import random
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+from data_sources.stream_ingest import iter_json_array
+from services.ann_index import IVFIndex
+from services.catalog_index import CatalogIndex
+from services.nlp_service import NLPService
+from services.spell_index import SpellIndex, levenshtein
+
+MIN_RECALL = 0.9  # recall@10 the IVF index must reach on clustered data
+
+WORDS = ['milk', 'bread', 'butter', 'cheese', 'shoes', 'shirt', 'jeans', 'laptop', 'phone',
+         'charger', 'noodles', 'biscuits', 'coffee', 'tea', 'watch', 'bag', 'wallet', 'cream',
+         'shampoo', 'soap', 'running', 'cotton', 'wireless', 'organic', 'instant', 'classic']
+BRANDS = ['amul', 'nike', 'puma', 'samsung', 'apple', 'maggi', 'nestle', 'britannia', 'dove', 'levis']
+CATEGORIES = ['dairy', 'footwear', 'apparel', 'electronics', 'snacks', 'beverages', 'personal care']
+PLATFORMS = ['blinkit', 'zepto', 'amazon', 'flipkart', 'myntra']
+
+
+def print_section(title):
+    """Print section header"""
+    print("\n" + "="*60)
+    print(f" {title}")
+    print("="*60 + "\n")
+
+
+def make_products(count, seed=0):
+    """Synthetic catalog with repeated names, brands and prices (ties exercise tie-breaks)"""
+    rng = random.Random(seed)
+    products = []
+    for i in range(count):
+        brand = rng.choice(BRANDS)
+        products.append({
+            'id': i,
+            'product_name': f"{brand} {' '.join(rng.sample(WORDS, 3))}",
+            'brand': brand,
+            'category': rng.choice(CATEGORIES),
+            'platform': rng.choice(PLATFORMS),
+            'price': float(rng.choice(range(10, 500, 5))),
+            'cluster_id': f"c{rng.randrange(count // 3 or 1)}",
+        })
+    return products
+
+
+def make_typo(word, rng, edits):
+    """word with `edits` random deletions, insertions or substitutions"""
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    for _ in range(edits):
+        i = rng.randrange(len(word) + 1)
+        op = rng.choice(('delete', 'insert', 'substitute'))
+        if op == 'delete' and i < len(word) and len(word) > 1:
+            word = word[:i] + word[i + 1:]
+        elif op == 'substitute' and i < len(word):
+            word = word[:i] + rng.choice(letters) + word[i + 1:]
+        else:
+            word = word[:i] + rng.choice(letters) + word[i:]
+    return word
+
+
+def brute_force_correct(word, counts, max_distance):
+    """Reference correction: distance to every vocabulary word, same tie-break as SpellIndex"""
+    if word in counts:
+        return word
+    distances = {candidate: levenshtein(word, candidate) for candidate in counts}
+    candidates = [candidate for candidate, distance in distances.items() if distance <= max_distance]
+    if not candidates:
+        return word
+    return min(candidates, key=lambda c: (distances[c], -counts[c], c))
+
+
+def test_spell_index():
+    """SymSpell lookups must correct exactly like a brute-force edit-distance scan"""
+    print_section("SpellIndex vs brute-force edit distance")
+
+    rng = random.Random(1)
+    vocabulary = WORDS + BRANDS + ['mik', 'milks', 'tee', 'shoe', 'bags', 'cheeze']
+    counts = {word: rng.randint(1, 50) for word in vocabulary}
+    index = SpellIndex(counts)
+
+    typos = [make_typo(rng.choice(vocabulary), rng, rng.randint(1, 3)) for _ in range(2000)]
+    typos += ['', 'x', 'zzzzzz', 'milk']
+    mismatches = [(typo, index.correct(typo), brute_force_correct(typo, counts, index.max_distance))
+                  for typo in typos]
+    mismatches = [entry for entry in mismatches if entry[1] != entry[2]]
+
+    print(f"  Checked {len(typos)} typos against {len(counts)} words")
+    assert not mismatches, f"SpellIndex disagrees with brute force: {mismatches[:5]}"
+    print("✓ Corrections identical")
+
+
+def test_tfidf_top_k():
+    """Sparse column-wise TF-IDF scoring must rank like dense cosine similarity"""
+    print_section("Sparse TF-IDF top-k vs dense cosine")
+
+    products = make_products(3000)
+    service = NLPService()
+    service.build_semantic_index(products)
+    dense = service.tfidf_matrix.toarray()
+
+    queries = ['amul milk', 'nike running shoes', 'wireless charger', 'organic coffee tea',
+               'classic cotton shirt', 'samsung phone', 'unknownword']
+    top_k = 20
+    for query in queries:
+        scores = cosine_similarity(service.tfidf_vectorizer.transform([query]), dense)[0]
+        expected = np.sort(scores[scores > 0.1])[::-1][:top_k]
+        results = service.semantic_search(query, products, top_k=top_k)
+        got = np.array([result['relevance_score'] for result in results])
+
+        assert len(got) == len(expected), f"{query!r}: {len(got)} results, expected {len(expected)}"
+        assert np.allclose(got, expected, atol=1e-6), f"{query!r}: top-k scores differ"
+        for result in results:
+            assert abs(scores[result['id']] - result['relevance_score']) < 1e-6, \
+                f"{query!r}: wrong score for product {result['id']}"
+        print(f"  {query!r}: {len(results)} results match")
+
+    mask = np.zeros(len(products), dtype=bool)
+    mask[::3] = True
+    filtered = service.semantic_search('amul milk', products, top_k=top_k, allowed_ids=mask)
+    assert filtered and all(mask[result['id']] for result in filtered), "filter mask not applied"
+    print("✓ Top-k identical (filtered search stays within the mask)")
+
+
+def test_ivf_recall():
+    """IVF search must find most exact neighbours, and brute force must be exact"""
+    print_section("IVF index recall")
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(64, 32))
+    vectors = centers[rng.integers(0, len(centers), 20000)] + rng.normal(size=(20000, 32))
+    index = IVFIndex().build(vectors)
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    for item_id in rng.choice(len(vectors), 20, replace=False):
+        expected = np.argsort(-(normalized @ normalized[item_id]), kind='stable')[:10]
+        ids, _ = index.brute_force(vectors[item_id], 10)
+        assert set(ids.tolist()) == set(expected.tolist()), "brute force is not exact"
+
+    recall = index.recall_at_k(k=10, sample=200)
+    print(f"  {len(index)} vectors in {len(index.centroids)} lists, recall@10 {recall:.3f}")
+    assert recall >= MIN_RECALL, f"recall@10 {recall:.3f} below {MIN_RECALL}"
+    print("✓ Recall above threshold")
+
+
+def collect_pages(fetch, limit):
+    """Follow next_cursor from the first page to the last; returns product IDs in page order"""
+    ids, cursor = [], None
+    while True:
+        products, cursor = fetch(cursor, limit)
+        assert len(products) <= limit, "page larger than the limit"
+        ids.extend(product['id'] for product in products)
+        if cursor is None:
+            return ids
+        assert products, "empty page with a next cursor"
+
+
+def test_cursor_pagination():
+    """Walking every page must yield each match exactly once, in the presorted order"""
+    print_section("Cursor pagination invariants")
+
+    index = CatalogIndex()
+    for product in make_products(2500):
+        index.add_product(product)
+    index.finalize()
+
+    queries = ['milk', 'nike shoes', 'amul', 'laptop charger', 'nomatch']
+    for sort, order in index.orderings.items():
+        for limit in (1, 7, 50):
+            for query in queries:
+                matches = index.match_set(query)
+                expected = [pid for pid in order if pid in matches]
+                got = collect_pages(lambda cursor, n: index.page(sort, cursor, n, matches), limit)
+                assert got == expected, f"page({sort!r}, {query!r}, limit={limit}) differs"
+
+            for category in CATEGORIES:
+                members = set(index.category_ids(category))
+                expected = [pid for pid in order if pid in members]
+                got = collect_pages(lambda cursor, n: index.category_page(category, sort, cursor, n), limit)
+                assert got == expected, f"category_page({category!r}, {sort!r}, limit={limit}) differs"
+        print(f"  {sort}: pages cover every match once, in order")
+
+    try:
+        index.page('price', 'not-a-cursor')
+    except ValueError:
+        print("✓ Malformed cursors rejected")
+    else:
+        raise AssertionError("malformed cursor accepted")
+
+
+def test_stream_ingest():
+    """Streamed feed parsing must equal json.loads for every chunk boundary"""
+    print_section("Streamed JSON parsing vs json.loads")
+
+    items = [
+        {'product_name': 'Amul "Gold" Milk\\1L', 'price': 68, 'rating': 4.25, 'stock': True},
+        12345, -0.5e-3, 'plain string', None, False, [1, [2, [3]]],
+        {'nested': {'a': [10, 20.5, {'b': 'x,]}'}]}, 'unicode': 'दूध ✓'},
+        9876543210, 1e10,
+    ]
+    document = json.dumps(items, ensure_ascii=False, indent=1)
+    for chunk_size in range(1, 12):
+        parsed = list(iter_json_array(io.StringIO(document), chunk_size=chunk_size))
+        assert parsed == items, f"chunk_size={chunk_size} parses differently"
+    assert list(iter_json_array(io.StringIO('[]'), chunk_size=1)) == []
+    print("✓ Identical for chunk sizes 1-11")
+
+
+def run_all_tests():
+    """Run all tests"""
+    print("\n" + "*"*60)
+    print(" SEARCH INDEX EQUIVALENCE TESTS")
+    print("*"*60)
+
+    try:
+        test_spell_index()
+        test_tfidf_top_k()
+        test_ivf_recall()
+        test_cursor_pagination()
+        test_stream_ingest()
+
+        print("\n" + "="*60)
+        print(" ✓ ALL EQUIVALENCE TESTS PASSED!")
+        print("="*60 + "\n")
+
+        return True
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,362 @@
+"""
+Test Suite for Search Features
+Tests structured filters, query preferences, batched keyword search, facet
+counts, the negative query cache, autocomplete ranking and NLP artifact
+persistence on the catalog generation built from the bundled datasets
+"""
+import glob
+import os
+import random
+import shutil
+import string
+import sys
+import tempfile
+import time
+from collections import Counter
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_sources.source_manager import SourceManager
+from services.autocomplete_index import GRAM_SIZE, AutocompleteIndex
+from services.catalog_index import PRICE_BUCKETS, CatalogIndex, SearchFilters
+from services.index_manager import IndexRebuildManager
+from services.negative_cache import BloomFilter, NegativeResultCache
+from services import nlp_service as nlp_module
+from services.nlp_service import NLPService, QueryPlan
+from services.query_log import MIN_QUERY_COUNT, QueryLog
+from services.text_search_service import TextSearchService
+
+_generation = None
+
+
+def print_section(title):
+    """Print section header"""
+    print("\n" + "="*60)
+    print(f" {title}")
+    print("="*60 + "\n")
+
+
+def catalog_generation():
+    """Generation over the bundled datasets, built once per run"""
+    global _generation
+    if _generation is None:
+        _generation = IndexRebuildManager(SourceManager('dataset')).build_generation()
+    return _generation
+
+
+class RequestArgs(dict):
+    """Query-string arguments as Flask exposes them (get / getlist)"""
+
+    def getlist(self, name):
+        value = self.get(name)
+        return [] if value is None else [value]
+
+
+def smart_search(query):
+    """Results for a query as /api/smart-search ranks them"""
+    generation = catalog_generation()
+    plan = generation.nlp_service.plan_query(query)
+    service = TextSearchService(use_live_scraping=False, source_manager=SourceManager('dataset'))
+    return service.smart_search(plan, generation, filters=SearchFilters.from_entities(plan.entities),
+                                preferences=SearchFilters.preferences_from_entities(plan.entities))
+
+
+def test_search_filters():
+    """Request arguments filter; brands and categories named in the query only rank"""
+    print_section("Search filters and preferences")
+
+    generation = catalog_generation()
+    index = generation.index
+    filters = SearchFilters.from_args(RequestArgs(brand='Nike,Puma', category='footwear', max_price='5000'))
+    mask = index.filter_mask(filters)
+    expected = [filters.matches(product) for product in index.products]
+    assert mask.tolist() == expected and any(expected), "filter_mask disagrees with the filters"
+    assert index.filter_ids(filters) == {pid for pid, passed in enumerate(expected) if passed}
+    print(f"✓ Request filters select {sum(expected)} products")
+
+    results = smart_search('coca cola beverage')
+    names = {product['product_name'] for product in results}
+    catalog_names = {product['product_name'] for product in index.products if product['brand'] == 'Coca Cola'}
+    assert catalog_names and names == catalog_names, names
+    assert len(results) == sum(product['brand'] == 'Coca Cola' for product in index.products)
+    print(f"✓ 'coca cola beverage' finds the {len(results)} Coca Cola offers")
+
+    entities = generation.nlp_service.extract_entities('apple juice under 50000')
+    assert not SearchFilters.from_entities(entities).brands
+    assert SearchFilters.from_entities(entities).max_price == 50000
+    results = smart_search('apple juice under 50000')
+    preferred = [product['brand'] == 'Apple' for product in results]
+    assert preferred == sorted(preferred, reverse=True), "preferred brand must rank first"
+    assert not all(preferred), "other brands must not be filtered out"
+    assert all(product['price'] <= 50000 for product in results)
+    print("✓ Named brands rank first; price caps still filter")
+
+    plan = QueryPlan('zzqx', ['zzqx'], ['zzqx'], ['zzqx'], ['zzqx'],
+                     {'brands': [], 'categories': ['shoes'], 'price_range': None}, {})
+    service = TextSearchService(use_live_scraping=False, source_manager=SourceManager('dataset'))
+    results = service.smart_search(plan, generation, preferences=SearchFilters.preferences_from_entities(plan.entities))
+    assert results and all(product['category'] == 'footwear' for product in results)
+    print("✓ Preferred category selects results when nothing matches the text")
+
+
+def test_search_many():
+    """One index pass over several keywords equals searching each keyword separately"""
+    print_section("Batched keyword search")
+
+    index = catalog_generation().index
+    service = TextSearchService(use_live_scraping=False, source_manager=SourceManager('dataset'))
+    price_rank = index.ranks['price']
+
+    for keywords, mode in ((['milk', 'amul', 'bread', 'nike', 'zzqx'], 'any'), (['amul', 'milk'], 'all')):
+        matches = [index.match_set(keyword) for keyword in keywords]
+        counts = {pid: sum(pid in ids for ids in matches) for pid in set().union(*matches)}
+        required = 1 if mode == 'any' else len(keywords)
+        ids = sorted((pid for pid, count in counts.items() if count >= required),
+                     key=lambda pid: (-counts[pid], price_rank[pid]))
+        # Duplicate and blank keywords are dropped
+        results = service.search_many(keywords + [keywords[0], ' '], mode=mode, index=index)
+        assert ids, f"{keywords} matches nothing"
+        assert [product['product_name'] for product in results] == [index.products[pid]['product_name'] for pid in ids]
+        assert [product['search_score'] for product in results] == [counts[pid] / len(keywords) for pid in ids]
+        print(f"✓ mode={mode!r}: {len(results)} results match per-keyword searches")
+
+    assert service.search_many(['zzqx', 'milk'], mode='all', index=index) == []
+    keywords = ['milk', 'bread', 'nike']
+    assert service.search_many(keywords, limit=3, index=index) == service.search_many(keywords, index=index)[:3]
+    print("✓ mode='all' and limits")
+
+
+def reference_facets(products, max_values):
+    """Facet counts by a plain Counter per facet: largest first, ties by value"""
+    def price_bucket(price):
+        lower = max(bound for bound in PRICE_BUCKETS if bound <= price)
+        upper = PRICE_BUCKETS[PRICE_BUCKETS.index(lower) + 1] if lower != PRICE_BUCKETS[-1] else None
+        return f"{lower}-{upper}" if upper is not None else f"{lower}+"
+
+    facets = {}
+    for facet, value_of in (('platform', lambda p: p['platform']), ('brand', lambda p: p['brand']),
+                            ('category', lambda p: p['category'])):
+        counts = Counter(value_of(product) for product in products)
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:max_values]
+        facets[facet] = [{'value': value, 'count': count} for value, count in ranked]
+    counts = Counter(price_bucket(product['price']) for product in products)
+    facets['price'] = [{'value': value, 'count': counts[value]}
+                       for value in (price_bucket(bound) for bound in PRICE_BUCKETS) if counts[value]]
+    return facets
+
+
+def test_facet_counts():
+    """Bincount facets over masks and ID sets equal Counter aggregation"""
+    print_section("Facet counts")
+
+    rng = random.Random(5)
+    index = CatalogIndex()
+    for i in range(5000):
+        index.add_product({
+            'product_name': f"item {i % 97}",
+            'brand': f"brand{rng.randrange(60):02d}",
+            'category': rng.choice(['dairy', 'snacks', 'footwear', 'laptops']),
+            'platform': rng.choice(['blinkit', 'zepto', 'amazon']),
+            'price': rng.choice([0, 99, 100, 499.5, 2500, 9999, 10000, 75000]),
+        })
+    index.finalize()
+
+    for query in ('brand0', 'dairy', 'item', 'zzqx'):
+        mask = index.match_mask(query)
+        products = [index.products[pid] for pid in mask.nonzero()[0]]
+        for max_values in (5, 20, 100):
+            expected = reference_facets(products, max_values)
+            assert index.facet_counts(mask, max_values) == expected, f"{query!r}, max_values={max_values}"
+            assert index.facet_counts(index.match_set(query), max_values) == expected
+        print(f"✓ {query!r}: {len(products)} matches, facets identical")
+
+
+class StubScraper:
+    """Live scraper that finds nothing, with some platforms failing to answer"""
+
+    def __init__(self, failing=()):
+        self.failing = list(failing)
+        self.calls = 0
+
+    def search_all_platforms(self, query, max_per_platform=10, failures=None):
+        self.calls += 1
+        failures.extend(self.failing)
+        return []
+
+
+def test_negative_cache():
+    """Bloom filter never rejects an indexed term; misses are cached per version until expiry"""
+    print_section("Term filter and negative cache")
+
+    rng = random.Random(7)
+    terms = {''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 14))) for _ in range(3000)}
+    bloom = BloomFilter.from_substrings(terms)
+    for term in terms:
+        assert bloom.may_contain_substring(term), f"false negative for {term!r}"
+        assert all(bloom.may_contain_substring(term[i:i + 4]) for i in range(len(term)))
+    unknown = [''.join(rng.choice(string.ascii_lowercase) for _ in range(6)) for _ in range(5000)]
+    unknown = [word for word in unknown if not any(word in term for term in terms)]
+    false_positives = sum(bloom.may_contain_substring(word) for word in unknown) / len(unknown)
+    assert false_positives < 0.03, f"false-positive rate {false_positives:.3f}"
+    print(f"✓ No false negatives; {false_positives:.2%} false positives")
+
+    index = catalog_generation().index
+    for term in index.postings:
+        assert index.may_match(term) and index.may_match(f"zzqx {term[:3]}"), term
+    assert not index.may_match('zzqx qqxz') and not index.may_match('')
+    print("✓ may_match admits every indexed term prefix and rejects unknown words")
+
+    cache = NegativeResultCache(ttl=0.2, max_size=2)
+    cache.add('zzqx', 'v1')
+    assert ('zzqx', 'v1') in cache and ('zzqx', 'v2') not in cache
+    cache.add('qqxz', 'v1')
+    cache.add('xqzz', 'v1')
+    assert ('zzqx', 'v1') not in cache and len(cache) == 2, "oldest entry must be evicted"
+    time.sleep(0.25)
+    assert ('xqzz', 'v1') not in cache, "expired entries must be dropped"
+    print("✓ Cache keyed by catalog version, bounded and expiring")
+
+    service = TextSearchService(use_live_scraping=False, source_manager=SourceManager('dataset'))
+    service.use_live_scraping = True
+    service.live_scraper = StubScraper(failing=['zepto'])
+    assert service.search_page(index, 'zzqx')['total'] == 0
+    assert not service.is_known_miss('zzqx', index.version), "a miss with a failed platform must not be cached"
+    service.live_scraper = StubScraper()
+    service.search_page(index, 'zzqx')
+    assert service.is_known_miss('zzqx', index.version) and service.live_scraper.calls == 1
+    service.search_page(index, 'zzqx')
+    assert service.live_scraper.calls == 1, "a cached miss must skip the live scrape"
+    print("✓ Confirmed misses cached and skip the live scrape")
+
+
+def reference_suggestions(weights, text, limit):
+    """Completions by scanning every key: prefix matches, then substring matches, most popular first"""
+    keys = sorted(weights, key=lambda key: (-weights[key], key))
+    prefix = [key for key in keys if key.startswith(text)][:limit]
+    if len(text) < GRAM_SIZE:
+        contains = [key for key in keys if any(word.startswith(text) for word in key.split()[1:])]
+    else:
+        contains = [key for key in keys if text in key]
+    return prefix + [key for key in contains if key not in prefix][:limit - len(prefix)]
+
+
+def test_autocomplete():
+    """Prefix-table completions equal a full scan; popular catalog queries re-rank them on refresh"""
+    print_section("Autocomplete ranking")
+
+    rng = random.Random(11)
+    words = ['amul', 'milk', 'bread', 'butter', 'nike', 'shoes', 'running', 'samsung', 'galaxy', 'tea']
+    weights = {' '.join(rng.sample(words, rng.randint(1, 3))): rng.choice([1.0, 2.0, 3.5, 7.0]) for _ in range(300)}
+    index = AutocompleteIndex(weights)
+    for text in ('a', 'am', 'amu', 'milk', 'ilk', 'shoes r', 'zzq', 'samsung galaxy tea'):
+        for limit in (3, 10, 25):
+            got = index.suggest(text, limit)
+            expected = reference_suggestions(weights, text, limit)
+            if len(text) < GRAM_SIZE:
+                # Short substring matches come from per-prefix top-k lists, so may stop early
+                assert got == expected[:len(got)] and len(got) >= min(len(expected), index.top_k // 2), text
+            else:
+                assert got == expected, f"{text!r}, limit={limit}: {got} != {expected}"
+    print(f"✓ Completions equal a full scan over {len(weights)} suggestions")
+
+    log = QueryLog(max_size=3, half_life=10.0)
+    for query, count in (('Amul Milk', 6), ('amul  milk', 1), ('amul butter', MIN_QUERY_COUNT - 1),
+                         ('nike shoes', 4), ('tea', 5), ('bread', 3), ('maggi', 3), ('eggs', 2)):
+        for _ in range(count):
+            log.record(query)
+    assert len(log) <= 2 * log.max_size, "log must stay bounded"
+    assert log.popular() == {'amul milk': 7.0, 'tea': 5.0, 'nike shoes': 4.0}, log.popular()
+    log.decay(now=log._decayed_at + 10.0)
+    assert log.popular(min_count=0) == {'amul milk': 3.5, 'tea': 2.5, 'nike shoes': 2.0, 'eggs': 0.5}
+    print("✓ Query log bounded, thresholded and decaying")
+
+    log = QueryLog()
+    manager = IndexRebuildManager(SourceManager('dataset'), query_log=log)
+    generation = manager.rebuild()
+    nlp_service = generation.nlp_service
+    before = nlp_service.get_autocomplete_suggestions('am')
+    for query, count in (('amul butter milk', 50), ('amul call 9876543210', 100), ('amul bread', 1)):
+        for _ in range(count):
+            log.record(query)
+    manager.refresh_popularity()
+    after = nlp_service.get_autocomplete_suggestions('am')
+    assert manager.current() is generation, "popularity must apply without a rebuild"
+    assert after[0] == 'amul butter milk' and 'amul butter milk' not in before, after
+    assert not any('9876543210' in suggestion or suggestion == 'amul bread' for suggestion in after), after
+    print("✓ Popular catalog queries suggested after a refresh; rare and non-catalog ones never")
+
+
+def test_artifact_persistence():
+    """Saved artifacts load back for their catalog version only, with current search popularity"""
+    print_section("NLP artifact persistence")
+
+    products = catalog_generation().products
+    directory = tempfile.mkdtemp()
+    paths = {name: os.path.join(directory, os.path.basename(nlp_module.NLP[name]))
+             for name in ('vocabulary_path', 'tfidf_vectorizer_path', 'tfidf_matrix_path', 'ann_index_path')}
+    saved_paths = {name: nlp_module.NLP[name] for name in paths}
+    nlp_module.NLP.update(paths)
+    try:
+        built = NLPService()
+        built.build_vocabulary(products, {'amul butter milk': 50})
+        built.build_semantic_index(products, 'v1')
+        assert built.save_artifacts()
+
+        loaded = NLPService()
+        assert loaded.load_artifacts(products, 'v1', {'amul bread': 60})
+        for query in ('amul milk', 'nike running shoes', 'samsung phone'):
+            expected = [(p['product_name'], round(p['relevance_score'], 6)) for p in built.semantic_search(query, products)]
+            got = [(p['product_name'], round(p['relevance_score'], 6)) for p in loaded.semantic_search(query, products)]
+            assert got == expected, query
+        assert loaded.correct_query('amull mlk') == built.correct_query('amull mlk')
+        print("✓ Loaded indexes rank and correct like the built ones")
+
+        suggestions = loaded.get_autocomplete_suggestions('amul')
+        assert suggestions[0] == 'amul bread' and 'amul butter milk' not in suggestions, suggestions
+        print("✓ Autocomplete reflects current popularity, not the exporter's")
+
+        assert not NLPService().load_artifacts(products, 'v2')
+        assert not NLPService().load_artifacts(products[:-1], 'v1')
+        rebuilt = NLPService()
+        rebuilt.build_vocabulary(products)
+        rebuilt.build_semantic_index(products, 'v2')
+        assert rebuilt.save_artifacts()
+        assert not NLPService().load_artifacts(products, 'v1') and NLPService().load_artifacts(products, 'v2')
+        arrays = glob.glob(os.path.join(directory, '*.npy'))
+        assert arrays and all(nlp_module._version_tag('v2') in path for path in arrays), arrays
+        print("✓ Other catalog versions rejected and their arrays removed")
+    finally:
+        nlp_module.NLP.update(saved_paths)
+        shutil.rmtree(directory)
+
+
+def run_all_tests():
+    """Run all tests"""
+    print("\n" + "*"*60)
+    print(" SEARCH FEATURES TEST SUITE")
+    print("*"*60)
+
+    try:
+        test_search_filters()
+        test_search_many()
+        test_facet_counts()
+        test_negative_cache()
+        test_autocomplete()
+        test_artifact_persistence()
+
+        print("\n" + "="*60)
+        print(" ✓ ALL TESTS COMPLETED SUCCESSFULLY!")
+        print("="*60 + "\n")
+
+        return True
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -1,17 +1,100 @@
-# Placeholder for future price monitoring scheduler
-# This could use APScheduler or similar for periodic price checks
+# Price monitoring and catalog refresh schedulers
+# Periodically re-fetches prices for watched products and feeds them into the
+# best-price index, and re-imports changed feeds. Alert notifications are still a placeholder.
+import threading
+
 
 class PriceScheduler:
-    def __init__(self):
-        # Initialize scheduler
-        pass
+    def __init__(self, best_price_index=None, price_fetcher=None):
+        # price_fetcher(query) -> list of current offers (e.g. a live scrape)
+        self.best_price_index = best_price_index
+        self.price_fetcher = price_fetcher
+        self.watched = set()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def watch(self, product_name):
+        """Include a product in scheduled price checks."""
+        if product_name:
+            self.watched.add(product_name)
+
+    def run_price_check(self):
+        """Fetch current prices for watched products and record changes; returns offers seen."""
+        if self.best_price_index is None:
+            return 0
+        # Scraped prices nobody refreshed fall back to the catalog price
+        self.best_price_index.expire_offers()
+        if not self.price_fetcher:
+            return 0
+
+        seen = 0
+        for product_name in sorted(self.watched):
+            try:
+                offers = self.price_fetcher(product_name) or []
+            except Exception as e:
+                print(f"⚠ Price check failed for '{product_name}': {e}")
+                continue
+            self.best_price_index.record_offers(offers, source='scheduler')
+            seen += len(offers)
+        return seen
+
+    def _run(self, interval_seconds):
+        while not self._stopped.wait(interval_seconds):
+            self.run_price_check()
 
     def schedule_price_check(self, interval_hours=24):
-        """Schedule periodic price checks (placeholder)."""
-        # Placeholder for future implementation
-        pass
+        """Schedule periodic price checks in a background thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval_hours * 3600,),
+                                            name='price-scheduler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
 
     def check_alerts(self):
         """Check price alerts and send notifications (placeholder)."""
         # Placeholder for future implementation
         pass
+
+
+class CatalogRefreshScheduler:
+    """Periodically re-imports changed feeds and asks for an index rebuild when they did.
+
+    Keeps imports out of catalog version checks, which must stay cheap stats.
+    """
+
+    def __init__(self, source_manager, index_manager=None):
+        self.source_manager = source_manager
+        self.index_manager = index_manager
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def run_refresh(self):
+        """Re-import changed feeds; returns True if the catalog changed."""
+        try:
+            refreshed = self.source_manager.refresh_catalog()
+        except Exception as e:
+            print(f"⚠ Catalog refresh failed: {e}")
+            return False
+        if refreshed and self.index_manager is not None:
+            self.index_manager.request_rebuild()
+        return refreshed
+
+    def _run(self, interval_seconds):
+        while not self._stopped.wait(interval_seconds):
+            self.run_refresh()
+
+    def schedule_refresh(self, interval_seconds=300):
+        """Schedule periodic feed refreshes in a background thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval_seconds,),
+                                            name='catalog-refresh', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()